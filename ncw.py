@@ -1,8 +1,86 @@
-import os, sys, string, argparse
+import os, sys, io, re, glob, math, errno, random, string, argparse, time, json, hashlib, fnmatch, socket, traceback
+from contextlib import redirect_stdout, contextmanager
 from datetime import datetime
 import threading
-from nexuscompute import NexusCompute
-from nexuscompute.Enums import JobStatus
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+# modules of single actions (sqlite3, asyncio, csv, mmap, inspect, process pool) are imported
+# in the functions which use them, so help and --validate start fast
+
+# ---------------------------------------------------------------------------------------
+
+# class of the nexus compute client, imported with the first session (see load_client)
+NexusCompute = None
+
+# job states which do not change anymore
+TERMINAL_STATUS = ("Done", "Failed", "Cancelled", "Canceled", "Aborted", "Error", "Killed", "Stopped", "TimedOut")
+# errors of requests and transfers which are tried again, by type, http status, errno or text of the message,
+# errors with a FATAL_PATTERN message and missing files, permissions and wrong values are not tried again,
+# words and status codes of a message are matched as a whole, so "job_5001" is no status 500
+TRANSIENT_ERRNOS = (errno.ECONNRESET, errno.ECONNREFUSED, errno.ECONNABORTED, errno.ETIMEDOUT, errno.EPIPE,
+    errno.ENETUNREACH, errno.ENETDOWN, errno.EHOSTUNREACH, errno.EAGAIN)
+TRANSIENT_STATUS = (408, 425, 429, 500, 502, 503, 504)
+TRANSIENT_PATTERN = re.compile(r"\b(?:timeout|timed out|temporar\w*|unavailable|socket hang up|econnreset|network"
+    r"|interrupt\w*|too many requests|connection (?:reset|refused|aborted|closed|lost|error)|(?:lost|broken|no) connection)\b"
+    r"|(?<![\w.])(?:408|425|429|500|502|503|504)(?!\w|\.\d)")
+FATAL_PATTERN = re.compile(r"\b(?:unauthori[sz]ed|forbidden|does not exist|no such file|quota\w*"
+    r"|(?:file|document|job|user|resource|path) not found|invalid (?:token|credentials|argument|parameter|value|path|file))\b"
+    r"|(?<![\w.])(?:400|401|403|404|410|422)(?!\w|\.\d)")
+# backoff of a retry in seconds, random up to base * 2**attempt (full jitter) and at most the maximum
+RETRY_BASE = 1.0
+RETRY_MAX = 60.0
+# seconds without progress of a transfer which count as stall in the transfer metrics
+STALL_TIME = 10.0
+# percentiles of the throughput per file in the transfer metrics
+METRICS_PERCENTILES = (0.5, 0.9, 0.99)
+# file extensions of analysis decks for SWEEP
+DECK_EXTENSIONS = (".dat", ".bdf", ".nas")
+# result files of running jobs shown by TAIL
+TAIL_PATTERNS = ("*.f04", "*.log")
+# job settings without deck analysis, keys of the submit file to override the job settings
+JOB_DEFAULTS = {"hardware": "medium", "nb_nodes": 1, "mem": "100mb", "smp": 1, "dmp": 1, "runtime": 1}
+# cards of a deck counted by the deck analysis, elements with stiffness only,
+# the line start is matched as newline which is much faster than a multiline pattern
+GRID_PATTERN = re.compile(rb"\nGRID[ ,*\t]")
+ELEMENT_PATTERN = re.compile(rb"\nC(?:QUAD4|QUAD8|QUADR|TRIA3|TRIA6|TRIAR|HEXA|PENTA|TETRA|PYRAM|BAR|BEAM"
+    rb"|ROD|ONROD|TUBE|SHEAR|BUSH|ELAS[1-4]|GAP|WELD|FAST)[ ,*\t]")
+SOL_PATTERN = re.compile(rb"^[ \t]*SOL[ \t,]+([A-Za-z0-9]+)", re.M | re.I)
+# solution sequences by name and their type for the job sizing
+SOL_NAMES = {"SESTATIC": "101", "SEMODES": "103", "SEBUCKL": "105", "NLSTATIC": "106", "SEDCEIG": "107",
+    "SEDFREQ": "108", "SEDTRAN": "109", "SEMCEIG": "110", "SEMFREQ": "111", "SEMTRAN": "112", "NLTRAN": "129",
+    "DESOPT": "200", "NONLIN": "400"}
+SOL_TYPES = {"101": "static", "103": "eigen", "105": "eigen", "107": "eigen", "110": "eigen", 
+    "108": "dynamic", "109": "dynamic", "111": "dynamic", "112": "dynamic", "106": "nonlinear", "129": "nonlinear",
+    "400": "nonlinear", "200": "optimization"}
+# memory and runtime factors per solution type against a linear static solution
+SOL_FACTORS = {"static": (1.0, 1.0), "eigen": (2.0, 2.0), "dynamic": (2.0, 3.0), "nonlinear": (1.5, 4.0),
+    "optimization": (2.0, 6.0)}
+# size classes by degrees of freedom: maximum dofs, memory in GB, smp, runtime hours
+SIZE_CLASSES = ((50000, 1, 1, 0.5), (500000, 4, 2, 1.0), (3000000, 16, 4, 4.0), (None, 32, 8, 12.0))
+# result files of a job scanned after download, the statistics are in the last part of the files
+POST_EXTENSIONS = (".f06", ".f04", ".log")
+POST_TAIL = 4 * 1024**2
+# summary of a job directory with size and modification time of the scanned files
+POST_SUMMARY_FILE = "ncw_post_summary.json"
+# statistics at the end of .log and .f04 files, times in seconds, memory with unit
+POST_PATTERNS = (
+    ("wall", re.compile(rb"Real:\s+([\d.]+)\s+sec")),
+    ("user", re.compile(rb"User:\s+([\d.]+)\s+sec")),
+    ("sys", re.compile(rb"Sys:\s+([\d.]+)\s+sec")),
+    ("wall", re.compile(rb"TOTAL (?:ELAPSED|WALL)[ A-Z]*TIME[^\d\n]*([\d.]+)")),
+    ("cpu", re.compile(rb"TOTAL CPU[ A-Z]*TIME[^\d\n]*([\d.]+)")),
+    ("memory", re.compile(rb"(?:HIWATER|PEAK|MAXIMUM|Peak|Maximum)[ A-Za-z]*(?:MEMORY|Memory|memory)[^\d\n]*([\d.]+)"
+        rb"\s*\(?(GB|MB|KB|gb|mb|kb)?")))
+# messages of nonlinear solutions and of the end of a job, the files are searched for the
+# short keys and the messages are checked around each key, which needs less passes over big files
+CONVERGENCE_KEYS = (b"CONVERGE", b"DIVERG")
+NOT_CONVERGED_MESSAGES = (b"NO CONVERGENCE", b"FAILED TO CONVERGE", b"SOLUTION DIVERGED", b"DIVERGING SOLUTION")
+CONVERGED_MESSAGES = (b"SOLUTION HAS CONVERGED", b"CONVERGENCE ACHIEVED")
+END_MESSAGES = (b"END OF JOB", b"Analysis complete")
+# timestamp of the default names doc_<time> and job_<time> of a submission, for the age of PRUNE
+NAME_TIME_PATTERN = re.compile(r"(?<!\d)(\d{14})(?!\d)")
+# fields of jsonl and csv records of STATUS
+STATUS_FIELDS = ("record", "doc_id", "doc_name", "jobs", "files", "job_id", "job_name", "status", "file",
+    "solver", "config_type", "config", "old_status", "account", "documents", "running")
 
 # ---------------------------------------------------------------------------------------
 
@@ -13,21 +91,33 @@ class NCW():
     wapper around the basic commands to setup common requests
     """
 
-    def __init__(self, arg_space):
+    def __init__(self, arg_space, token=None, profiler=None, metrics=None):
         """
         init
         
-        initialize class and define attributes and methods
+        initialize class and define attributes and methods,
+        a given token is used instead of the token file, a given profiler and metrics are shared
         """
-        self.nc=NexusCompute()
+        self.nc=load_client()()
         self.arg_space = arg_space
         self.token = ""
         self.listening_port = None
         self.my_user = None
+        self.last_check = 0.0
+        self.profiler = profiler or Profiler(self.arg_space.profile)
+        self.metrics = metrics or TransferMetrics(self.arg_space)
         # get into nexus compute environment
-        self.get_token()
+        if token:
+            self.token = token
+        else:
+            self.get_token()
         self.start()
         self.login()
+        # local metadata cache and journal of submissions per token
+        account = hashlib.sha256(self.token.encode()).hexdigest()[:16]
+        self.cache = MetadataCache(account, self.arg_space.cache_ttl, self.arg_space.cache_size, 
+            not self.arg_space.no_cache)
+        self.journal = RunJournal(account)
         
 
 
@@ -41,26 +131,12 @@ class NCW():
         """
         # variables
         return_value = 0
-        # (1) token file definition 
+        # (1) token file definition or (2) token rc file
+        self.token = read_token(self.arg_space)
         if self.arg_space.token:
-            try:
-                file_in = open(self.arg_space.token,'r')
-                line_list = file_in.readlines()
-                file_in.close()
-                self.token = line_list[0].strip()
-            except:
-                pass
             print ("token from token file: ", self.token)
-        # (2) do we have an token rc file
-        if self.arg_space.token == None:
-            try:
-                file_in = open(os.path.dirname(os.path.realpath(__file__)) + "/ncwrc","r")
-                line_list = file_in.readlines()
-                file_in.close()
-                self.token = line_list[0].strip()
-                print ("rc token: ", self.token)
-            except:
-                pass
+        elif self.token != "":
+            print ("rc token: ", self.token)
         # no token definition
         if self.token == "":
             print ("ERROR: no token definition")
@@ -78,7 +154,8 @@ class NCW():
         spawn NodeJS process and connect
         as result a listening port is delivered
         """
-        self.listening_port = self.nc.start()
+        with self.profiler.span("NexusCompute.start", "phase"):
+            self.listening_port = self.nc.start()
         print ("port: ", self.listening_port)
 
 
@@ -87,23 +164,76 @@ class NCW():
         """
         login
         
-        with the token (from token file or rc file) the user is logged in
+        with the token (from token file or rc file) the user is logged in,
+        transient errors are tried again, a wrong token is not
         """
         user_id = 0
-        self.my_user = self.nc.login(self.token)
+        with self.profiler.span("login", "phase"):
+            self.my_user = retry_call(lambda: self.nc.login(self.token), max(0, self.arg_space.retries), "login")
+        self.last_check = time.monotonic()
         try:
             print ("user id: ", self.my_user.loginRefId)
         except:
             pass
+
+
+
+    def ensure_login(self, check_interval=60.0):
+        """
+        ensure login
+
+        for a long running session the login is checked with a cheap request
+        if the last check is older than the check interval, in case of an error
+        the user is logged in again, if that fails also the NodeJS process is restarted
+        """
+        if time.monotonic() - self.last_check < check_interval:
+            return
+        try:
+            self.my_user.list_documents()
+            self.last_check = time.monotonic()
+            return
+        except Exception as e:
+            print ("session check failed, login again: ", e)
+        try:
+            self.login()
+        except Exception as e:
+            print ("login failed, restart nexus compute: ", e)
+            try:
+                self.nc.stop()
+            except Exception:
+                pass
+            self.nc = load_client()()
+            self.start()
+            self.login()
              
 
 
+    def request(self, name, function, *args, cat="call", **span_args):
+        """
+        request
+
+        call of the nexus compute client with profiling span, transient errors are tried
+        again (--retries) with backoff, fatal errors are raised at once, requests which
+        create something (new_document, submit_job) are not made with request
+        """
+        def call():
+            with self.profiler.span(name, cat, **span_args):
+                return function(*args)
+        label = name
+        if len(args) > 0:
+            label += " " + str(args[0])
+        return retry_call(call, max(0, self.arg_space.retries), label)
+
+
+
     def end_nc(self):
         """
         end_nc
         
         end of nexus compute process
         """
+        self.cache.close()
+        self.journal.close()
         self.my_user.logoff()
         self.nc.stop()
         
@@ -125,47 +255,202 @@ class NCW():
         next chapters could be:
         - what for result files per job
         - available software configurations for example for Nastran, what queues ...
+
+        the status of every document is written and printed as soon as it is ready,
+        in the format of --format (text, jsonl, csv), the number of documents is returned
         """
-        return_list = []
-        solver_configs = {}
         # list of documents
-        doc_list = self.my_user.list_documents()
-        return_list.append("number of documents: " + str(len(doc_list)))
+        doc_list = self.request("list_documents", self.my_user.list_documents)
+        status_writer = StatusWriter(self.arg_space.format)
+        status_writer.write_header(len(doc_list))
+        for entry_dict, job_dict, files_in_doc in self.iter_document_status(doc_list):
+            if entry_dict is None:
+                # after document listing the solve configuration is attached
+                status_writer.write_solver_configs(job_dict)
+            else:
+                status_writer.write_document(entry_dict['id'], entry_dict['name'], job_dict, files_in_doc)
+        status_writer.close()
+        return len(doc_list)
+
+
+
+
+    def iter_document_status(self, doc_list, solver_configs=True):
+        """
+        iterate document status
+
+        generator of (entry_dict, job_dict, files_in_doc) in document order,
+        documents are loaded and queried by a bounded worker pool, only a window of
+        twice the number of workers is queued, so memory does not grow with the account,
+        the solver configurations are yielded at the end with entry_dict None
+        """
+        pending = []
+        config_future = None
+        workers = max(1, self.arg_space.workers)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # solver configurations are the same for all documents, fetch them once beside the scan
+            if solver_configs and len(doc_list) > 0:
+                config_future = executor.submit(self.get_solver_configs, doc_list[0]['id'])
+            for entry_dict in doc_list:
+                pending.append((entry_dict, executor.submit(self.get_document_status, entry_dict)))
+                if len(pending) >= 2 * workers:
+                    entry_dict, future = pending.pop(0)
+                    yield (entry_dict,) + future.result()
+            for entry_dict, future in pending:
+                yield (entry_dict,) + future.result()
+            if solver_configs:
+                config_dict = {}
+                if config_future is not None:
+                    config_dict = config_future.result()
+                yield None, config_dict, []
+
+
+
+
+    def get_status_changes(self):
+        """
+        get status changes
+
+        compare the documents with the snapshot of the last run with --since-last and
+        write only the changes: new documents, new jobs, status changes, new files and
+        removed documents, the snapshot is updated and the number of changes is returned
+
+        documents with only finished jobs in the snapshot and the same entry in the document
+        list (job count or modification time, if the client lists them) are not requested
+        at all as long as they are in the cache, the cache time (--cache-ttl) is over or a
+        SUBMIT into the document removes them from the cache, new, running and changed
+        documents are loaded
+        """
+        changes = 0
+        doc_list = self.request("list_documents", self.my_user.list_documents)
+        snapshot = StatusSnapshot(self.cache.account)
+        status_writer = StatusWriter(self.arg_space.format, "ncw_output_status_changes")
+        status_writer.write_since(snapshot.time)
+        unchanged = set()
         for entry_dict in doc_list:
-            return_list.append("  ")
-            doc_id = entry_dict['id']
-            doc_name = entry_dict['name']
-            return_list.append(" doc name/id: " + doc_name + "      " + doc_id)
-            # load according document to reach further information as jobs and files
-            doc_obj = self.my_user.load_document(doc_id)
-            # get job information
-            job_dict = doc_obj.list_jobs()
-            return_list.append("  number of jobs: " + str(len(job_dict)))
-            for job_id, job_feat in job_dict.items():
-                return_list.append("   job name/id/status: "+job_feat['name']+"  " +job_id+"  "+str(job_feat['status']))
-            # get file information
-            files_in_doc = doc_obj.list_files()
-            return_list.append("  files in document:")
-            for entry in files_in_doc:
-                return_list.append("   " + str(entry))
-            # solver configurations
-            if len(solver_configs) == 0:
-                solver_configs = doc_obj.get_solver_configs()
-            doc_obj.close()
-            # after document listing the solve configuration is attached
-        return_list.append("\n\nsolver configurations:")
-        for solver,v1 in solver_configs.items():
-            if solver == "nastran":
-                for k2,v2 in v1.items():
-                    if k2 == "versions" or k2 == "configs":
-                        for k3,v3 in v2.items():
-                            return_list.append("  " + str(solver) + " " + str(k2) + " " + str(k3))         
-        #
-        file_out = open("ncw_output_status.txt","w")
-        file_out.writelines([l+"\n" for l in return_list])
-        file_out.close()                            
-        # return all information as list
-        return return_list
+            if not snapshot.is_terminal(entry_dict['id']):
+                continue
+            if snapshot.is_unchanged(entry_dict) and self.cache.get_document(entry_dict['id']) is not None:
+                unchanged.add(entry_dict['id'])
+            else:
+                # a changed document is not taken from the cache
+                self.cache.remove_document(entry_dict['id'])
+        load_list = [entry_dict for entry_dict in doc_list if entry_dict['id'] not in unchanged]
+        for entry_dict, job_dict, files_in_doc in self.iter_document_status(load_list, solver_configs=False):
+            change_list = snapshot.update(entry_dict['id'], entry_dict['name'], job_dict, files_in_doc, entry_dict)
+            for change in change_list:
+                status_writer.write_change(change)
+            changes += len(change_list)
+        for change in snapshot.remove_missing([entry_dict['id'] for entry_dict in doc_list]):
+            status_writer.write_change(change)
+            changes += 1
+        snapshot.write()
+        status_writer.write_footer(len(load_list), len(doc_list), changes)
+        status_writer.close()
+        return changes
+
+
+
+    def get_journal_status(self):
+        """
+        get journal status
+
+        status of the jobs of the journal selected by --job-name, --tag, --since and --until,
+        only these jobs and their result files are written, the documents are queried in parallel
+        """
+        row_list = self.find_journal_jobs()
+        doc_list = []
+        job_names = {}
+        for row in row_list:
+            if row["doc_id"] not in job_names:
+                doc_list.append({'id': row["doc_id"], 'name': row["doc_name"]})
+                job_names[row["doc_id"]] = {}
+            job_names[row["doc_id"]][row["job_id"]] = row["job_name"]
+        status_writer = StatusWriter(self.arg_space.format)
+        status_writer.write_header(len(doc_list))
+        for entry_dict, job_dict, files_in_doc in self.iter_document_status(doc_list, solver_configs=False):
+            jobs = job_names[entry_dict['id']]
+            job_dict = dict([(job_id, job_feat) for job_id, job_feat in job_dict.items() if job_id in jobs])
+            files_in_doc = [entry for entry in files_in_doc 
+                if any(["/" + job_name + "/" in entry for job_name in jobs.values()])]
+            status_writer.write_document(entry_dict['id'], entry_dict['name'], job_dict, files_in_doc)
+        status_writer.close()
+        return len(row_list)
+
+
+
+
+    def get_document_status(self, entry_dict):
+        """
+        get document status
+
+        jobs and files of a single document with profiling span
+        """
+        doc_id = entry_dict['id']
+        doc_name = entry_dict['name']
+        with self.profiler.span("document", "document", doc_id=doc_id, doc_name=doc_name):
+            return self.get_document_content(doc_id)
+
+
+
+    def get_document_content(self, doc_id):
+        """
+        get document content
+
+        jobs and files of a document, documents with only finished jobs are taken
+        from the cache, other documents are loaded and stored in the cache,
+        the job status is kept as text
+        """
+        cached = self.cache.get_document(doc_id)
+        if cached is not None:
+            return cached
+        return self.load_document_content(doc_id)
+
+
+
+    def load_document_content(self, doc_id):
+        """
+        load document content
+
+        jobs and files of a document requested from nexus, the cache is updated
+        """
+        # load according document to reach further information as jobs and files
+        doc_obj = self.load_document(doc_id)
+        job_dict = {}
+        for job_id, job_feat in self.request("list_jobs", doc_obj.list_jobs, doc_id=doc_id).items():
+            job_dict[job_id] = {'name': job_feat['name'], 'status': str(job_feat['status'])}
+        files_in_doc = [str(entry) for entry in self.request("list_files", doc_obj.list_files, doc_id=doc_id)]
+        doc_obj.close()
+        self.cache.put_document(doc_id, job_dict, files_in_doc)
+        return job_dict, files_in_doc
+
+
+
+    def load_document(self, doc_id):
+        """
+        load document
+
+        load document into memory, with profiling span, transient errors are tried again
+        """
+        return self.request("load_document", self.my_user.load_document, doc_id, doc_id=doc_id)
+
+
+
+    def get_solver_configs(self, doc_id):
+        """
+        get solver configs
+
+        solver configurations are requested via a loaded document
+        and kept in the cache until the cache time is over
+        """
+        solver_configs = self.cache.get_entry("solver_configs")
+        if solver_configs is not None:
+            return solver_configs
+        doc_obj = self.load_document(doc_id)
+        solver_configs = self.request("get_solver_configs", doc_obj.get_solver_configs)
+        doc_obj.close()
+        self.cache.put_entry("solver_configs", solver_configs)
+        return solver_configs
 
 
 
@@ -173,7 +458,7 @@ class NCW():
     def get_user_information(self):
         print ("get user information ...")
         print (type(self.my_user), dir(self.my_user))
-        doc_list = self.my_user.list_documents()
+        doc_list = self.request("list_documents", self.my_user.list_documents)
         print ("number of documents: " + str(len(doc_list)))
         for entry_dict in doc_list:
             print (entry_dict['id'], " - ", entry_dict['name'])
@@ -184,11 +469,11 @@ class NCW():
     
 
 
-    def submit_files(self):
+    def submit_files(self, submit_dict=None):
         """
         submit files
 
-        - reads a submission file
+        - reads a submission file, if the submission information is not given
         - create document and job(s)
         - transfer analysis files to Nexus compute cloud
         - submit jobs
@@ -197,23 +482,19 @@ class NCW():
         these will be saved later in a log file that can be used
         """
         print ("submit files ...")
-        submit_dict = get_submission_info(self.arg_space.file)
+        if submit_dict is None:
+            submit_dict = get_submission_info(self.arg_space.file)
         # variables
         log_lines = []
-        file_names = []
         job_names = []
-        # solver configurations
-        solver_name     = 'nastran'
-        hardware_config = 'medium'
-        version         = '2024.2'
         # all previously collected submission infomation into log file
         log_lines.append("collected submission information:")
         for k,v in submit_dict.items():
             print (k,v)
-            if k == 'DOC'  or  k == "CALC_DIR": 
+            if k == 'DOC'  or  k == 'DOC_ID'  or  k == "CALC_DIR": 
                 log_lines.append(str(k))
                 log_lines.append(" " + str(v))
-            if k == 'JOBS' or k == 'CALC_FILES':
+            if k == 'JOBS' or k == 'CALC_FILES' or k == 'INCLUDES':
                 log_lines.append(k)
                 for entry in v:
                     log_lines.append(" " + str(entry))
@@ -222,31 +503,119 @@ class NCW():
             print ("ERROR: no calc files for submission defined ...")
             write_report_file(submit_dict, "ncw_output_submit.err", "CR", "PRINT")
             sys.exit(1)
-        # create and load document in nexus
-        doc_id = self.my_user.new_document(submit_dict['DOC'])
-        doc_obj = self.my_user.load_document(doc_id)
+        # shared upload set of analysis files and their includes, each document path is uploaded once,
+        # missing files and includes or conflicting document paths stop the submission
+        # before a document is created
+        upload_dict, job_files, errors = get_upload_files(submit_dict)
+        errors = submit_dict['ERRORS'] + errors
+        if len(errors) > 0:
+            for error in errors:
+                print (error)
+            submit_dict['ERRORS'] = errors
+            write_report_file(submit_dict, "ncw_output_submit.err", "CR", "PRINT")
+            sys.exit(1)
+        # create and load document in nexus, or load the existing document
+        if submit_dict['DOC_ID'] != "":
+            doc_id = submit_dict['DOC_ID']
+        else:
+            with self.profiler.span("new_document", "call"):
+                doc_id = self.my_user.new_document(submit_dict['DOC'])
+        doc_obj = self.load_document(doc_id)
         print ("loaded document into memory: ", doc_id)
-        # upload files and prepare local file names
+        file_names = [files[0] for files in job_files]
+        # files with the same content in the document are reused instead of uploaded again
+        upload_index = UploadIndex()
+        remote_files = []
+        if submit_dict['DOC_ID'] != "":
+            remote_files = [str(f) for f in self.request("list_files", doc_obj.list_files, doc_id=doc_id)]
+        with ThreadPoolExecutor(max_workers=max(1, self.arg_space.workers)) as executor:
+            file_hashes = dict(zip(upload_dict.keys(), executor.map(upload_index.get_hash, upload_dict.values())))
+            analysis_list = list(executor.map(lambda deck_file, include_list: analyze_deck(deck_file, include_list, 
+                upload_index), submit_dict['CALC_FILES'], submit_dict['INCLUDES']))
+        # job settings from deck analysis and solver configurations, the submit file overrides them
+        solver_configs = self.get_solver_configs(doc_id)
+        job_settings = []
+        log_lines.append("job settings:")
+        for i, job in enumerate(submit_dict['JOBS']):
+            settings, reasons = get_job_settings(analysis_list[i], solver_configs, submit_dict['SETTINGS'])
+            job_settings.append(settings)
+            print (" job settings of ", job, ":")
+            log_lines.append(" " + job)
+            for reason in reasons:
+                print ("   " + reason)
+                log_lines.append("   " + reason)
+        # upload files concurrently, each job is submitted as soon as all of its own files are uploaded
         print ("uploading files ...")
         log_lines.append("uploading analysis files ...")
-        for local_file_name in submit_dict['CALC_FILES']:
-            local_dir, file_name = os.path.split(local_file_name)
-            log_lines.append("  " + local_file_name + " " + file_name)
-            doc_obj.upload_file(local_file_name, file_name, progress)
-            file_names.append(file_name)
-        # submit jobs
         job_names = submit_dict['JOBS']
+        job_ids = [""] * len(job_names)
+        job_errors = [""] * len(job_names)
+        uploaded = set()
+        # a failed upload or submission does not stop the other jobs
+        def submit_ready_jobs():
+            for i, job in enumerate(job_names):
+                if job_ids[i] == "" and job_errors[i] == "" and uploaded.issuperset(job_files[i]):
+                    try:
+                        job_ids[i] = self.submit_job(doc_obj, job, job_files[i], job_settings[i])
+                    except Exception as e:
+                        print ("ERROR: submission of ", job, " failed: ", e)
+                        job_errors[i] = "submission failed: " + str(e)
+        monitor = TransferMonitor("upload", self.arg_space.rate_limit, self.profiler, metrics=self.metrics)
+        with ThreadPoolExecutor(max_workers=max(1, self.arg_space.transfers)) as executor:
+            future_dict = {}
+            for remote_name, local_file_name in upload_dict.items():
+                file_hash = file_hashes[remote_name]
+                # the document path is kept, because job commands and includes refer to the file name
+                if not self.arg_space.no_dedup and upload_index.is_current(file_hash, doc_id, remote_name, remote_files):
+                    print ("  ", local_file_name, " unchanged, reuse ", remote_name)
+                    log_lines.append("  " + local_file_name + " " + remote_name + "  reused")
+                    uploaded.add(remote_name)
+                    continue
+                # same content in other documents is only reported, the client can not copy files between
+                # documents, so the file is uploaded into this document
+                for other_doc_id, other_path in upload_index.locations(file_hash):
+                    if other_doc_id != doc_id:
+                        print ("  ", local_file_name, " same content in document ", other_doc_id, " ", other_path)
+                        break
+                log_lines.append("  " + local_file_name + " " + remote_name)
+                callback = monitor.upload_callback(local_file_name, os.path.getsize(local_file_name))
+                future = executor.submit(self.upload_file, doc_obj, local_file_name, remote_name, callback)
+                future_dict[future] = remote_name
+            submit_ready_jobs()
+            for future in as_completed(future_dict):
+                remote_name = future_dict[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    monitor.finish(upload_dict[remote_name], failed=True)
+                    print ("\nERROR: upload of ", remote_name, " failed: ", e)
+                    log_lines.append("  " + upload_dict[remote_name] + " " + remote_name + "  failed: " + str(e))
+                    for i in range(len(job_names)):
+                        if remote_name in job_files[i] and job_errors[i] == "":
+                            job_errors[i] = "upload of " + remote_name + " failed: " + str(e)
+                    continue
+                monitor.finish(upload_dict[remote_name])
+                upload_index.add(file_hashes[remote_name], doc_id, remote_name)
+                uploaded.add(remote_name)
+                submit_ready_jobs()
+        monitor.report()
+        # document has new jobs and files
+        self.cache.remove_document(doc_id)
+        # log submitted jobs in order of the submission file and record them in the journal
         log_lines.append("DOC_ID:"+doc_id)
         log_lines.append("CALC_DIR:"+submit_dict["CALC_DIR"])
         for i,job in enumerate(job_names):
-            job_id = doc_obj.submit_job(job_name=job, 
-                solver=solver_name, solver_version=version, hardware=hardware_config, 
-                nb_nodes=1, files=[file_names[i]], 
-                command="nast20242 mem=100mb smp=1 dmp=1 scr=yes sdir=../scratch "+file_names[i], 
-                max_runtime_hours=1, dry_run=False)
-            print ("submitted: ", job, " job_id: ", job_id)
+            if job_ids[i] == "":
+                log_lines.append("not submitted " + job + " with file " + file_names[i] + ": " + job_errors[i])
+                continue
             log_lines.append("submitted " + job + " with file " + file_names[i])
-            log_lines.append(" JOB_ID:" + job_id)
+            for include_name in job_files[i][1:]:
+                log_lines.append("  include " + include_name)
+            log_lines.append(" JOB_ID:" + job_ids[i])
+            self.journal.add(doc_id, submit_dict['DOC'], job_ids[i], job, self.arg_space.tag or "", 
+                os.path.realpath(submit_dict["CALC_DIR"] or "."), 
+                [{"local": os.path.realpath(upload_dict[remote]), "remote": remote, "sha256": file_hashes[remote]} 
+                    for remote in job_files[i]], job_settings[i])
         # close open document
         doc_obj.close()
         # check log file name and count the name, the write log file
@@ -258,376 +627,4707 @@ class NCW():
         file_out = open(log_file_name, 'w')
         file_out.writelines([l+"\n" for l in log_lines])
         file_out.close()
+        # jobs which are not submitted can be submitted again into the same document,
+        # the uploaded files are reused
+        if "" in job_ids:
+            write_retry_submit_file("ncw_submit_retry.txt", doc_id, submit_dict, 
+                [i for i in range(len(job_names)) if job_ids[i] == ""])
+            print ("ERROR: ", job_ids.count(""), " jobs not submitted, submit them again with: ncw_submit_retry.txt")
         # send back document object
         return doc_obj
 
 
 
 
+    def submit_job(self, doc_obj, job_name, files, settings=None):
+        """
+        submit job
+
+        submit a single job for already uploaded files,
+        the first file is the analysis file, the other files are its includes,
+        hardware, nodes, memory, smp, dmp and runtime are taken from the job settings
+        """
+        file_name = files[0]
+        if settings is None:
+            settings = JOB_DEFAULTS
+        # solver configurations
+        solver_name     = 'nastran'
+        hardware_config = settings["hardware"]
+        version         = '2024.2'
+        command = "nast20242 mem=" + str(settings["mem"]) + " smp=" + str(settings["smp"]) + " dmp=" + \
+            str(settings["dmp"]) + " scr=yes sdir=../scratch " + file_name
+        with self.profiler.span("submit_job", "job", job_name=job_name, files=files):
+            job_id = doc_obj.submit_job(job_name=job_name, 
+                solver=solver_name, solver_version=version, hardware=hardware_config, 
+                nb_nodes=settings["nb_nodes"], files=files, 
+                command=command, 
+                max_runtime_hours=settings["runtime"], dry_run=False)
+        print ("submitted: ", job_name, " job_id: ", job_id)
+        return job_id
+
+
+
+
+    def upload_file(self, doc_obj, local_file_name, remote_name, callback):
+        """
+        upload file
+
+        upload a single file into the document, with profiling span, transient errors
+        are tried again (--retries), the file is uploaded again from the start
+        """
+        def upload():
+            with self.profiler.span("upload_file", "file", file=remote_name, size=os.path.getsize(local_file_name)):
+                return doc_obj.upload_file(local_file_name, remote_name, callback)
+        return retry_call(upload, max(0, self.arg_space.retries), "upload of " + remote_name)
+
+
+
+
 # DOWNLOAD ==============================================================================
     
 
 
-    def download_files(self):
+    def download_files(self, sessions=None):
         """
         download files
 
         - reads a download file
         - try to download files from definitions in download file
 
-        needed information would be a document id and job ids
+        needed information would be a document id and job ids or a query (STATUS, JOB_NAME, ALL_DOCS)
         the calc directory is used to store the files locally
+
+        all documents are downloaded in one pass, the documents are handled by --workers threads
+        and the files of all documents share one pool of --transfers transfers,
+        with the sessions of a session pool every document is downloaded by the session of its
+        account and the pool has --transfers transfers per account
         """
         print ("download files ...")
-        download_dict = get_download_info(self.arg_space.file)
-        for k,v in download_dict.items():
-            print ("   ", k,v)
+        sessions = sessions or [self]
+        session_dict = dict([(session.cache.account, session) for session in sessions])
+        download_dict = self.get_download_dict(sessions)
         # if there are no analysis files left, exit with error file
-        if len(download_dict['JOB_IDS']) == 0:
-            print ("ERROR: no job ids for download defined ...")
+        if len(download_dict['JOB_IDS']) == 0 or len(download_dict['DOCS']) == 0:
+            print ("ERROR: no doc id or job ids for download defined ...")
             write_report_file(download_dict, "ncw_output_download.err", "CR", "PRINT")
             sys.exit(1)
         # variables
         log_lines = []
-        doc_id = download_dict["DOC_ID"]
-        job_ids = download_dict["JOB_IDS"]
-        calc_dir = download_dict["CALC_DIR"]
+        job_list = []
+        doc_list = [doc_entry for doc_entry in download_dict["DOCS"] if len(doc_entry["JOB_IDS"]) > 0]
+        doc_log_lines = [[] for doc_entry in doc_list]
+        monitor = TransferMonitor("download", self.arg_space.rate_limit, self.profiler, metrics=self.metrics)
+        with ThreadPoolExecutor(max_workers=max(1, self.arg_space.transfers) * len(sessions)) as transfer_executor, \
+                ThreadPoolExecutor(max_workers=max(1, min(self.arg_space.workers, len(doc_list)))) as doc_executor:
+            futures = [doc_executor.submit(session_dict[doc_entry["ACCOUNT"]].download_jobs, doc_entry["DOC_ID"], 
+                doc_entry["JOB_IDS"], doc_entry["CALC_DIR"], download_dict, doc_log_lines[i], transfer_executor, 
+                monitor, doc_entry.get("JOB_DICT")) for i, doc_entry in enumerate(doc_list)]
+            # log lines are kept in the order of the download file
+            for doc_entry, future, lines in zip(doc_list, futures, doc_log_lines):
+                try:
+                    job_list.extend(future.result())
+                except Exception as e:
+                    print ("\nWARNING: download of document ", doc_entry["DOC_ID"], " failed: ", e)
+                    lines.append("download of document " + doc_entry["DOC_ID"] + " failed: " + str(e))
+                log_lines.extend(lines)
+        monitor.report()
+        # write log file
+        file_out = open("ncw_output_download.txt", 'w')
+        file_out.writelines([l+"\n" for l in log_lines])
+        file_out.close()
+        # summary of the solver output files
+        if not self.arg_space.no_post:
+            self.post_process(job_list)
+
+
+
+    def get_download_dict(self, sessions=None):
+        """
+        get download dict
+
+        read download file, the filters of the command line are added to the filters of the download file,
+        jobs of the journal selected by --job-name, --tag, --since and --until are added,
+        with the sessions of a session pool the jobs of all accounts
+        """
+        download_dict = get_download_info(self.arg_space.file)
+        if has_journal_filter(self.arg_space):
+            for session in sessions or [self]:
+                session.add_journal_jobs(download_dict)
+        self.select_download_jobs(download_dict, sessions)
+        download_dict['INCLUDE'].extend(self.arg_space.include or [])
+        download_dict['EXCLUDE'].extend(self.arg_space.exclude or [])
+        if self.arg_space.max_size:
+            download_dict['MAX_SIZE'] = parse_size(self.arg_space.max_size)
+        for k,v in download_dict.items():
+            if k != "DOCS":
+                print ("   ", k,v)
+        return download_dict
+
+
+
+    def select_download_jobs(self, download_dict, sessions=None):
+        """
+        select download jobs
+
+        resolve the queries of the download dictionary:
+        - documents of the user with a name matching ALL_DOCS are added, the results of a document
+          are stored in a directory with the document name in the calc directory
+        - documents without job ids get their jobs which match STATUS and JOB_NAME,
+          without these keys all jobs of the document
+
+        the documents are requested in parallel, the job dictionary of a document
+        is kept for the download, a document which cannot be loaded is skipped with a warning
+
+        with the sessions of a session pool the documents of all accounts are listed and
+        every document gets the account it belongs to, documents of no account are skipped
+        """
+        sessions = sessions or [self]
+        session_dict = dict([(session.cache.account, session) for session in sessions])
+        if len(download_dict['ALL_DOCS']) > 0 or len(sessions) > 1:
+            def list_documents(session):
+                return session.request("list_documents", session.my_user.list_documents)
+            with ThreadPoolExecutor(max_workers=len(sessions)) as executor:
+                doc_lists = list(executor.map(list_documents, sessions))
+            doc_accounts = {}
+            for session, doc_list in zip(sessions, doc_lists):
+                for entry_dict in doc_list:
+                    doc_accounts[entry_dict['id']] = session.cache.account
+            doc_ids = [doc_entry["DOC_ID"] for doc_entry in download_dict["DOCS"]]
+            for session, doc_list in zip(sessions, doc_lists):
+                for entry_dict in doc_list:
+                    for query in download_dict['ALL_DOCS']:
+                        if entry_dict['id'] not in doc_ids and fnmatch.fnmatchcase(entry_dict['name'], query["NAME"]):
+                            download_dict["DOCS"].append({"DOC_ID": entry_dict['id'], "JOB_IDS": [], 
+                                "CALC_DIR": query["CALC_DIR"] + "/" + re.sub(r'[^\w.-]', "_", entry_dict['name'])})
+                            doc_ids.append(entry_dict['id'])
+            for doc_entry in list(download_dict["DOCS"]):
+                if doc_entry.get("ACCOUNT", "") not in session_dict and len(sessions) > 1:
+                    if doc_entry["DOC_ID"] not in doc_accounts:
+                        print ("WARNING: document ", doc_entry["DOC_ID"], " not found in the accounts")
+                        download_dict["DOCS"].remove(doc_entry)
+                        continue
+                    doc_entry["ACCOUNT"] = doc_accounts[doc_entry["DOC_ID"]]
+        for doc_entry in download_dict["DOCS"]:
+            doc_entry.setdefault("ACCOUNT", self.cache.account)
+        query_docs = [doc_entry for doc_entry in download_dict["DOCS"] if len(doc_entry["JOB_IDS"]) == 0 and 
+            doc_entry["DOC_ID"] != ""]
+        if len(query_docs) == 0:
+            return
+        print ("select jobs of ", len(query_docs), " documents ...")
+        def get_job_dict(doc_entry):
+            try:
+                return session_dict[doc_entry["ACCOUNT"]].get_document_content(doc_entry["DOC_ID"])[0]
+            except Exception as e:
+                print ("WARNING: document ", doc_entry["DOC_ID"], " not available: ", e)
+                return {}
+        status_list = [status.lower() for status in download_dict['STATUS']]
+        with ThreadPoolExecutor(max_workers=max(1, min(self.arg_space.workers, len(query_docs)))) as executor:
+            for doc_entry, job_dict in zip(query_docs, executor.map(get_job_dict, query_docs)):
+                doc_entry["JOB_DICT"] = job_dict
+                for job_id, job_feat in job_dict.items():
+                    if len(status_list) > 0 and job_feat['status'].split(".")[-1].lower() not in status_list:
+                        continue
+                    if len(download_dict['JOB_NAME']) > 0 and not any([fnmatch.fnmatchcase(job_feat['name'], pattern) 
+                            for pattern in download_dict['JOB_NAME']]):
+                        continue
+                    doc_entry["JOB_IDS"].append(job_id)
+                    download_dict["JOB_IDS"].append(job_id)
+                print ("  ", doc_entry["DOC_ID"], " ", len(doc_entry["JOB_IDS"]), " of ", len(job_dict), " jobs selected")
+
+
+
+    def add_journal_jobs(self, download_dict):
+        """
+        add journal jobs
+
+        add the jobs of the journal which match the lookup options to the documents
+        of the download dictionary, the calc dir of a new document is taken from the journal
+        """
+        doc_dict = dict([(doc_entry["DOC_ID"], doc_entry) for doc_entry in download_dict["DOCS"]])
+        for row in self.find_journal_jobs():
+            if row["doc_id"] not in doc_dict:
+                doc_dict[row["doc_id"]] = {"DOC_ID": row["doc_id"], "CALC_DIR": row["calc_dir"], "JOB_IDS": [],
+                    "ACCOUNT": self.cache.account}
+                download_dict["DOCS"].append(doc_dict[row["doc_id"]])
+            if row["job_id"] not in doc_dict[row["doc_id"]]["JOB_IDS"]:
+                doc_dict[row["doc_id"]]["JOB_IDS"].append(row["job_id"])
+                download_dict["JOB_IDS"].append(row["job_id"])
+
+
+
+    def find_journal_jobs(self):
+        """
+        find journal jobs
+
+        journal entries selected by the lookup options of the command line
+        """
+        row_list = self.journal.find(job_name=self.arg_space.job_name, tag=self.arg_space.tag, 
+            since=parse_date(self.arg_space.since), until=parse_date(self.arg_space.until))
+        print ("journal: ", len(row_list), " jobs found")
+        return row_list
+
+
+
+    def download_jobs(self, doc_id, job_ids, calc_dir, download_dict, log_lines, transfer_executor=None, monitor=None,
+            job_dict=None):
+        """
+        download jobs
+
+        download result files of jobs in one document into calc directory,
+        filters are taken from the download dictionary and the lines for the log file
+        are added to the log lines, job names and local result directories are returned
+
+        the files are transferred in the given shared pool with its monitor, or in an own pool,
+        job ids which are not in the document are skipped with a warning
+        """
+        # without shared pool the files of the jobs are transferred in an own pool
+        if transfer_executor is None:
+            monitor = TransferMonitor("download", self.arg_space.rate_limit, self.profiler, metrics=self.metrics)
+            with ThreadPoolExecutor(max_workers=max(1, self.arg_space.transfers)) as executor:
+                job_list = self.download_jobs(doc_id, job_ids, calc_dir, download_dict, log_lines, executor, monitor,
+                    job_dict)
+            monitor.report()
+            return job_list
         log_lines.append("doc ids and job ids:")
         log_lines.append(" " + str(doc_id))
         for j in job_ids:
             log_lines.append("  " +  str(j))
         log_lines.append("calc dir: " + calc_dir)
-        # get files from document and jobs
-        doc_obj = self.my_user.load_document(doc_id)
-        job_dict = doc_obj.list_jobs()
+        # get files from document and jobs, result lists of all jobs are requested in parallel,
+        # job names and results of finished jobs are taken from the cache, so that the document
+        # is only loaded if something is needed from nexus
+        if job_dict is None:
+            job_dict = self.get_document_content(doc_id)[0]
+        # a cached document can miss new jobs, it is requested again before jobs are skipped
+        if any([job_id not in job_dict for job_id in job_ids]):
+            job_dict = self.load_document_content(doc_id)[0]
+        for job_id in [job_id for job_id in job_ids if job_id not in job_dict]:
+            print ("WARNING: job ", job_id, " not found in document ", doc_id)
+            log_lines.append("job " + job_id + " not found in document " + doc_id)
+        job_ids = [job_id for job_id in job_ids if job_id in job_dict]
+        doc_lock = threading.Lock()
+        doc_objs = []
+        def get_doc_obj():
+            with doc_lock:
+                if len(doc_objs) == 0:
+                    doc_objs.append(self.load_document(doc_id))
+                return doc_objs[0]
+        def get_job_results(job_id):
+            result_list = self.cache.get_results(job_id)
+            if result_list is None:
+                doc_obj = get_doc_obj()
+                result_list = [str(entry) for entry in self.request("list_job_results", doc_obj.list_job_results, 
+                    job_id, cat="job", job_id=job_id)]
+                if is_terminal_status(job_dict[job_id]['status']):
+                    self.cache.put_results(job_id, result_list)
+            return result_list
         print ("get files from doc/jobs ...")
-        for job_id in job_ids:
+        with ThreadPoolExecutor(max_workers=max(1, self.arg_space.workers)) as executor:
+            result_lists = list(executor.map(get_job_results, job_ids))
+        # collect all result files of all jobs, files already complete in manifest are skipped
+        manifest = DownloadManifest(calc_dir)
+        download_list = []
+        job_list = []
+        for job_id, job_result_files in zip(job_ids, result_lists):
             job_name = job_dict[job_id]['name']
             print ("start download of files from job_id/job_name: ", job_id, " / ", job_name)
             log_lines.append("start download of files from job_id/job_name: "+job_id+" / "+job_name)
-            job_result_files = doc_obj.list_job_results(job_id)
-            print ("content of job result files ...")
             # create locally the result directory
             local_res_dir = calc_dir + "/" + "compute/results/" + job_name
             os.makedirs(local_res_dir, exist_ok=True)
-            # loop ove all result files, download to local
+            job_list.append((job_name, local_res_dir))
             for job_file in job_result_files:
                 target = calc_dir + "/" + job_file  
-                print ("  ",target)
-                log_lines.append("  " + target)
-                status = doc_obj.download_file(document_path=job_file,sink=target,progress=download_progress)      
-                print ("status: ", status)
+                if not filter_result_file(job_file, download_dict['INCLUDE'], download_dict['EXCLUDE']):
+                    log_lines.append("  " + target + "  filtered")
+                elif manifest.is_complete(job_file):
+                    print ("  ", target, " complete")
+                    log_lines.append("  " + target + "  complete")
+                else:
+                    print ("  ", target)
+                    log_lines.append("  " + target)
+                    download_list.append(job_file)
+        # download all missing files of all jobs in the transfer pool
+        print ("download ", len(download_list), " files ...")
+        future_dict = {}
+        for job_file in download_list:
+            future = transfer_executor.submit(self.download_file, get_doc_obj(), job_file, calc_dir, monitor, manifest,
+                download_dict['MAX_SIZE'])
+            future_dict[future] = job_file
+        # a failed file does not stop the other files, it is downloaded with the next run
+        for future in as_completed(future_dict):
+            try:
+                status = future.result()
+            except Exception as e:
+                monitor.finish(calc_dir + "/" + future_dict[future], failed=True)
+                print ("\n  ERROR: ", future_dict[future], " failed: ", e)
+                log_lines.append("  " + calc_dir + "/" + future_dict[future] + "  failed: " + str(e))
+                continue
+            monitor.finish(calc_dir + "/" + future_dict[future])
+            if status == "SKIPPED":
+                print ("\n  ", future_dict[future], " skipped, larger than maximum size")
+                log_lines.append("  " + calc_dir + "/" + future_dict[future] + "  skipped, larger than maximum size")
         # close open document
-        doc_obj.close() 
-        # write log file
-        file_out = open("ncw_output_download.txt", 'w')
-        file_out.writelines([l+"\n" for l in log_lines])
-        file_out.close()
+        for doc_obj in doc_objs:
+            doc_obj.close() 
+        return job_list
 
 
 
+    def post_process(self, job_list):
+        """
+        post process
 
+        scan the .f06, .f04 and .log files of the downloaded jobs for fatal messages,
+        warnings, cpu and wall time, peak memory and convergence, the jobs are scanned
+        in a process pool and the summary table is printed and written into ncw_output_post.txt
 
-# =======================================================================================
+        the summary of a job is kept in its directory, jobs with unchanged files are not scanned again
+        """
+        from concurrent.futures import ProcessPoolExecutor
+        job_files = {}
+        for job_name, job_dir in job_list:
+            if os.path.isdir(job_dir):
+                job_files[job_dir] = get_post_files(job_dir)
+        job_list = [(job_name, job_dir) for job_name, job_dir in job_list if len(job_files.get(job_dir, [])) > 0]
+        if len(job_list) == 0:
+            return
+        summary_dict = {}
+        for job_name, job_dir in job_list:
+            summary = read_post_summary(job_dir, job_files[job_dir])
+            if summary is not None:
+                summary_dict[job_dir] = summary
+        scan_list = [job_dir for job_name, job_dir in job_list if job_dir not in summary_dict]
+        print ("post processing of ", len(job_list), " jobs, ", len(scan_list), " jobs to scan ...")
+        workers = max(1, min(self.arg_space.workers, os.cpu_count() or 1, len(scan_list)))
+        with self.profiler.span("post_process", "phase", jobs=len(scan_list)):
+            if len(scan_list) > 0:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    for job_dir, summary in zip(scan_list, executor.map(scan_job_results, scan_list)):
+                        write_post_summary(job_dir, job_files[job_dir], summary)
+                        summary_dict[job_dir] = summary
+        summaries = [summary_dict[job_dir] for job_name, job_dir in job_list]
+        line_list = ["%-30s %7s %8s %10s %10s %12s  %s" % ("job", "fatal", "warning", "cpu [s]", "wall [s]",
+            "memory [MB]", "status")]
+        for (job_name, job_dir), summary in zip(job_list, summaries):
+            values = []
+            for key in ("cpu", "wall", "memory"):
+                values.append("-" if summary[key] is None else "%.1f" % summary[key])
+            line_list.append("%-30s %7d %8d %10s %10s %12s  %s" % (job_name, summary["fatal"], summary["warning"],
+                values[0], values[1], values[2], summary["status"]))
+        print ("")
+        for line in line_list:
+            print (line)
+        file_out = open("ncw_output_post.txt", 'w')
+        file_out.writelines([l+"\n" for l in line_list])
+        file_out.close()
 
 
 
 
 
-def get_help():
-    """
-    get help
-    """
-    print (" ")
-    print ("Nexus Compute Wrapper")
-    print (" ")
-    print ("options:")
-    print ("--action   <ACTION>     STATUS/SUBMIT/DOWNLOAD")
-    print ("--file     <FILENAME>   needed for SUBMIT/DOWNLOAD")
-    print ("--token    <TOKENFILE>  contains token")
-    print (" ")
-    print ("use optional ncwrc  or  .ncwrc  file to activate token without token argument")
-    print (" ")
-    print ("examples running script: ")
-    print ("   --action=SUBMIT --file=submit_file.txt")
-    print ("   --action=STATUS --token=token_file.txt")
-    print (" ")
+    def download_file(self, doc_obj, job_file, calc_dir, monitor, manifest, max_size=0):
+        """
+        download file
 
+        download a single result file into a temporary .part file which is renamed
+        after a complete transfer, transient errors are tried again (--retries) with backoff,
+        the complete file is recorded in the download manifest
 
+        if the client can continue a download at an offset, an interrupted transfer
+        is resumed at the size of the .part file, also the .part file of a previous run,
+        otherwise the file is downloaded again from the start
 
+        the result list does not contain file sizes, so a maximum size is checked
+        with the total size of the first progress callback and the transfer is stopped
+        """
+        target = calc_dir + "/" + job_file
+        part_file = target + ".part"
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        resume = supports_offset(doc_obj.download_file)
+        def download():
+            options = {}
+            if resume and os.path.exists(part_file):
+                options["offset"] = os.path.getsize(part_file)
+            with self.profiler.span("download_file", "file", file=job_file, **options):
+                status = doc_obj.download_file(document_path=job_file, sink=part_file, 
+                    progress=monitor.download_callback(target, max_size), **options)
+            if status is False or not os.path.exists(part_file):
+                raise ConnectionError("download of " + job_file + " interrupted, status: " + str(status))
+            return status
+        try:
+            status = retry_call(download, max(0, self.arg_space.retries), "download of " + job_file)
+        except TransferSkipped:
+            if os.path.exists(part_file):
+                os.remove(part_file)
+            return "SKIPPED"
+        os.replace(part_file, target)
+        manifest.add(job_file)
+        return status
 
 
-def arg_handler():
-    """
-    argument handler
-    
-    possible arguments:
-        -h --help
-        -a --action   ACTION  ('STATUS','SUBMIT','DOWNLOAD')
-        -f --file     action_file_name
-        -t --token    token_file_name    
-    if actions are: SUBMIT, DOWNLOAD a file is needed, which defines further information for this action
-    """
-    dir_current = os.getcwd()
-    dir_script = os.path.dirname(os.path.realpath(__file__))
-    term_program = os.getenv("TERM_PROGRAM")
-    # setup of argparse
-    parser = argparse.ArgumentParser(description='Nexus Compute Wrapper')
-    parser.add_argument('-a', '--action', choices=['STATUS','SUBMIT','DOWNLOAD'], help='Action to perform')
-    parser.add_argument('-f', '--file', help='Define Actionfile for SUBMIT/DOWNLOAD')
-    parser.add_argument('-t', '--token', type=str, help='Token File which contains token')
-    parser.add_argument('-d', '--debug', action="store_true", help='Debug action turned on')
-    args = parser.parse_args()            
-    # debug information
-    if args.debug:
-        print ("========== DEBUG is ON ...")
-        print (dir_current)
-        print (dir_script)
-        print (term_program)
-        print (type(parser), type(args))
-        print ("ARGUMENTS: ", args)
-        print ("ARG VARs:  ", args.action, args.file, args.token, args.debug)
-        print ("==========")
-    # action handling, SUBMIT and DOWNLOAD require an action file 
-    if args.action:
-        print (args.action)
-        if args.action == "SUBMIT" or args.action == "DOWNLOAD":
-            print (args.file)
-            if os.path.exists(args.file):
-                print (" action file found...")
-            else:
-                print (" ERROR: action file not found ...\n")
-                args = parser.parse_args(['-h'])               
-    # token handling      
-    if args.token:
-        print (args.token)
-        if os.path.exists(args.token):
-            print (" token file found ...")
-        else:
-            print (" WARNING: token file not found ...")
-    if not args.token:
-        print ("no args.token, try to read rc token file ...")
-        if os.path.exists(dir_script + "/ncwrc"):
-            print (" rc token file found ...")
-        else: 
-            print (" rc token file not found ...\n")
-            args = parser.parse_args(['-h'])                           
-    # return argparse Namespace object         
-    return args
- 
 
 
 
+# WATCH =================================================================================
 
-def progress(speed, elapsed_time, transferred_size):
-    """
-    upload progress
-    """
-    s = str(speed/1000**2)
-    e = str(elapsed_time)
-    t = str(transferred_size/1000**2)
-    # with open('save_job_status_messages.txt','a') as status_file:
-    #    status_file.write(s + "  " + e + "  " + t + "\n")
-    # print ("%.2fMB/s %.2fs %.2fMB" % (speed/1000**2, elapsed_time, transferred_size/1000**2))
 
 
+    def watch_jobs(self):
+        """
+        watch jobs
 
+        - reads a submit output file or download file
+        - polls the listed jobs until they are finished
+        - downloads the results of a job as soon as it is done
 
+        the poll interval of a job grows with the time the job is already watched,
+        short jobs are seen early and long jobs do not cause many requests,
+        jobs of several documents are watched at the same time
+        """
+        print ("watch jobs ...")
+        download_dict = self.get_download_dict()
+        if len(download_dict['JOB_IDS']) == 0 or len(download_dict['DOCS']) == 0:
+            print ("ERROR: no doc id or job ids for watch defined ...")
+            write_report_file(download_dict, "ncw_output_watch.err", "CR", "PRINT")
+            sys.exit(1)
+        # variables
+        log_lines = []
+        poll_min = self.arg_space.poll_min
+        poll_max = max(poll_min, self.arg_space.poll_max)
+        start_time = time.monotonic()
+        watch_dict = {}
+        for doc_entry in download_dict["DOCS"]:
+            for job_id in doc_entry["JOB_IDS"]:
+                watch_dict[job_id] = {"doc": doc_entry, "status": "", "next_poll": start_time, "start": start_time}
+        # a failed request is tried again with the next poll
+        def poll_document(doc_id):
+            try:
+                return self.load_document_content(doc_id)[0]
+            except Exception as e:
+                print ("WARNING: poll of document ", doc_id, " failed: ", e)
+                return None
+        # results are downloaded in the background while the other jobs are polled,
+        # every download writes its own log lines, they are added to the log when it is done
+        download_futures = {}
+        job_list = []
+        def collect_downloads(futures):
+            for future in futures:
+                job_id, job_lines = download_futures.pop(future)
+                log_lines.extend(job_lines)
+                try:
+                    job_list.extend(future.result())
+                except Exception as e:
+                    print ("ERROR: download of job ", job_id, " failed: ", e)
+                    log_lines.append("download of job " + job_id + " failed: " + str(e))
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, self.arg_space.workers)) as poll_executor, \
+                    ThreadPoolExecutor(max_workers=max(1, self.arg_space.workers)) as download_executor:
+                while len(watch_dict) > 0:
+                    now = time.monotonic()
+                    # one request per document covers all watched jobs of the document
+                    doc_ids = []
+                    for job_id, watch in watch_dict.items():
+                        if watch["next_poll"] <= now and watch["doc"]["DOC_ID"] not in doc_ids:
+                            doc_ids.append(watch["doc"]["DOC_ID"])
+                    for doc_id, job_dict in zip(doc_ids, poll_executor.map(poll_document, doc_ids)):
+                        for job_id, watch in list(watch_dict.items()):
+                            if watch["doc"]["DOC_ID"] != doc_id:
+                                continue
+                            if job_dict is None:
+                                watch["next_poll"] = now + poll_min
+                                continue
+                            if job_id not in job_dict:
+                                print ("WARNING: job ", job_id, " not found in document ", doc_id)
+                                log_lines.append("job " + job_id + " not found in document " + doc_id)
+                                del watch_dict[job_id]
+                                continue
+                            status = str(job_dict[job_id]['status']).split(".")[-1]
+                            if status != watch["status"]:
+                                watch["status"] = status
+                                line = datetime.now().strftime("%Y-%m-%d %H:%M:%S") + "  job name/id/status: " + \
+                                    job_dict[job_id]['name'] + "  " + job_id + "  " + status
+                                print (line)
+                                log_lines.append(line)
+                            if status == "Done":
+                                job_lines = []
+                                future = download_executor.submit(self.download_jobs, doc_id, [job_id],
+                                    watch["doc"]["CALC_DIR"], download_dict, job_lines)
+                                download_futures[future] = (job_id, job_lines)
+                                del watch_dict[job_id]
+                            elif is_terminal_status(status):
+                                del watch_dict[job_id]
+                            else:
+                                interval = min(poll_max, max(poll_min, 0.1 * (now - watch["start"])))
+                                watch["next_poll"] = now + interval
+                    collect_downloads([future for future in download_futures if future.done()])
+                    # wait for the next job to poll
+                    if len(watch_dict) > 0:
+                        next_poll = min([watch["next_poll"] for watch in watch_dict.values()])
+                        time.sleep(max(0.0, next_poll - time.monotonic()))
+                collect_downloads(list(download_futures))
+        finally:
+            # write log file, also when the watch is stopped
+            file_out = open("ncw_output_watch.txt", 'w')
+            file_out.writelines([l+"\n" for l in log_lines])
+            file_out.close()
+        # summary of the solver output files
+        if not self.arg_space.no_post:
+            self.post_process(job_list)
 
-def download_progress(transferred_size, total_size, speed, elapsed_time):
+
+
+
+
+# SWEEP =================================================================================
+
+
+
+    def sweep_jobs(self, sessions=None):
+        """
+        sweep jobs
+
+        - collects the decks of directories, glob patterns and submit files into a local queue
+        - uploads and submits the next job as soon as less than --max-running jobs are running
+        - polls the running jobs until they are finished
+
+        the queue is kept in ncw_sweep_queue.json in the current directory and saved with
+        every change, an interrupted sweep continues with the same call or without sources,
+        decks which are already in the queue are not added again
+
+        with the sessions of a session pool every account runs up to --max-running jobs,
+        a new job is started in the account with the least running jobs, jobs of a document id
+        in the account of the document, the account of a job is kept in the queue
+        """
+        print ("sweep jobs ...")
+        queue = SweepQueue("ncw_sweep_queue.json")
+        sources = self.arg_space.sources
+        if self.arg_space.file:
+            sources = [self.arg_space.file] + sources
+        entry_list, errors = get_sweep_entries(sources)
+        if len(errors) > 0:
+            for error in errors:
+                print (error)
+            print ("ERROR: sweep not started, ", len(errors), " errors in the sources ...")
+            sys.exit(1)
+        for entry in entry_list:
+            queue.add(entry)
+        if len(queue.entries) == 0:
+            print ("ERROR: no decks for sweep defined ...")
+            sys.exit(1)
+        # variables
+        sessions = sessions or [self]
+        session_dict = dict([(session.cache.account, session) for session in sessions])
+        max_running = max(1, self.arg_space.max_running)
+        poll_min = self.arg_space.poll_min
+        next_poll = time.monotonic() + poll_min
+        start_futures = {}
+        # state shared by the start tasks, files are uploaded once per document
+        sweep = {"queue": queue, "lock": threading.Lock(), "doc_objs": {}, "remote_files": {}, "uploads": {},
+            "locals": {}, "upload_index": UploadIndex(),
+            "monitor": TransferMonitor("upload", self.arg_space.rate_limit, self.profiler, metrics=self.metrics)}
+        # running jobs of a queue without accounts belong to a single session
+        for entry in queue.entries:
+            if entry.get("account", "") == "" and entry["job_id"] != "" and len(sessions) == 1:
+                entry["account"] = self.cache.account
+        doc_accounts = {}
+        def get_account(entry, load):
+            if entry.get("account", "") in session_dict:
+                return entry["account"]
+            if entry["doc_id"] != "" and len(sessions) > 1:
+                if len(doc_accounts) == 0:
+                    for account, session in session_dict.items():
+                        for entry_dict in session.request("list_documents", session.my_user.list_documents):
+                            doc_accounts[entry_dict['id']] = account
+                return doc_accounts.get(entry["doc_id"])
+            return min(load, key=load.get)
+        print ("queue: ", queue.summary())
+        with ThreadPoolExecutor(max_workers=max(1, self.arg_space.transfers)) as upload_executor, \
+                ThreadPoolExecutor(max_workers=max_running * len(sessions)) as start_executor:
+            sweep["upload_executor"] = upload_executor
+            while True:
+                # started jobs are running now or failed
+                for future in [future for future in start_futures if future.done()]:
+                    entry = start_futures.pop(future)
+                    try:
+                        entry["job_id"] = future.result()
+                        entry["state"] = "running"
+                    except Exception as e:
+                        print ("ERROR: submission of ", entry["job"], " failed: ", e)
+                        entry["state"] = "failed"
+                        entry["status"] = str(e)
+                    with sweep["lock"]:
+                        queue.save()
+                # one request per document covers all running jobs of the document
+                running = queue.select("running")
+                for entry in running:
+                    if entry.get("account", "") not in session_dict:
+                        print ("ERROR: account of ", entry["job"], " not in the session pool")
+                        entry["state"] = "failed"
+                        entry["status"] = "account not in session pool"
+                running = queue.select("running")
+                if len(running) > 0 and time.monotonic() >= next_poll:
+                    for doc_id in sorted(set([entry["doc_id"] for entry in running])):
+                        session = session_dict[[entry for entry in running if entry["doc_id"] == doc_id][0]["account"]]
+                        try:
+                            job_dict = session.load_document_content(doc_id)[0]
+                        except Exception as e:
+                            print ("WARNING: poll of document ", doc_id, " failed: ", e)
+                            continue
+                        for entry in running:
+                            if entry["doc_id"] != doc_id or entry["job_id"] not in job_dict:
+                                continue
+                            status = job_dict[entry["job_id"]]['status'].split(".")[-1]
+                            if status != entry["status"]:
+                                print (datetime.now().strftime("%Y-%m-%d %H:%M:%S") + "  job name/id/status: " + 
+                                    entry["job"] + "  " + entry["job_id"] + "  " + status)
+                                entry["status"] = status
+                            if is_terminal_status(status):
+                                entry["state"] = "finished"
+                    with sweep["lock"]:
+                        queue.save()
+                    running = queue.select("running")
+                    next_poll = time.monotonic() + poll_min
+                # free slots of the accounts are filled with queued jobs, jobs in upload count as running
+                load = dict([(account, 0) for account in session_dict])
+                for entry in running + list(start_futures.values()):
+                    load[entry["account"]] += 1
+                queued = queue.select("queued")
+                for entry in queued:
+                    if min(load.values()) >= max_running:
+                        break
+                    account = get_account(entry, load)
+                    if account is None:
+                        print ("ERROR: document ", entry["doc_id"], " of ", entry["job"], " not found in the accounts")
+                        entry["state"] = "failed"
+                        entry["status"] = "document not found"
+                        continue
+                    if load[account] >= max_running:
+                        continue
+                    load[account] += 1
+                    entry["account"] = account
+                    entry["state"] = "uploading"
+                    start_futures[start_executor.submit(session_dict[account].start_sweep_entry, entry, sweep)] = entry
+                queued = queue.select("queued")
+                if len(running) == 0 and len(start_futures) == 0 and len(queued) == 0:
+                    break
+                # wait for the next poll or a started job
+                timeout = max(0.0, next_poll - time.monotonic())
+                if len(start_futures) > 0:
+                    wait(list(start_futures), timeout=timeout if len(running) > 0 else None, 
+                        return_when=FIRST_COMPLETED)
+                else:
+                    time.sleep(timeout)
+        sweep["monitor"].report()
+        for doc_obj in sweep["doc_objs"].values():
+            doc_obj.close()
+        print ("queue: ", queue.summary())
+        # log file in the format of a download file
+        log_lines = []
+        for doc_id in queue.doc_ids():
+            entries = [entry for entry in queue.entries if entry["doc_id"] == doc_id]
+            log_lines.append("DOC_ID:" + doc_id)
+            log_lines.append("CALC_DIR:" + entries[0]["calc_dir"])
+            for entry in entries:
+                log_lines.append("submitted " + entry["job"] + " with file " + os.path.basename(entry["deck"]) +
+                    "  " + entry["state"] + " " + entry["status"])
+                if entry["job_id"] != "":
+                    log_lines.append(" JOB_ID:" + entry["job_id"])
+        file_out = open("ncw_output_sweep.txt", 'w')
+        file_out.writelines([l+"\n" for l in log_lines])
+        file_out.close()
+
+
+
+
+    def start_sweep_entry(self, entry, sweep):
+        """
+        start sweep entry
+
+        upload the deck and its includes into the document and submit the job,
+        files of other jobs of the sweep in the same document are uploaded only once,
+        the job id is returned
+        """
+        with sweep["lock"]:
+            # documents of the sweep are created once per account
+            doc_key = self.cache.account + "/" + entry["doc"]
+            doc_id = entry["doc_id"]
+            if doc_id == "":
+                doc_id = sweep["queue"].documents.get(doc_key, "")
+            if doc_id == "":
+                with self.profiler.span("new_document", "call"):
+                    doc_id = self.my_user.new_document(entry["doc"])
+                print ("created document: ", entry["doc"], " ", doc_id)
+                sweep["queue"].documents[doc_key] = doc_id
+            entry["doc_id"] = doc_id
+            if doc_id not in sweep["doc_objs"]:
+                sweep["doc_objs"][doc_id] = self.load_document(doc_id)
+                sweep["remote_files"][doc_id] = [str(f) for f in self.request("list_files", 
+                    sweep["doc_objs"][doc_id].list_files, doc_id=doc_id)]
+            doc_obj = sweep["doc_objs"][doc_id]
+            futures = []
+            for local, remote in entry["files"]:
+                key = (doc_id, remote)
+                if sweep["locals"].setdefault(key, os.path.realpath(local)) != os.path.realpath(local):
+                    raise ValueError("document path " + remote + " already used for " + sweep["locals"][key])
+                if key not in sweep["uploads"]:
+                    sweep["uploads"][key] = sweep["upload_executor"].submit(self.upload_sweep_file, 
+                        doc_obj, doc_id, local, remote, sweep)
+                futures.append(sweep["uploads"][key])
+        # job settings from deck analysis beside the uploads
+        analysis = analyze_deck(entry["files"][0][0], entry["files"][1:], sweep["upload_index"])
+        settings, reasons = get_job_settings(analysis, self.get_solver_configs(doc_id), entry.get("settings", {}))
+        print (" job settings of ", entry["job"], ": ", ", ".join(reasons))
+        for future in futures:
+            future.result()
+        job_id = self.submit_job(doc_obj, entry["job"], [remote for local, remote in entry["files"]], settings)
+        # document has new jobs and files
+        self.cache.remove_document(doc_id)
+        self.journal.add(doc_id, entry["doc"], job_id, entry["job"], self.arg_space.tag or sweep["queue"].sweep_doc,
+            entry["calc_dir"], [{"local": local, "remote": remote, "sha256": sweep["upload_index"].get_hash(local)} 
+                for local, remote in entry["files"]], settings)
+        return job_id
+
+
+
+
+    def upload_sweep_file(self, doc_obj, doc_id, local_file_name, remote_name, sweep):
+        """
+        upload sweep file
+
+        upload a file of the sweep, a file with unchanged content in the document is reused
+        """
+        upload_index = sweep["upload_index"]
+        file_hash = upload_index.get_hash(local_file_name)
+        if not self.arg_space.no_dedup and upload_index.is_current(file_hash, doc_id, remote_name, 
+                sweep["remote_files"][doc_id]):
+            print ("  ", local_file_name, " unchanged, reuse ", remote_name)
+            return
+        callback = sweep["monitor"].upload_callback(local_file_name, os.path.getsize(local_file_name))
+        self.upload_file(doc_obj, local_file_name, remote_name, callback)
+        sweep["monitor"].finish(local_file_name)
+        upload_index.add(file_hash, doc_id, remote_name)
+
+
+
+
+
+# TAIL ==================================================================================
+
+
+
+    def tail_jobs(self):
+        """
+        tail jobs
+
+        - reads a submit output file or download file
+        - fetches the .f04 and .log files of the running jobs every --poll-min seconds
+        - prints only the new lines of the files with job name and file name
+
+        a file is fetched again only if its size has changed, only the new bytes are fetched
+        if the client can continue a download at an offset, the fetched files are kept in ncw_tail/<job name> of the calc directory,
+        the tail ends when all jobs are finished or with ctrl-c
+        """
+        print ("tail jobs ...")
+        download_dict = get_download_info(self.arg_space.file)
+        if has_journal_filter(self.arg_space):
+            self.add_journal_jobs(download_dict)
+        self.select_download_jobs(download_dict)
+        if len(download_dict['JOB_IDS']) == 0 or len(download_dict['DOCS']) == 0:
+            print ("ERROR: no doc id or job ids for tail defined ...")
+            write_report_file(download_dict, "ncw_output_tail.err", "CR", "PRINT")
+            sys.exit(1)
+        # variables
+        patterns = self.arg_space.include or list(TAIL_PATTERNS)
+        tail_dict = {}
+        for doc_entry in download_dict["DOCS"]:
+            for job_id in doc_entry["JOB_IDS"]:
+                tail_dict[job_id] = {"doc": doc_entry, "name": job_id, "status": "", "files": {}}
+        doc_objs = {}
+        try:
+            while len(tail_dict) > 0:
+                poll_time = time.monotonic()
+                for doc_id in sorted(set([tail["doc"]["DOC_ID"] for tail in tail_dict.values()])):
+                    try:
+                        job_dict = self.load_document_content(doc_id)[0]
+                        if doc_id not in doc_objs:
+                            doc_objs[doc_id] = self.load_document(doc_id)
+                    except Exception as e:
+                        print ("WARNING: poll of document ", doc_id, " failed: ", e)
+                        continue
+                    for job_id, tail in list(tail_dict.items()):
+                        if tail["doc"]["DOC_ID"] != doc_id:
+                            continue
+                        if job_id not in job_dict:
+                            print ("WARNING: job ", job_id, " not found in document ", doc_id)
+                            del tail_dict[job_id]
+                            continue
+                        tail["name"] = job_dict[job_id]['name']
+                        status = job_dict[job_id]['status'].split(".")[-1]
+                        if status != tail["status"]:
+                            print (datetime.now().strftime("%Y-%m-%d %H:%M:%S") + "  job name/id/status: " + 
+                                tail["name"] + "  " + job_id + "  " + status)
+                            tail["status"] = status
+                        self.tail_job(doc_objs[doc_id], job_id, tail, patterns)
+                        # the files of a finished job are fetched a last time
+                        if is_terminal_status(status):
+                            del tail_dict[job_id]
+                if len(tail_dict) > 0:
+                    time.sleep(max(0.0, poll_time + self.arg_space.poll_min - time.monotonic()))
+        except KeyboardInterrupt:
+            print ("\ntail stopped ...")
+        for doc_obj in doc_objs.values():
+            doc_obj.close()
+
+
+
+
+    def tail_job(self, doc_obj, job_id, tail, patterns):
+        """
+        tail job
+
+        fetch the changed result files of a job which match the patterns and print the new lines,
+        an incomplete last line is printed with the next fetch
+
+        a file with the same size in the result list as the fetched file is not transferred,
+        if the client can continue a download at an offset only the new bytes are fetched and
+        appended, otherwise (fallback) the whole file is downloaded again and the transfer is
+        stopped with the first progress information if the size has not changed
+        """
+        try:
+            result_list = [get_result_entry(entry) for entry in self.request("list_job_results", 
+                doc_obj.list_job_results, job_id, cat="job", job_id=job_id)]
+        except Exception as e:
+            print ("WARNING: result files of ", tail["name"], " not available: ", e)
+            return
+        local_dir = tail["doc"]["CALC_DIR"] + "/ncw_tail/" + tail["name"]
+        resume = supports_offset(doc_obj.download_file)
+        for job_file, size in result_list:
+            if not filter_result_file(job_file, patterns, self.arg_space.exclude or []):
+                continue
+            tail_file = tail["files"].setdefault(job_file, {"size": -1, "offset": 0})
+            if size is not None and size == tail_file["size"]:
+                continue
+            target = local_dir + "/" + os.path.basename(job_file)
+            os.makedirs(local_dir, exist_ok=True)
+            options = {}
+            if resume and tail_file["size"] > 0 and (size is None or size > tail_file["size"]) and \
+                    os.path.exists(target):
+                options["offset"] = tail_file["size"]
+            def callback(transferred_size, total_size, speed, elapsed_time):
+                if total_size == tail_file["size"]:
+                    raise TransferSkipped(job_file)
+                # a rewritten shorter file is fetched from the start with the next poll
+                if total_size < options.get("offset", 0):
+                    tail_file["size"] = -1
+                    raise TransferSkipped(job_file)
+            try:
+                with self.profiler.span("download_file", "file", file=job_file, **options):
+                    doc_obj.download_file(document_path=job_file, sink=target, progress=callback, **options)
+            except TransferSkipped:
+                continue
+            except Exception as e:
+                print ("WARNING: fetch of ", job_file, " failed: ", e)
+                continue
+            if not os.path.exists(target):
+                continue
+            tail_file["size"] = os.path.getsize(target)
+            # a new or rewritten file is printed from the start
+            if tail_file["size"] < tail_file["offset"]:
+                tail_file["offset"] = 0
+            file_in = open(target, "rb")
+            file_in.seek(tail_file["offset"])
+            content = file_in.read()
+            file_in.close()
+            end = content.rfind(b"\n") + 1
+            for line in content[:end].decode("latin-1").splitlines():
+                print ("[" + tail["name"] + " " + os.path.basename(job_file) + "] " + line)
+            tail_file["offset"] += end
+
+
+
+
+
+# PRUNE =================================================================================
+
+    def prune_documents(self):
+        """
+        prune documents
+
+        delete old documents of the account, so listing and STATUS stay fast,
+        a document is deleted only if all given retention rules allow it:
+        - --older-than DAYS  the newest job of the document is older than DAYS
+        - --keep-last N      the N newest documents are kept
+        - --prune-status     all jobs have one of the statuses (default all finished statuses),
+                             documents with running jobs are always kept
+        - --downloaded       all result files (--include/--exclude) are complete in the download
+                             manifest of the calc directory of the journal or of the given sources
+
+        the time of a document is the latest submission in the journal or the timestamp
+        of the default names doc_<time> and job_<time>, documents without time are kept,
+        with --tag, --job-name, --since, --until only documents of these journal jobs are pruned,
+        the documents are deleted in parallel (--workers), right before the deletion the jobs are requested
+        again without cache and documents with new or changed jobs are kept,
+        with --dry-run only the preview is written,
+        the result is written into ncw_output_prune.txt and the number of deleted documents is returned
+        """
+        print ("prune documents ...")
+        if self.arg_space.older_than is None and self.arg_space.keep_last is None:
+            print ("ERROR: PRUNE needs --older-than or --keep-last ...")
+            sys.exit(1)
+        delete_document = getattr(self.my_user, "delete_document", None)
+        if delete_document is None and not self.arg_space.dry_run:
+            print ("ERROR: nexus compute client can not delete documents, only --dry-run is possible ...")
+            sys.exit(1)
+        doc_list = self.request("list_documents", self.my_user.list_documents)
+        # submission time and calc directories of the documents in the journal
+        journal_dict = {}
+        for row in self.journal.find():
+            journal_entry = journal_dict.setdefault(row["doc_id"], {"submitted": 0.0, "calc_dirs": set()})
+            journal_entry["submitted"] = max(journal_entry["submitted"], row["submitted"])
+            journal_entry["calc_dirs"].add(row["calc_dir"])
+        if has_journal_filter(self.arg_space):
+            doc_ids = set([row["doc_id"] for row in self.find_journal_jobs()])
+            doc_list = [entry_dict for entry_dict in doc_list if entry_dict['id'] in doc_ids]
+        entry_list = []
+        for entry_dict, job_dict, files_in_doc in self.iter_document_status(doc_list, solver_configs=False):
+            journal_entry = journal_dict.get(entry_dict['id'], {"submitted": None, "calc_dirs": set()})
+            doc_time = get_document_time(entry_dict['name'], job_dict, journal_entry["submitted"])
+            entry_list.append({"doc_id": entry_dict['id'], "doc_name": entry_dict['name'], "jobs": job_dict, 
+                "time": doc_time, "calc_dirs": journal_entry["calc_dirs"], "reason": ""})
+        # newest documents first, documents without time are kept and listed first
+        entry_list.sort(key=lambda entry: -entry["time"] if entry["time"] is not None else -float("inf"))
+        index = 0
+        for entry in entry_list:
+            entry["reason"] = self.get_keep_reason(entry, index)
+            if entry["time"] is not None:
+                index += 1
+        # the result files are only checked for documents which are deleted by all other rules
+        if self.arg_space.downloaded:
+            manifests = {}
+            check_list = [entry for entry in entry_list if entry["reason"] == ""]
+            for entry in check_list:
+                for calc_dir in list(entry["calc_dirs"]) + self.arg_space.sources:
+                    if calc_dir not in manifests and os.path.exists(calc_dir + "/ncw_download_manifest.jsonl"):
+                        manifests[calc_dir] = DownloadManifest(calc_dir)
+            with ThreadPoolExecutor(max_workers=max(1, self.arg_space.workers)) as executor:
+                for entry, missing in zip(check_list, executor.map(lambda entry: self.get_missing_results(entry, 
+                        [manifests[d] for d in list(entry["calc_dirs"]) + self.arg_space.sources if d in manifests]), 
+                        check_list)):
+                    if missing > 0:
+                        entry["reason"] = str(missing) + " result files not downloaded"
+        delete_list = [entry for entry in entry_list if entry["reason"] == ""]
+        print ("documents: ", len(entry_list), "  to delete: ", len(delete_list))
+        # deletion in parallel, a failed deletion does not stop the others, the jobs of each document
+        # are requested again without cache right before, a document which changed since the listing is kept
+        if not self.arg_space.dry_run:
+            def delete(entry):
+                job_dict, files_in_doc = self.load_document_content(entry["doc_id"])
+                entry["reason"] = self.get_change_reason(entry, job_dict)
+                if entry["reason"] != "":
+                    return False
+                with self.profiler.span("delete_document", "call", doc_id=entry["doc_id"]):
+                    retry_call(lambda: delete_document(entry["doc_id"]), max(0, self.arg_space.retries), 
+                        "delete of document " + entry["doc_id"])
+                self.cache.remove_document(entry["doc_id"])
+                return True
+            with ThreadPoolExecutor(max_workers=max(1, self.arg_space.workers)) as executor:
+                future_dict = dict([(executor.submit(delete, entry), entry) for entry in delete_list])
+                for future in as_completed(future_dict):
+                    entry = future_dict[future]
+                    try:
+                        if future.result():
+                            print (" deleted: ", entry["doc_id"], " ", entry["doc_name"])
+                        else:
+                            print (" kept: ", entry["doc_id"], " ", entry["doc_name"], " ", entry["reason"])
+                    except Exception as e:
+                        print (" ERROR: deletion of ", entry["doc_id"], " failed: ", e)
+                        entry["reason"] = "deletion failed: " + str(e)
+        # output file, documents in order of time
+        action = "would delete" if self.arg_space.dry_run else "deleted"
+        line_list = ["documents: " + str(len(entry_list)), 
+            action + ": " + str(len([entry for entry in entry_list if entry["reason"] == ""]))]
+        for entry in entry_list:
+            doc_time = "-"
+            if entry["time"] is not None:
+                doc_time = datetime.fromtimestamp(entry["time"]).strftime("%Y-%m-%d %H:%M")
+            if entry["reason"] == "":
+                line_list.append(action + "  " + entry["doc_id"] + "  " + entry["doc_name"] + "  " + doc_time)
+            else:
+                line_list.append("kept  " + entry["doc_id"] + "  " + entry["doc_name"] + "  " + doc_time + 
+                    "  " + entry["reason"])
+        file_out = open("ncw_output_prune.txt", 'w')
+        file_out.writelines([l+"\n" for l in line_list])
+        file_out.close()
+        print ("prune result written to: ncw_output_prune.txt")
+        return len([entry for entry in entry_list if entry["reason"] == ""])
+
+
+
+    def get_keep_reason(self, entry, index):
+        """
+        get keep reason
+
+        reason why a document is kept by the retention rules, empty if it can be deleted,
+        index is the position of the document among the documents with time, newest first
+        """
+        statuses = TERMINAL_STATUS
+        if self.arg_space.prune_status:
+            statuses = [status.strip() for status in self.arg_space.prune_status.split(",")]
+        if entry["time"] is None:
+            return "time unknown"
+        if self.arg_space.keep_last is not None and index < self.arg_space.keep_last:
+            return "one of the " + str(self.arg_space.keep_last) + " newest documents"
+        if self.arg_space.older_than is not None and time.time() - entry["time"] < self.arg_space.older_than * 86400:
+            return "newer than " + str(self.arg_space.older_than) + " days"
+        for job_feat in entry["jobs"].values():
+            status = str(job_feat['status']).split(".")[-1]
+            if not is_terminal_status(status):
+                return "job " + job_feat['name'] + " " + status
+            if status not in statuses:
+                return "job " + job_feat['name'] + " " + status + " not in " + ",".join(statuses)
+        return ""
+
+
+
+    def get_change_reason(self, entry, job_dict):
+        """
+        get change reason
+
+        reason why a document is kept because its jobs changed since the listing,
+        job_dict is requested again from nexus, empty if the document can still be deleted
+        """
+        for job_id, job_feat in job_dict.items():
+            status = str(job_feat['status']).split(".")[-1]
+            if job_id not in entry["jobs"]:
+                return "new job " + job_feat['name'] + " " + status
+            if not is_terminal_status(status):
+                return "job " + job_feat['name'] + " " + status
+            if status != str(entry["jobs"][job_id]['status']).split(".")[-1]:
+                return "job " + job_feat['name'] + " changed to " + status
+        return ""
+
+
+
+    def get_missing_results(self, entry, manifests):
+        """
+        get missing results
+
+        number of result files of the document which are not complete in one of the download
+        manifests, the result lists are taken from the cache
+        """
+        include = self.arg_space.include or []
+        exclude = self.arg_space.exclude or []
+        missing = 0
+        doc_obj = None
+        for job_id, job_feat in entry["jobs"].items():
+            result_list = self.cache.get_results(job_id)
+            if result_list is None:
+                if doc_obj is None:
+                    doc_obj = self.load_document(entry["doc_id"])
+                result_list = [str(result) for result in self.request("list_job_results", doc_obj.list_job_results, 
+                    job_id, cat="job", job_id=job_id)]
+                self.cache.put_results(job_id, result_list)
+            for job_file in result_list:
+                if filter_result_file(job_file, include, exclude) and \
+                        not any([manifest.is_complete(job_file) for manifest in manifests]):
+                    missing += 1
+        if doc_obj is not None:
+            doc_obj.close()
+        return missing
+
+
+
+
+
+# =======================================================================================
+
+
+
+
+
+class Profiler():
+    """
+    profiler
+
+    records timing spans of phases, documents, jobs and files and the progress information
+    of transfers, the result is written as json trace file in Chrome trace format
+    (chrome://tracing or https://ui.perfetto.dev) and printed as summary table
+
+    without file name the profiler is switched off and the spans cost nearly nothing
+    """
+
+    def __init__(self, file_name=None):
+        self.file_name = file_name
+        self.enabled = file_name is not None
+        self.lock = threading.Lock()
+        self.start_time = time.perf_counter()
+        self.events = []
+        self.threads = {}
+        self.last_progress = {}
+
+
+
+    def get_tid(self):
+        """
+        get tid
+
+        small thread numbers for the trace viewer
+        """
+        ident = threading.get_ident()
+        if ident not in self.threads:
+            self.threads[ident] = len(self.threads) + 1
+            self.events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": self.threads[ident], 
+                "args": {"name": threading.current_thread().name}})
+        return self.threads[ident]
+
+
+
+    @contextmanager
+    def span(self, name, cat="call", **args):
+        """
+        span
+
+        record the time of the enclosed block as complete event
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self.lock:
+                self.events.append({"name": name, "cat": cat, "ph": "X", "pid": 1, "tid": self.get_tid(), 
+                    "ts": (start - self.start_time) * 1e6, "dur": (end - start) * 1e6, 
+                    "args": dict([(k, str(v)) for k,v in args.items()])})
+
+
+
+    def progress(self, name, speed, elapsed_time, transferred_size):
+        """
+        progress
+
+        record progress information of a transfer as counter event, at most twice per second
+        """
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        with self.lock:
+            if now - self.last_progress.get(name, 0.0) < 0.5:
+                return
+            self.last_progress[name] = now
+            self.events.append({"name": name, "cat": "progress", "ph": "C", "pid": 1, 
+                "ts": (now - self.start_time) * 1e6, "args": {"MB/s": speed/1000**2, 
+                "MB": transferred_size/1000**2, "elapsed": elapsed_time}})
+
+
+
+    def write(self):
+        """
+        write
+
+        write trace file and print summary table per span name
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            events = list(self.events)
+        file_out = open(self.file_name, "w")
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file_out)
+        file_out.close()
+        # summary
+        summary = {}
+        for event in events:
+            if event["ph"] != "X":
+                continue
+            entry = summary.setdefault((event["cat"], event["name"]), [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += event["dur"] / 1e6
+            entry[2] = max(entry[2], event["dur"] / 1e6)
+        print ("")
+        print ("profile written to: ", self.file_name)
+        print ("%-10s %-22s %8s %12s %10s %10s" % ("category", "span", "count", "total [s]", "mean [s]", "max [s]"))
+        for (cat, name), (count, total, maximum) in sorted(summary.items(), key=lambda x: -x[1][1]):
+            print ("%-10s %-22s %8d %12.3f %10.3f %10.3f" % (cat, name, count, total, total/count, maximum))
+        print ("wall time [s]: %.3f" % (time.perf_counter() - self.start_time))
+
+
+
+
+
+class StatusWriter():
+    """
+    status writer
+
+    write the status of documents into ncw_output_status.txt (text),
+    ncw_output_status.jsonl (jsonl) or ncw_output_status.csv (csv)
+    and print every line as soon as it is written, changes of --since-last
+    are written into ncw_output_status_changes.* in the same way
+
+    jsonl and csv have one record per document, job, file and solver configuration
+    with fields of STATUS_FIELDS, the job status is the name of the state (Done, Running, ...)
+    """
+
+    def __init__(self, output_format="text", name="ncw_output_status"):
+        self.output_format = output_format
+        self.account = None
+        extension = {"text": "txt", "jsonl": "jsonl", "csv": "csv"}[output_format]
+        self.file_out = open(name + "." + extension, "w", newline="")
+        if output_format == "csv":
+            self.write_line(",".join(STATUS_FIELDS))
+
+
+
+    def write_line(self, line):
+        self.file_out.write(line + "\n")
+        self.file_out.flush()
+        print (line)
+
+
+
+    def write_record(self, **fields):
+        """
+        write record
+
+        one record in jsonl or csv, jsonl has only the given fields, in csv missing fields are empty,
+        after set_account the records have the account
+        """
+        import csv
+        if self.account is not None:
+            fields.setdefault("account", self.account)
+        record = dict([(field, fields.get(field, "")) for field in STATUS_FIELDS])
+        if self.output_format == "jsonl":
+            self.write_line(json.dumps(dict([(field, fields[field]) for field in STATUS_FIELDS if field in fields])))
+        else:
+            line = io.StringIO()
+            csv.writer(line, lineterminator="").writerow([record[field] for field in STATUS_FIELDS])
+            self.write_line(line.getvalue())
+
+
+
+    def write_header(self, number_of_documents):
+        if self.output_format == "text":
+            self.write_line("number of documents: " + str(number_of_documents))
+
+
+
+    def write_document(self, doc_id, doc_name, job_dict, files_in_doc):
+        """
+        write document
+
+        document with its jobs and files
+        """
+        if self.output_format == "text":
+            self.write_line("  ")
+            self.write_line(" doc name/id: " + doc_name + "      " + doc_id)
+            self.write_line("  number of jobs: " + str(len(job_dict)))
+            for job_id, job_feat in job_dict.items():
+                self.write_line("   job name/id/status: "+job_feat['name']+"  " +job_id+"  "+job_feat['status'])
+            self.write_line("  files in document:")
+            for entry in files_in_doc:
+                self.write_line("   " + entry)
+            return
+        self.write_record(record="document", doc_id=doc_id, doc_name=doc_name, jobs=len(job_dict),
+            files=len(files_in_doc))
+        for job_id, job_feat in job_dict.items():
+            self.write_record(record="job", doc_id=doc_id, doc_name=doc_name, job_id=job_id,
+                job_name=job_feat['name'], status=str(job_feat['status']).split(".")[-1])
+        for entry in files_in_doc:
+            self.write_record(record="file", doc_id=doc_id, doc_name=doc_name, file=entry)
+
+
+
+    def set_account(self, account, number_of_documents):
+        """
+        set account
+
+        the following documents belong to the account of a session pool
+        """
+        self.account = account
+        if self.output_format == "text":
+            self.write_line("  ")
+            self.write_line(" account: " + account + "  documents: " + str(number_of_documents))
+
+
+
+    def write_account(self, account, number_of_documents, jobs, running):
+        """
+        write account
+
+        summary of an account of a session pool
+        """
+        if self.output_format == "text":
+            self.write_line(" account " + account + ": " + str(number_of_documents) + " documents, " + str(jobs) + 
+                " jobs, " + str(running) + " running")
+            return
+        self.write_record(record="account", account=account, documents=number_of_documents, jobs=jobs, 
+            running=running)
+
+
+
+    def write_solver_configs(self, solver_configs):
+        """
+        write solver configs
+
+        versions and configurations of nastran
+        """
+        if self.output_format == "text":
+            self.write_line("\n\nsolver configurations:")
+        for solver,v1 in solver_configs.items():
+            if solver == "nastran":
+                for k2,v2 in v1.items():
+                    if k2 == "versions" or k2 == "configs":
+                        for k3,v3 in v2.items():
+                            if self.output_format == "text":
+                                self.write_line("  " + str(solver) + " " + str(k2) + " " + str(k3))
+                            else:
+                                self.write_record(record="solver_config", solver=solver, config_type=k2, config=k3)
+
+
+
+    def write_since(self, snapshot_time):
+        if self.output_format != "text":
+            return
+        if snapshot_time is None:
+            self.write_line("no snapshot of a previous run, all documents are new")
+        else:
+            self.write_line("changes since: " + datetime.fromtimestamp(snapshot_time).strftime("%Y-%m-%d %H:%M:%S"))
+
+
+
+    def write_change(self, change):
+        """
+        write change
+
+        one change of the snapshot, in jsonl and csv the change is the record
+        """
+        if self.output_format != "text":
+            self.write_record(**change)
+            return
+        record = change["record"]
+        if record == "new_document":
+            self.write_line(" new document: " + change["doc_name"] + "      " + change["doc_id"])
+        elif record == "removed_document":
+            self.write_line(" removed document: " + change["doc_name"] + "      " + change["doc_id"])
+        elif record == "new_job":
+            self.write_line("   new job: " + change["job_name"] + "  " + change["job_id"] + "  " + change["status"]
+                + "      (" + change["doc_name"] + ")")
+        elif record == "status_change":
+            self.write_line("   status change: " + change["job_name"] + "  " + change["job_id"] + "  "
+                + change["old_status"] + " -> " + change["status"] + "      (" + change["doc_name"] + ")")
+        elif record == "new_file":
+            self.write_line("   new file: " + change["file"] + "      (" + change["doc_name"] + ")")
+
+
+
+    def write_footer(self, loaded, number_of_documents, changes):
+        if self.output_format == "text":
+            self.write_line("documents loaded: " + str(loaded) + " of " + str(number_of_documents)
+                + ", changes: " + str(changes))
+
+
+
+    def close(self):
+        self.file_out.close()
+
+
+
+
+
+class StatusSnapshot():
+    """
+    status snapshot
+
+    documents with jobs, job states and files of the last STATUS run with --since-last,
+    kept per account in ncw_status_snapshot_<account>.json in ncw directory
+    """
+
+    def __init__(self, account):
+        self.file_name = get_ncw_dir() + "/ncw_status_snapshot_" + account + ".json"
+        self.time = None
+        self.documents = {}
+        if os.path.exists(self.file_name):
+            try:
+                file_in = open(self.file_name, "r")
+                content = json.load(file_in)
+                file_in.close()
+                self.time = content["time"]
+                self.documents = content["documents"]
+            except (ValueError, KeyError):
+                print ("WARNING: snapshot not readable, all documents are new: ", self.file_name)
+
+
+
+    def is_terminal(self, doc_id):
+        """
+        is terminal
+
+        document with only finished jobs in the snapshot, these jobs do not change anymore,
+        but new jobs can still be submitted into the document
+        """
+        entry = self.documents.get(doc_id)
+        return entry is not None and entry["terminal"]
+
+
+
+    def is_unchanged(self, entry_dict):
+        """
+        is unchanged
+
+        document with only finished jobs and the same entry in the document list as in the snapshot,
+        a new job changes the job count or modification time of the entry
+        """
+        entry = self.documents.get(entry_dict['id'])
+        return entry is not None and entry["terminal"] and entry.get("listing") == get_listing_key(entry_dict)
+
+
+
+    def update(self, doc_id, doc_name, job_dict, files_in_doc, entry_dict=None):
+        """
+        update
+
+        store the current content of a document with its entry of the document list
+        and return the list of changes
+        """
+        change_list = []
+        entry = self.documents.get(doc_id)
+        if entry is None:
+            entry = {"jobs": {}, "files": []}
+            change_list.append({"record": "new_document", "doc_id": doc_id, "doc_name": doc_name,
+                "jobs": len(job_dict), "files": len(files_in_doc)})
+        for job_id, job_feat in job_dict.items():
+            status = str(job_feat['status']).split(".")[-1]
+            old_job = entry["jobs"].get(job_id)
+            if old_job is None:
+                change_list.append({"record": "new_job", "doc_id": doc_id, "doc_name": doc_name,
+                    "job_id": job_id, "job_name": job_feat['name'], "status": status})
+            elif old_job["status"] != status:
+                change_list.append({"record": "status_change", "doc_id": doc_id, "doc_name": doc_name,
+                    "job_id": job_id, "job_name": job_feat['name'], "old_status": old_job["status"], "status": status})
+        old_files = set(entry["files"])
+        for file_name in files_in_doc:
+            if file_name not in old_files:
+                change_list.append({"record": "new_file", "doc_id": doc_id, "doc_name": doc_name, "file": file_name})
+        terminal = len(job_dict) > 0
+        for job_feat in job_dict.values():
+            terminal = terminal and is_terminal_status(job_feat['status'])
+        self.documents[doc_id] = {"name": doc_name, "terminal": terminal, "files": files_in_doc,
+            "listing": get_listing_key(entry_dict) if entry_dict is not None else None,
+            "jobs": dict([(job_id, {"name": job_feat['name'], "status": str(job_feat['status']).split(".")[-1]})
+                for job_id, job_feat in job_dict.items()])}
+        return change_list
+
+
+
+    def remove_missing(self, doc_ids):
+        """
+        remove missing
+
+        remove documents which are not listed anymore and return the changes
+        """
+        change_list = []
+        doc_ids = set(doc_ids)
+        for doc_id in list(self.documents.keys()):
+            if doc_id not in doc_ids:
+                change_list.append({"record": "removed_document", "doc_id": doc_id,
+                    "doc_name": self.documents[doc_id]["name"]})
+                del self.documents[doc_id]
+        return change_list
+
+
+
+    def write(self):
+        """
+        write
+
+        the snapshot is replaced at once, an interrupted run keeps the old snapshot
+        """
+        file_out = open(self.file_name + ".tmp", "w")
+        json.dump({"time": time.time(), "documents": self.documents}, file_out)
+        file_out.close()
+        os.replace(self.file_name + ".tmp", self.file_name)
+
+
+
+
+
+class TransferSkipped(Exception):
+    """
+    transfer skipped
+
+    raised in a progress callback to stop a transfer that is not wanted
+    """
+
+
+
+
+
+class TransferMonitor():
+    """
+    transfer monitor
+
+    collects the progress of concurrent transfers to show the live aggregate throughput,
+    an optional rate limit in MB/s is kept for each single transfer by delaying
+    the progress callback of the transfer, gaps without progress longer than STALL_TIME
+    are counted as stalls, finished transfers are given to the transfer metrics
+    """
+
+    def __init__(self, direction, rate_limit=0.0, profiler=None, verbose=True, metrics=None):
+        """
+        init
+
+        direction  - text for the output, for example upload
+        rate_limit - maximum MB/s per transfer, 0 means unlimited
+        profiler   - optional profiler which records the progress information
+        verbose    - print the aggregate throughput
+        metrics    - optional transfer metrics which collect the finished transfers
+        """
+        self.direction = direction
+        self.rate_limit = rate_limit
+        self.profiler = profiler
+        self.verbose = verbose
+        self.metrics = metrics
+        self.lock = threading.Lock()
+        self.start_time = time.monotonic()
+        self.last_print = 0.0
+        self.transfers = {}
+        self.finished = 0
+
+
+
+    def upload_callback(self, name, total_size):
+        """
+        upload callback
+
+        create progress callback for a single upload with the signature of upload_file
+        """
+        with self.lock:
+            self.transfers[name] = self.new_transfer(total_size)
+        def callback(speed, elapsed_time, transferred_size):
+            self.update(name, transferred_size, speed, elapsed_time)
+        return callback
+
+
+
+    def download_callback(self, name, max_size=0):
+        """
+        download callback
+
+        create progress callback for a single download with the signature of download_file,
+        with a maximum size the transfer is stopped as soon as the total size is known
+        """
+        with self.lock:
+            self.transfers[name] = self.new_transfer(0)
+        def callback(transferred_size, total_size, speed, elapsed_time):
+            if max_size > 0 and total_size > max_size:
+                raise TransferSkipped(name)
+            self.transfers[name]["total"] = total_size
+            self.update(name, transferred_size, speed, elapsed_time)
+        return callback
+
+
+
+    def new_transfer(self, total_size):
+        """
+        new transfer
+
+        state of a single transfer
+        """
+        now = time.monotonic()
+        return {"start": now, "transferred": 0, "total": total_size, "done": False, "last_change": now, 
+            "stalls": 0, "stall_time": 0.0}
+
+
+
+    def check_stall(self, transfer, now):
+        """
+        check stall
+
+        count the time since the last progress as stall if it is longer than STALL_TIME
+        """
+        gap = now - transfer["last_change"]
+        if gap > STALL_TIME:
+            transfer["stalls"] += 1
+            transfer["stall_time"] += gap
+        transfer["last_change"] = now
+
+
+
+    def update(self, name, transferred_size, speed=0.0, elapsed_time=0.0):
+        """
+        update
+
+        store transferred size, print aggregate throughput and throttle the transfer
+        """
+        now = time.monotonic()
+        if self.profiler is not None:
+            self.profiler.progress(self.direction + " " + name, speed, elapsed_time, transferred_size)
+        with self.lock:
+            transfer = self.transfers[name]
+            if transferred_size > transfer["transferred"]:
+                self.check_stall(transfer, now)
+            transfer["transferred"] = transferred_size
+            if now - self.last_print >= 1.0:
+                self.last_print = now
+                self.print_status(now)
+        # the transfer thread sleeps until the transferred size fits into the rate limit
+        if self.rate_limit > 0:
+            delay = transferred_size / (self.rate_limit * 1000**2) - (now - transfer["start"])
+            if delay > 0:
+                time.sleep(delay)
+
+
+
+    def finish(self, name, failed=False):
+        """
+        finish
+
+        mark transfer as done, a failed transfer keeps the transferred size,
+        a transfer which failed before it started is not counted
+        """
+        now = time.monotonic()
+        with self.lock:
+            transfer = self.transfers.get(name)
+            if transfer is None:
+                return
+            if not failed:
+                transfer["transferred"] = max(transfer["transferred"], transfer["total"])
+            transfer["done"] = True
+            self.check_stall(transfer, now)
+            self.finished += 1
+        if self.metrics is not None:
+            self.metrics.add_file(self.direction, name, transfer["transferred"], transfer["start"], now, 
+                transfer["stalls"], transfer["stall_time"], failed)
+
+
+
+    def print_status(self, now):
+        """
+        print status
+
+        one overwritten terminal line with aggregate throughput
+        """
+        if not self.verbose:
+            return
+        transferred = sum([t["transferred"] for t in self.transfers.values()])
+        total = sum([t["total"] for t in self.transfers.values()])
+        speed = transferred / max(now - self.start_time, 1e-6)
+        print ("\r %s %.2fMB/s  %.2fMB / %.2fMB  files %d / %d   " % (self.direction, speed/1000**2, 
+            transferred/1000**2, total/1000**2, self.finished, len(self.transfers)), end="", flush=True)
+
+
+
+    def report(self):
+        """
+        report
+
+        final aggregate throughput after all transfers
+        """
+        with self.lock:
+            self.print_status(time.monotonic())
+        if self.verbose:
+            print ("")
+
+
+
+
+
+class TransferMetrics():
+    """
+    transfer metrics
+
+    collects the finished transfers of a run with size, duration and stalls, at the end of
+    the run the throughput per file (percentiles) and of the run is printed and exported
+    per direction as Prometheus textfile ncw_metrics_<direction>.prom for the textfile
+    collector of the node exporter, and appended as record to ncw_metrics.jsonl, so the
+    upload and download bandwidth of a submit host can be followed over time
+
+    the files are written into --metrics-dir (default ncw directory), with --no-metrics
+    nothing is collected
+    """
+
+    def __init__(self, arg_space):
+        self.enabled = not getattr(arg_space, "no_metrics", False)
+        self.directory = getattr(arg_space, "metrics_dir", None) or get_ncw_dir()
+        self.action = str(arg_space.action or "")
+        self.lock = threading.Lock()
+        self.files = {}
+
+
+
+    def add_file(self, direction, name, size, start, end, stalls=0, stall_time=0.0, failed=False):
+        """
+        add file
+
+        record a finished transfer, transfers without transferred bytes are skipped files
+        """
+        if not self.enabled or (size == 0 and not failed):
+            return
+        with self.lock:
+            self.files.setdefault(direction, []).append({"name": name, "size": size, "start": start, "end": end, 
+                "stalls": stalls, "stall_time": stall_time, "failed": failed})
+
+
+
+    def get_percentile(self, values, fraction):
+        """
+        get percentile
+
+        nearest rank percentile of sorted values
+        """
+        if len(values) == 0:
+            return 0.0
+        return values[min(len(values) - 1, max(0, math.ceil(fraction * len(values)) - 1))]
+
+
+
+    def get_file_speeds(self, direction):
+        """
+        get file speeds
+
+        sorted throughput of the complete files of the direction in MB/s
+        """
+        with self.lock:
+            files = list(self.files.get(direction, []))
+        return sorted([f["size"] / max(f["end"] - f["start"], 1e-6) / 1000**2 for f in files if not f["failed"]])
+
+
+
+    def get_summary(self, direction):
+        """
+        get summary
+
+        throughput of the run (bytes between the first start and the last end of a transfer)
+        and percentiles of the throughput per file in MB/s, stalls and failed files
+        """
+        with self.lock:
+            files = list(self.files.get(direction, []))
+        complete = [f for f in files if not f["failed"]]
+        speeds = self.get_file_speeds(direction)
+        seconds = max([f["end"] for f in files]) - min([f["start"] for f in files])
+        size = sum([f["size"] for f in files])
+        summary = {"time": datetime.now().isoformat(timespec="seconds"), "host": socket.gethostname(), 
+            "action": self.action, "direction": direction, "files": len(complete), 
+            "failed": len(files) - len(complete), "bytes": size, "seconds": round(seconds, 3), 
+            "mb_per_s": round(size / max(seconds, 1e-6) / 1000**2, 3),
+            "file_mb_per_s": dict([("p" + str(int(q * 100)), round(self.get_percentile(speeds, q), 3)) 
+                for q in METRICS_PERCENTILES]),
+            "stalls": sum([f["stalls"] for f in files]), 
+            "stall_seconds": round(sum([f["stall_time"] for f in files]), 3)}
+        summary["file_mb_per_s"]["min"] = round(speeds[0], 3) if speeds else 0.0
+        summary["file_mb_per_s"]["max"] = round(speeds[-1], 3) if speeds else 0.0
+        # slowest files are the first to look at
+        summary["slowest"] = [{"file": f["name"], "mb_per_s": round(f["size"] / max(f["end"] - f["start"], 1e-6) 
+            / 1000**2, 3)} for f in sorted(complete, key=lambda f: f["size"] / max(f["end"] - f["start"], 1e-6))[:5]]
+        return summary
+
+
+
+    def write_prometheus(self, summary):
+        """
+        write prometheus
+
+        gauges of the last run of the direction and a summary of the throughput per file
+        in the Prometheus text format, written into a temporary file and renamed, so the
+        collector never reads a half written file
+        """
+        labels = '{direction="' + summary["direction"] + '",action="' + summary["action"] + '"}'
+        line_list = []
+        for name, help_text, value in [
+                ("ncw_transfer_files", "Transferred files of the last run", summary["files"]),
+                ("ncw_transfer_failed_files", "Failed files of the last run", summary["failed"]),
+                ("ncw_transfer_bytes", "Transferred bytes of the last run", summary["bytes"]),
+                ("ncw_transfer_seconds", "Seconds from the first to the last transfer of the last run", 
+                    summary["seconds"]),
+                ("ncw_transfer_throughput_bytes_per_second", "Aggregate throughput of the last run", 
+                    summary["mb_per_s"] * 1000**2),
+                ("ncw_transfer_stalls", "Transfer stalls longer than " + str(STALL_TIME) + " seconds of the last run", 
+                    summary["stalls"]),
+                ("ncw_transfer_stall_seconds", "Seconds of transfer stalls of the last run", summary["stall_seconds"]),
+                ("ncw_transfer_last_run_timestamp_seconds", "Unix time of the end of the last run", time.time())]:
+            line_list.append("# HELP " + name + " " + help_text)
+            line_list.append("# TYPE " + name + " gauge")
+            line_list.append(name + labels + " " + repr(float(value)))
+        name = "ncw_transfer_file_throughput_bytes_per_second"
+        line_list.append("# HELP " + name + " Throughput per file of the last run")
+        line_list.append("# TYPE " + name + " summary")
+        quantiles = [("0", "min")] + [(str(q), "p" + str(int(q * 100))) for q in METRICS_PERCENTILES] + [("1", "max")]
+        for quantile, key in quantiles:
+            line_list.append(name + labels[:-1] + ',quantile="' + quantile + '"} ' + 
+                repr(summary["file_mb_per_s"][key] * 1000**2))
+        speeds = self.get_file_speeds(summary["direction"])
+        line_list.append(name + "_sum" + labels + " " + repr(sum(speeds) * 1000**2))
+        line_list.append(name + "_count" + labels + " " + repr(float(len(speeds))))
+        file_name = os.path.join(self.directory, "ncw_metrics_" + summary["direction"] + ".prom")
+        file_out = open(file_name + ".tmp", "w")
+        file_out.writelines([l+"\n" for l in line_list])
+        file_out.close()
+        os.replace(file_name + ".tmp", file_name)
+
+
+
+    def write(self):
+        """
+        write
+
+        print the summary and write the metrics files for every direction with transfers
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            directions = sorted(self.files.keys())
+        if len(directions) == 0:
+            return
+        summaries = [self.get_summary(direction) for direction in directions]
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            file_out = open(os.path.join(self.directory, "ncw_metrics.jsonl"), "a")
+            file_out.writelines([json.dumps(summary) + "\n" for summary in summaries])
+            file_out.close()
+            for summary in summaries:
+                print ("%s metrics: %d files %.2fMB in %.2fs, %.2fMB/s, per file p50 %.2fMB/s p90 %.2fMB/s, "
+                    "failed %d, stalls %d (%.1fs)" % (summary["direction"], summary["files"], summary["bytes"]/1000**2, 
+                    summary["seconds"], summary["mb_per_s"], summary["file_mb_per_s"]["p50"], 
+                    summary["file_mb_per_s"]["p90"], summary["failed"], summary["stalls"], summary["stall_seconds"]))
+                self.write_prometheus(summary)
+            print ("metrics written to: ", self.directory)
+        except OSError as e:
+            print ("WARNING: metrics not written: ", e)
+        with self.lock:
+            self.files = {}
+
+
+
+
+
+class MetadataCache():
+    """
+    metadata cache
+
+    sqlite cache in ncw directory for documents, job results and solver configurations,
+    entries are stored per account (hash of token)
+
+    jobs in a terminal state do not change anymore, so documents with only finished jobs
+    and results of finished jobs are valid until the cache time is over,
+    documents with running jobs are not taken from the cache
+
+    the number of entries per table is limited, oldest entries are removed first
+    """
+
+    def __init__(self, account, ttl_hours=24.0, max_entries=10000, enabled=True):
+        import sqlite3
+        self.account = account
+        self.ttl = ttl_hours * 3600
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.connection = None
+        if not enabled:
+            return
+        file_name = get_ncw_dir() + "/ncw_cache.sqlite"
+        try:
+            self.connection = sqlite3.connect(file_name, check_same_thread=False, timeout=30)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            for table in ("documents", "results", "entries"):
+                self.connection.execute("CREATE TABLE IF NOT EXISTS " + table + 
+                    " (account TEXT, key TEXT, content TEXT, fetched REAL, PRIMARY KEY (account, key))")
+            self.connection.commit()
+        except sqlite3.Error as e:
+            print ("WARNING: cache not available: ", e)
+            self.connection = None
+
+
+
+    def get(self, table, key):
+        """
+        get
+
+        content of a valid entry or None
+        """
+        if self.connection is None:
+            return None
+        with self.lock:
+            row = self.connection.execute("SELECT content, fetched FROM " + table + 
+                " WHERE account=? AND key=?", (self.account, key)).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return json.loads(row[0])
+
+
+
+    def put(self, table, key, content):
+        """
+        put
+
+        store entry with current time
+        """
+        if self.connection is None:
+            return
+        with self.lock:
+            self.connection.execute("INSERT OR REPLACE INTO " + table + " VALUES (?,?,?,?)", 
+                (self.account, key, json.dumps(content, default=str), time.time()))
+            self.connection.commit()
+
+
+
+    def get_document(self, doc_id):
+        """
+        get document
+
+        jobs and files of a document with only finished jobs
+        """
+        content = self.get("documents", doc_id)
+        if content is None or not content["terminal"]:
+            return None
+        return content["jobs"], content["files"]
+
+
+
+    def put_document(self, doc_id, job_dict, files_in_doc):
+        """
+        put document
+
+        a document without jobs can still get jobs, so it is not terminal
+        """
+        terminal = len(job_dict) > 0
+        for job_feat in job_dict.values():
+            terminal = terminal and is_terminal_status(job_feat['status'])
+        self.put("documents", doc_id, {"jobs": job_dict, "files": files_in_doc, "terminal": terminal})
+
+
+
+    def open_documents(self):
+        """
+        open documents
+
+        ids of the cached documents with not finished jobs, also of expired entries
+        """
+        if self.connection is None:
+            return []
+        with self.lock:
+            row_list = self.connection.execute("SELECT key, content FROM documents WHERE account=?", 
+                (self.account,)).fetchall()
+        return [row[0] for row in row_list if not json.loads(row[1])["terminal"]]
+
+
+
+    def remove_document(self, doc_id):
+        """
+        remove document
+
+        for example after new jobs were submitted into the document
+        """
+        if self.connection is None:
+            return
+        with self.lock:
+            self.connection.execute("DELETE FROM documents WHERE account=? AND key=?", (self.account, doc_id))
+            self.connection.commit()
+
+
+
+    def get_results(self, job_id):
+        return self.get("results", job_id)
+
+
+
+    def put_results(self, job_id, result_list):
+        self.put("results", job_id, result_list)
+
+
+
+    def get_entry(self, key):
+        return self.get("entries", key)
+
+
+
+    def put_entry(self, key, content):
+        self.put("entries", key, content)
+
+
+
+    def close(self):
+        """
+        close
+
+        remove the oldest entries above the size limit and close the database
+        """
+        if self.connection is None:
+            return
+        with self.lock:
+            for table in ("documents", "results", "entries"):
+                self.connection.execute("DELETE FROM " + table + " WHERE rowid IN (SELECT rowid FROM " + table + 
+                    " ORDER BY fetched DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+            self.connection.commit()
+            self.connection.close()
+            self.connection = None
+
+
+
+
+
+class RunJournal():
+    """
+    run journal
+
+    append-only journal of all submissions in ncw_journal.sqlite in ncw directory,
+    one row per job with document, job name and id, tag, calc dir, files with content
+    hashes and job settings, entries are stored per account (hash of token)
+
+    the rows are indexed by document id, job id, job name, submission time and tag,
+    so jobs can be found without reading submit output files
+    """
+
+    def __init__(self, account):
+        import sqlite3
+        self.account = account
+        self.lock = threading.Lock()
+        file_name = get_ncw_dir() + "/ncw_journal.sqlite"
+        try:
+            self.connection = sqlite3.connect(file_name, check_same_thread=False, timeout=30)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS journal (account TEXT, submitted REAL, doc_id TEXT, "
+                "doc_name TEXT, job_id TEXT, job_name TEXT, tag TEXT, calc_dir TEXT, files TEXT, settings TEXT)")
+            for column in ("doc_id", "job_id", "job_name", "submitted", "tag"):
+                self.connection.execute("CREATE INDEX IF NOT EXISTS journal_" + column + " ON journal (account, " + 
+                    column + ")")
+            self.connection.commit()
+        except sqlite3.Error as e:
+            print ("WARNING: journal not available: ", e)
+            self.connection = None
+
+
+
+    def add(self, doc_id, doc_name, job_id, job_name, tag, calc_dir, files, settings):
+        """
+        add
+
+        record a submitted job, files is a list of dictionaries with local, remote and sha256
+        """
+        if self.connection is None or job_id == "":
+            return
+        with self.lock:
+            self.connection.execute("INSERT INTO journal VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (self.account, 
+                time.time(), doc_id, doc_name, job_id, job_name, tag, calc_dir, json.dumps(files), json.dumps(settings)))
+            self.connection.commit()
+
+
+
+    def find(self, job_name=None, tag=None, since=None, until=None, doc_id=None):
+        """
+        find
+
+        journal entries in the order of submission, the job name is a glob pattern,
+        since and until are timestamps
+        """
+        if self.connection is None:
+            return []
+        condition = "account = ?"
+        values = [self.account]
+        for column, operator, value in (("job_name", "GLOB", job_name), ("tag", "=", tag), ("submitted", ">=", since),
+                ("submitted", "<", until), ("doc_id", "=", doc_id)):
+            if value is not None:
+                condition += " AND " + column + " " + operator + " ?"
+                values.append(value)
+        with self.lock:
+            cursor = self.connection.execute("SELECT submitted, doc_id, doc_name, job_id, job_name, tag, calc_dir, "
+                "files, settings FROM journal WHERE " + condition + " ORDER BY submitted", values)
+            row_list = cursor.fetchall()
+        return [{"submitted": row[0], "doc_id": row[1], "doc_name": row[2], "job_id": row[3], "job_name": row[4], 
+            "tag": row[5], "calc_dir": row[6], "files": json.loads(row[7]), "settings": json.loads(row[8])} 
+            for row in row_list]
+
+
+
+    def doc_ids(self):
+        """
+        doc ids
+
+        documents of the journal in the order of the first submission
+        """
+        if self.connection is None:
+            return []
+        with self.lock:
+            row_list = self.connection.execute("SELECT doc_id FROM journal WHERE account = ? GROUP BY doc_id "
+                "ORDER BY MIN(submitted)", (self.account,)).fetchall()
+        return [row[0] for row in row_list]
+
+
+
+    def close(self):
+        if self.connection is not None:
+            with self.lock:
+                self.connection.close()
+                self.connection = None
+
+
+
+
+
+class UploadIndex():
+    """
+    upload index
+
+    append-only index file in ncw directory which maps content hashes of uploaded files
+    to document paths in nexus, the last entry of a document path is valid
+
+    to avoid hashing and analysis of big unchanged files again, the hash and the deck analysis
+    of a local file are also recorded together with size and modification time,
+    an index file with replaced entries is written again with the valid entries on load
+    """
+
+    def __init__(self):
+        self.file_name = get_ncw_dir() + "/ncw_upload_index.jsonl"
+        self.lock = threading.Lock()
+        self.remote = {}
+        self.local = {}
+        self.local_locks = {}
+        lines = 0
+        if os.path.exists(self.file_name):
+            file_in = open(self.file_name, "r")
+            for line in file_in:
+                lines += 1
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if "doc_id" in entry:
+                    self.remote[(entry["doc_id"], entry["path"])] = entry["sha256"]
+                if "local" in entry:
+                    self.local[entry["local"]] = entry
+            file_in.close()
+        if lines > len(self.remote) + len(self.local):
+            self.compact()
+
+
+
+    def compact(self):
+        """
+        compact
+
+        write the index file again with the last entry of every document path and local file,
+        the file is replaced at once, so a reader never sees a half written index
+        """
+        with self.lock:
+            file_out = open(self.file_name + ".tmp", "w")
+            for (doc_id, path), file_hash in self.remote.items():
+                file_out.write(json.dumps({"doc_id": doc_id, "path": path, "sha256": file_hash}) + "\n")
+            for entry in self.local.values():
+                file_out.write(json.dumps(entry) + "\n")
+            file_out.close()
+            os.replace(self.file_name + ".tmp", self.file_name)
+
+
+
+    def write(self, entry):
+        """
+        write
+
+        append an entry to the index file
+        """
+        with self.lock:
+            file_out = open(self.file_name, "a")
+            file_out.write(json.dumps(entry) + "\n")
+            file_out.close()
+
+
+
+    def get_local(self, local_file_name, key, function):
+        """
+        get local
+
+        value of key in the entry of a local file, for a new or changed file the value
+        is computed with function and recorded, a file which is needed by several threads
+        is read only once
+        """
+        local_file_name = os.path.realpath(local_file_name)
+        with self.lock:
+            local_lock = self.local_locks.setdefault(local_file_name, threading.Lock())
+        with local_lock:
+            size = os.path.getsize(local_file_name)
+            mtime = os.path.getmtime(local_file_name)
+            entry = self.local.get(local_file_name)
+            if entry is None or entry["size"] != size or entry["mtime"] != mtime:
+                entry = {"local": local_file_name, "size": size, "mtime": mtime}
+            if key in entry:
+                return entry[key]
+            entry = dict(entry)
+            entry[key] = function(local_file_name)
+            with self.lock:
+                self.local[local_file_name] = entry
+            self.write(entry)
+            return entry[key]
+
+
+
+    def get_hash(self, local_file_name):
+        """
+        get hash
+
+        content hash of a local file, unchanged files are not read again
+        """
+        return self.get_local(local_file_name, "sha256", get_file_hash)
+
+
+
+    def get_analysis(self, local_file_name, sol_search=True):
+        """
+        get analysis
+
+        card counts of a local file, with sol_search also the solution sequence of the deck,
+        unchanged files are not read again
+        """
+        if sol_search:
+            return self.get_local(local_file_name, "analysis", analyze_file)
+        return self.get_local(local_file_name, "counts", lambda file_name: analyze_file(file_name, False))
+
+
+
+    def is_current(self, file_hash, doc_id, path, remote_files):
+        """
+        is current
+
+        check whether the document path still exists and was uploaded with the same content
+        """
+        return path in remote_files and self.remote.get((doc_id, path)) == file_hash
+
+
+
+    def locations(self, file_hash):
+        """
+        locations
+
+        all known document ids and paths with the same content
+        """
+        return [k for k,v in self.remote.items() if v == file_hash]
+
+
+
+    def add(self, file_hash, doc_id, path):
+        """
+        add
+
+        record an uploaded file
+        """
+        with self.lock:
+            self.remote[(doc_id, path)] = file_hash
+        self.write({"doc_id": doc_id, "path": path, "sha256": file_hash})
+
+
+
+
+
+class DownloadManifest():
+    """
+    download manifest
+
+    append-only manifest file in calc directory with path, size and checksum of every
+    completely downloaded file, the last entry of a path is valid
+
+    a file counts as complete if the local file still has the recorded size and
+    modification time, in case of another modification time the checksum is compared
+    """
+
+    def __init__(self, calc_dir):
+        self.calc_dir = calc_dir
+        self.file_name = calc_dir + "/ncw_download_manifest.jsonl"
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(self.file_name):
+            file_in = open(self.file_name, "r")
+            for line in file_in:
+                try:
+                    entry = json.loads(line)
+                    self.entries[entry["path"]] = entry
+                except ValueError:
+                    # incomplete last line of an interrupted run
+                    pass
+            file_in.close()
+
+
+
+    def is_complete(self, path):
+        """
+        is complete
+
+        check local file against manifest entry
+        """
+        entry = self.entries.get(path)
+        target = self.calc_dir + "/" + path
+        if entry is None or not os.path.exists(target):
+            return False
+        if os.path.getsize(target) != entry["size"]:
+            return False
+        if os.path.getmtime(target) == entry["mtime"]:
+            return True
+        return get_file_hash(target) == entry["sha256"]
+
+
+
+    def add(self, path):
+        """
+        add
+
+        record a complete local file in the manifest
+        """
+        target = self.calc_dir + "/" + path
+        entry = {"path": path, "size": os.path.getsize(target), "sha256": get_file_hash(target), 
+            "mtime": os.path.getmtime(target)}
+        with self.lock:
+            self.entries[path] = entry
+            file_out = open(self.file_name, "a")
+            file_out.write(json.dumps(entry) + "\n")
+            file_out.close()
+
+
+
+
+
+class SweepQueue():
+    """
+    sweep queue
+
+    persistent queue of SWEEP in a json file, the file is replaced with every save,
+    so the queue survives an interrupted run
+
+    states of an entry: queued, uploading, running, finished, failed,
+    an entry in upload during the interruption is queued again, the files
+    already uploaded are reused
+
+    entries without document name are submitted into the document sweep_<time>
+    of the queue, also entries which are added later, with a session pool one document
+    per account, the documents are kept by account and name
+    """
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.entries = []
+        self.documents = {}
+        self.sweep_doc = "sweep_" + datetime.now().strftime("%Y%m%d%H%M%S")
+        if os.path.exists(self.file_name):
+            file_in = open(self.file_name, "r")
+            content = json.load(file_in)
+            file_in.close()
+            self.entries = content["entries"]
+            self.documents = content["documents"]
+            self.sweep_doc = content["sweep_doc"]
+            for entry in self.entries:
+                if entry["state"] == "uploading":
+                    entry["state"] = "queued"
+            print ("sweep queue loaded: ", self.file_name)
+
+
+
+    def add(self, entry):
+        """
+        add
+
+        add a new entry, a deck with the same job name is only queued once
+        """
+        for other in self.entries:
+            if other["deck"] == entry["deck"] and other["job"] == entry["job"]:
+                return
+        if entry["doc"] == "" and entry["doc_id"] == "":
+            entry["doc"] = self.sweep_doc
+        entry.update({"state": "queued", "job_id": "", "status": "", "account": ""})
+        self.entries.append(entry)
+
+
+
+    def select(self, state):
+        return [entry for entry in self.entries if entry["state"] == state]
+
+
+
+    def doc_ids(self):
+        doc_ids = []
+        for entry in self.entries:
+            if entry["doc_id"] != "" and entry["doc_id"] not in doc_ids:
+                doc_ids.append(entry["doc_id"])
+        return doc_ids
+
+
+
+    def summary(self):
+        count_dict = {}
+        for entry in self.entries:
+            count_dict[entry["state"]] = count_dict.get(entry["state"], 0) + 1
+        return ", ".join([state + " " + str(count) for state, count in count_dict.items()])
+
+
+
+    def save(self):
+        file_out = open(self.file_name + ".tmp", "w")
+        json.dump({"sweep_doc": self.sweep_doc, "entries": self.entries, "documents": self.documents}, file_out, indent=1)
+        file_out.close()
+        os.replace(self.file_name + ".tmp", self.file_name)
+
+
+
+
+
+def read_token(arg_space):
+    """
+    read token
+
+    first line of the token file of the argument list or of the rc file ncwrc,
+    empty if there is no token
+    """
+    token = ""
+    if arg_space.token:
+        token_file = arg_space.token
+    else:
+        token_file = os.path.dirname(os.path.realpath(__file__)) + "/ncwrc"
+    try:
+        file_in = open(token_file,'r')
+        line_list = file_in.readlines()
+        file_in.close()
+        token = line_list[0].strip()
+    except:
+        pass
+    return token
+
+
+
+
+
+def read_tokens(arg_space):
+    """
+    read tokens
+
+    all tokens of the token file of the argument list or of the rc file ncwrc for a session pool,
+    one token per line, empty lines, lines starting with # and repeated tokens are skipped
+    """
+    token_list = []
+    if arg_space.token:
+        token_file = arg_space.token
+    else:
+        token_file = os.path.dirname(os.path.realpath(__file__)) + "/ncwrc"
+    if os.path.exists(token_file):
+        file_in = open(token_file,'r')
+        for line in file_in:
+            token = line.strip()
+            if token != "" and not token.startswith("#") and token not in token_list:
+                token_list.append(token)
+        file_in.close()
+    return token_list
+
+
+
+
+
+def get_help():
+    """
+    get help
+    """
+    print (" ")
+    print ("Nexus Compute Wrapper")
+    print (" ")
+    print ("options:")
+    print ("--action   <ACTION>     STATUS/SUBMIT/DOWNLOAD/WATCH/SWEEP/TAIL/PRUNE/DAEMON")
+    print ("--file     <FILENAME>   needed for SUBMIT/DOWNLOAD/WATCH/TAIL")
+    print ("--token    <TOKENFILE>  contains token")
+    print ("--workers  <N>          parallel workers for STATUS (default 8)")
+    print ("--format   <FORMAT>     output format of STATUS: text/jsonl/csv (default text)")
+    print ("--since-last            print only changes of STATUS since the last run with --since-last")
+    print ("--transfers <N>         parallel file transfers (default 4)")
+    print ("--rate-limit <MB/s>     maximum rate per file transfer (default unlimited)")
+    print ("--retries  <N>          retries of a failed transfer or request (default 3)")
+    print ("--poll-min <SECONDS>    minimum seconds between polls for WATCH, SWEEP and TAIL (default 10)")
+    print ("--poll-max <SECONDS>    maximum seconds between polls for WATCH (default 300)")
+    print ("--max-running <N>       maximum number of running jobs for SWEEP (default 10)")
+    print ("--idle-timeout <SEC>    seconds without request until the DAEMON stops (default 1800)")
+    print ("--socket   <SOCKET>     unix socket of the DAEMON")
+    print ("--stop                  stop the running DAEMON")
+    print ("--no-daemon             do not use a running DAEMON")
+    print ("--profile  [FILE]       write timing trace and summary (default ncw_profile.json)")
+    print ("--no-cache              do not use the local metadata cache")
+    print ("--cache-ttl <HOURS>     hours until cached documents are requested again (default 24)")
+    print ("--cache-size <N>        maximum number of cached entries per table (default 10000)")
+    print ("--no-dedup              upload files with unchanged content again")
+    print ("--include  <GLOB>       download only matching result files, for example *.f06, also for TAIL")
+    print ("--exclude  <GLOB>       skip matching result files, for example *.op2")
+    print ("--max-size <SIZE>       skip result files larger than size, for example 500MB")
+    print ("--no-post               no summary of .f06/.f04/.log files after download")
+    print ("--tag      <TAG>        tag of submitted jobs in the journal, or lookup of jobs by tag")
+    print ("--job-name <GLOB>       lookup of jobs in the journal by job name for STATUS/DOWNLOAD/WATCH/TAIL")
+    print ("--since    <DATE>       lookup of jobs submitted since date, for example 2024-05-31")
+    print ("--until    <DATE>       lookup of jobs submitted before date")
+    print ("--validate              check the action files offline without nexus compute and NodeJS")
+    print ("--pool                  one session per token of the token file, jobs are spread over the accounts")
+    print ("--metrics-dir <DIR>     directory of the transfer metrics files (default ncw directory)")
+    print ("--no-metrics            do not collect and write transfer metrics")
+    print ("--older-than <DAYS>     PRUNE documents with the newest job older than days")
+    print ("--keep-last <N>         PRUNE keeps the N newest documents")
+    print ("--prune-status <LIST>   PRUNE only documents with all jobs in these statuses, for example Done,Failed")
+    print ("--downloaded            PRUNE only documents with all result files downloaded")
+    print ("--dry-run               PRUNE writes only the preview and deletes nothing")
+    print (" ")
+    print ("use optional ncwrc  or  .ncwrc  file to activate token without token argument")
+    print (" ")
+    print ("examples running script: ")
+    print ("   --action=SUBMIT --file=submit_file.txt")
+    print ("   --action=STATUS --token=token_file.txt")
+    print ("   --action=SWEEP --file=decks_dir --max-running=20")
+    print ("   --action=PRUNE --older-than=90 --keep-last=50 --dry-run")
+    print (" ")
+
+
+
+
+
+def get_parser():
+    """
+    get parser
+
+    argument parser of ncw, also used for the defaults of AsyncNCW
+    """
+    parser = argparse.ArgumentParser(description='Nexus Compute Wrapper')
+    parser.add_argument('-a', '--action', choices=['STATUS','SUBMIT','DOWNLOAD','WATCH','SWEEP','TAIL','PRUNE','DAEMON'], help='Action to perform')
+    parser.add_argument('-f', '--file', help='Define Actionfile for SUBMIT/DOWNLOAD/WATCH/TAIL, or sources for SWEEP')
+    parser.add_argument('sources', nargs='*', help='Further decks, directories, glob patterns or submit files for SWEEP, calc directories for PRUNE')
+    parser.add_argument('-t', '--token', type=str, help='Token File which contains token')
+    parser.add_argument('-d', '--debug', action="store_true", help='Debug action turned on')
+    parser.add_argument('-w', '--workers', type=int, default=8, help='Number of parallel workers for STATUS')
+    parser.add_argument('--format', choices=['text','jsonl','csv'], default='text', help='Output format of STATUS')
+    parser.add_argument('--since-last', action="store_true", help='Print only changes of STATUS since the last run with --since-last')
+    parser.add_argument('--transfers', type=int, default=4, help='Number of parallel file transfers')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='Maximum MB/s per file transfer, 0 is unlimited')
+    parser.add_argument('--retries', type=int, default=3, help='Number of retries of a failed transfer or request')
+    parser.add_argument('--poll-min', type=float, default=10.0, help='Minimum seconds between polls of a job for WATCH/SWEEP/TAIL')
+    parser.add_argument('--poll-max', type=float, default=300.0, help='Maximum seconds between polls of a job for WATCH')
+    parser.add_argument('--max-running', type=int, default=10, help='Maximum number of running jobs for SWEEP')
+    parser.add_argument('--idle-timeout', type=float, default=1800.0, help='Seconds without request until the DAEMON stops')
+    parser.add_argument('--socket', help='Unix socket of the DAEMON, default ncw.sock in ncw directory')
+    parser.add_argument('--stop', action="store_true", help='Stop the running DAEMON')
+    parser.add_argument('--no-daemon', action="store_true", help='Do not use a running DAEMON')
+    parser.add_argument('--profile', nargs='?', const='ncw_profile.json', 
+        help='Write timing trace in Chrome trace format, default ncw_profile.json')
+    parser.add_argument('--no-cache', action="store_true", help='Do not use the local metadata cache')
+    parser.add_argument('--cache-ttl', type=float, default=24.0, help='Hours until cached documents are requested again')
+    parser.add_argument('--cache-size', type=int, default=10000, help='Maximum number of cached entries per table')
+    parser.add_argument('--no-dedup', action="store_true", help='Upload all files even if the content is already in the document')
+    parser.add_argument('--include', action='append', help='Glob pattern of result files to download or TAIL, can be repeated')
+    parser.add_argument('--exclude', action='append', help='Glob pattern of result files to skip, can be repeated')
+    parser.add_argument('--max-size', help='Maximum size of a result file to download, for example 500MB')
+    parser.add_argument('--no-post', action="store_true", help='No summary of .f06/.f04/.log files after download')
+    parser.add_argument('--tag', help='Tag of submitted jobs in the journal, lookup of jobs by tag')
+    parser.add_argument('--job-name', help='Lookup of jobs in the journal by job name, glob pattern')
+    parser.add_argument('--since', help='Lookup of jobs in the journal submitted since date, for example 2024-05-31')
+    parser.add_argument('--until', help='Lookup of jobs in the journal submitted before date')
+    parser.add_argument('--validate', action="store_true", help='Check the action files offline without Nexus compute')
+    parser.add_argument('--pool', action="store_true", help='One session per token of the token file, jobs are spread over the accounts')
+    parser.add_argument('--metrics-dir', help='Directory of the transfer metrics files, default ncw directory')
+    parser.add_argument('--no-metrics', action="store_true", help='Do not collect and write transfer metrics')
+    parser.add_argument('--older-than', type=float, help='PRUNE documents with the newest job older than days')
+    parser.add_argument('--keep-last', type=int, help='PRUNE keeps the newest documents')
+    parser.add_argument('--prune-status', help='PRUNE only documents with all jobs in these statuses, separated by comma')
+    parser.add_argument('--downloaded', action="store_true", help='PRUNE only documents with all result files downloaded')
+    parser.add_argument('--dry-run', action="store_true", help='PRUNE writes only the preview and deletes nothing')
+    return parser
+
+
+
+
+
+def arg_handler(argv=None):
+    """
+    argument handler
+    
+    possible arguments:
+        -h --help
+        -a --action   ACTION  ('STATUS','SUBMIT','DOWNLOAD','WATCH','SWEEP','TAIL','PRUNE','DAEMON')
+        -f --file     action_file_name
+        -t --token    token_file_name    
+        -w --workers  number of parallel workers
+        --format      output format of STATUS (text, jsonl, csv)
+        --since-last  only changes of STATUS since the last run
+        --transfers   number of parallel file transfers
+        --rate-limit  maximum MB/s per file transfer
+        --retries     retries of a failed transfer or request
+        --poll-min    minimum seconds between polls for WATCH, SWEEP and TAIL
+        --poll-max    maximum seconds between polls for WATCH
+        --max-running maximum number of running jobs for SWEEP
+        --idle-timeout seconds without request until the daemon stops
+        --socket      unix socket of the daemon
+        --stop        stop the running daemon
+        --no-daemon   do not use a running daemon
+        --profile     timing trace file in Chrome trace format
+        --no-cache    do not use the local metadata cache
+        --cache-ttl   hours until cached documents are requested again
+        --cache-size  maximum number of cached entries per table
+        --no-dedup    upload files with unchanged content again
+        --include     glob pattern of result files to download
+        --exclude     glob pattern of result files to skip
+        --max-size    maximum size of a result file to download
+        --no-post     no summary of solver output files after download
+        --tag         tag of submitted jobs, lookup of jobs in the journal by tag
+        --job-name    lookup of jobs in the journal by job name (glob pattern)
+        --since       lookup of jobs in the journal submitted since date
+        --until       lookup of jobs in the journal submitted before date
+        --validate    offline check of submit, sweep or download files, files are hashed,
+                      the upload size is estimated
+        --pool        one session per token of the token file for STATUS, SUBMIT, DOWNLOAD and SWEEP
+        --metrics-dir directory of the transfer metrics files (Prometheus textfile and jsonl)
+        --no-metrics  do not collect and write transfer metrics
+        --older-than  PRUNE documents with the newest job older than days
+        --keep-last   PRUNE keeps the newest documents
+        --prune-status PRUNE only documents with all jobs in these statuses
+        --downloaded  PRUNE only documents with all result files complete in a download manifest
+        --dry-run     PRUNE writes only the preview
+        sources       further decks, directories, glob patterns or submit files for SWEEP,
+                      calc directories with download manifests for PRUNE --downloaded
+    if actions are: SUBMIT, DOWNLOAD, WATCH, TAIL a file is needed, which defines further information for this action,
+    SWEEP takes a directory, glob pattern, deck or submit file and optional further sources,
+    without sources an interrupted SWEEP is continued
+    """
+    dir_current = os.getcwd()
+    dir_script = os.path.dirname(os.path.realpath(__file__))
+    term_program = os.getenv("TERM_PROGRAM")
+    parser = get_parser()
+    args = parser.parse_args(argv)            
+    # debug information
+    if args.debug:
+        print ("========== DEBUG is ON ...")
+        print (dir_current)
+        print (dir_script)
+        print (term_program)
+        print (type(parser), type(args))
+        print ("ARGUMENTS: ", args)
+        print ("ARG VARs:  ", args.action, args.file, args.token, args.debug)
+        print ("==========")
+    # action handling, SUBMIT and DOWNLOAD require an action file 
+    if args.action:
+        print (args.action)
+        if args.action == "SUBMIT" or args.action == "DOWNLOAD" or args.action == "WATCH" or args.action == "TAIL":
+            print (args.file)
+            if args.file and os.path.exists(args.file):
+                print (" action file found...")
+            elif args.action != "SUBMIT" and not args.file and has_journal_filter(args):
+                print (" jobs of journal ...")
+            else:
+                print (" ERROR: action file not found ...\n")
+                args = parser.parse_args(['-h'])               
+    # token handling      
+    if args.token:
+        print (args.token)
+        if os.path.exists(args.token):
+            print (" token file found ...")
+        else:
+            print (" WARNING: token file not found ...")
+    if not args.token:
+        print ("no args.token, try to read rc token file ...")
+        if os.path.exists(dir_script + "/ncwrc"):
+            print (" rc token file found ...")
+        else: 
+            print (" rc token file not found ...\n")
+            args = parser.parse_args(['-h'])                           
+    # return argparse Namespace object         
+    return args
+ 
+
+
+
+
+def get_file_hash(file_name):
+    """
+    get file hash
+
+    sha256 checksum of a file, read in blocks to keep memory low for big files
+    """
+    file_hash = hashlib.sha256()
+    file_in = open(file_name, "rb")
+    for block in iter(lambda: file_in.read(1024**2), b""):
+        file_hash.update(block)
+    file_in.close()
+    return file_hash.hexdigest()
+
+
+
+
+
+def is_transient_error(e):
+    """
+    is transient error
+
+    classify an error of a request or transfer, transient errors (connection, timeout,
+    busy server) are tried again, fatal errors (missing file, permission, authorization,
+    wrong values) are raised at once, an http status of the error (status, status_code)
+    decides before the message, errors of the client without known type are classified
+    by the message (TRANSIENT_PATTERN), unknown errors count as fatal
+    """
+    if isinstance(e, (FileNotFoundError, PermissionError, IsADirectoryError, NotADirectoryError, ValueError, 
+            KeyError, TypeError, AttributeError)):
+        return False
+    status = getattr(e, "status", None) or getattr(e, "status_code", None)
+    if isinstance(status, int) and 400 <= status < 600:
+        return status in TRANSIENT_STATUS
+    message = str(e).lower()
+    if FATAL_PATTERN.search(message):
+        return False
+    if isinstance(e, (ConnectionError, TimeoutError, socket.timeout)):
+        return True
+    if isinstance(e, OSError) and e.errno is not None:
+        return e.errno in TRANSIENT_ERRNOS
+    return TRANSIENT_PATTERN.search(message) is not None
+
+
+
+
+
+def retry_call(function, retries, name=""):
+    """
+    retry call
+
+    call the function, transient errors are tried again up to retries times after
+    a backoff with jitter, random between 0 and RETRY_BASE * 2**attempt seconds
+    (at most RETRY_MAX), so parallel transfers do not retry at the same time,
+    fatal errors and the error of the last attempt are raised
+    """
+    for attempt in range(retries + 1):
+        try:
+            return function()
+        except TransferSkipped:
+            raise
+        except Exception as e:
+            if attempt == retries or not is_transient_error(e):
+                raise
+            delay = random.uniform(0.0, min(RETRY_MAX, RETRY_BASE * 2**attempt))
+            print ("\n WARNING: ", name, " ", e, " retry ", attempt + 1, " of ", retries, " in %.1fs" % delay)
+            time.sleep(delay)
+
+
+
+
+
+def get_result_entry(entry):
+    """
+    get result entry
+
+    path and size of an entry of a result list, the client lists a file as path or as
+    object with path and size, the size is None if the list has no size
+    """
+    if isinstance(entry, dict):
+        return str(entry.get("path", entry.get("name", ""))), entry.get("size")
+    if hasattr(entry, "path"):
+        return str(entry.path), getattr(entry, "size", None)
+    return str(entry), None
+
+
+
+
+
+def supports_offset(function):
+    """
+    supports offset
+
+    the transfer function of the client can continue at an offset
+    """
+    import inspect
+    try:
+        return "offset" in inspect.signature(function).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+
+
+
+def get_ncw_dir():
+    """
+    get ncw dir
+
+    directory for local ncw files as cache and indexes, this is the directory of
+    environment variable NCW_DIR or ncw in the user data directory (XDG_DATA_HOME,
+    default ~/.local/share), runtime files are never written into the installation
+    """
+    data_dir = os.getenv("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    ncw_dir = os.getenv("NCW_DIR") or os.path.join(data_dir, "ncw")
+    os.makedirs(ncw_dir, exist_ok=True)
+    return ncw_dir
+
+
+
+
+
+def load_client():
+    """
+    load client
+
+    class of the nexus compute client, it is imported with the first session,
+    so that help and validation run without the client and without NodeJS
+    """
+    global NexusCompute
+    if NexusCompute is None:
+        from nexuscompute import NexusCompute
+    return NexusCompute
+
+
+
+
+
+def is_terminal_status(status):
+    """
+    is terminal status
+
+    job status (JobStatus or its text) of a finished job which does not change anymore
+    """
+    return str(status).split(".")[-1] in TERMINAL_STATUS
+
+
+
+
+def get_listing_key(entry_dict):
+    """
+    get listing key
+
+    entry of the document list as text with all fields the client returns (job count,
+    modification time, ...), a changed document has another key, fields are sorted
+    """
+    return json.dumps(entry_dict, sort_keys=True, default=str)
+
+
+
+
+
+def parse_size(size_text):
+    """
+    parse size
+
+    size in bytes from a text with optional unit, for example: 1500, 500KB, 20MB, 2GB
+    the units are decimal as in the progress output
+    """
+    size_text = str(size_text).strip().upper()
+    units = {"TB":1000**4, "GB":1000**3, "MB":1000**2, "KB":1000, "T":1000**4, "G":1000**3, "M":1000**2, "K":1000, "B":1}
+    for unit, factor in units.items():
+        if size_text.endswith(unit):
+            return int(float(size_text[:-len(unit)]) * factor)
+    return int(float(size_text))
+
+
+
+
+
+def parse_date(date_text):
+    """
+    parse date
+
+    timestamp of a date (2024-05-31) or date and time (2024-05-31 14:30), None stays None
+    """
+    if date_text is None:
+        return None
+    for date_format in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(date_text.strip(), date_format).timestamp()
+        except ValueError:
+            pass
+    raise ValueError("date not readable: " + date_text)
+
+
+
+
+
+def get_document_time(doc_name, job_dict, submitted=None):
+    """
+    get document time
+
+    timestamp of the newest submission into a document, from the journal (submitted)
+    or from the default names doc_<time> and job_<time>, None if not known
+    """
+    time_list = []
+    if submitted:
+        time_list.append(submitted)
+    for name in [doc_name] + [job_feat['name'] for job_feat in job_dict.values()]:
+        match = NAME_TIME_PATTERN.search(str(name))
+        if match is None:
+            continue
+        try:
+            time_list.append(datetime.strptime(match.group(1), "%Y%m%d%H%M%S").timestamp())
+        except ValueError:
+            pass
+    if len(time_list) == 0:
+        return None
+    return max(time_list)
+
+
+
+
+
+def has_journal_filter(args):
+    """
+    has journal filter
+
+    lookup options of the journal are given
+    """
+    return any([value is not None for value in (args.job_name, args.tag, args.since, args.until)])
+
+
+
+
+
+def filter_result_file(job_file, include, exclude):
+    """
+    filter result file
+
+    check a result file against include and exclude glob patterns,
+    the patterns are compared case insensitive with the file name and the complete path,
+    without include patterns all files are included, exclude patterns win
+    """
+    names = [job_file.lower(), os.path.basename(job_file).lower()]
+    def matches(patterns):
+        for pattern in patterns:
+            for name in names:
+                if fnmatch.fnmatchcase(name, pattern.lower()):
+                    return True
+        return False
+    if len(include) > 0 and not matches(include):
+        return False
+    return not matches(exclude)
+
+
+
+
+
+def get_post_files(job_dir):
+    """
+    get post files
+
+    name, size and modification time of the files of a job directory which are scanned
+    """
+    file_list = []
+    for file_name in sorted(os.listdir(job_dir)):
+        if os.path.splitext(file_name)[1].lower() in POST_EXTENSIONS:
+            path = os.path.join(job_dir, file_name)
+            file_list.append([file_name, os.path.getsize(path), os.path.getmtime(path)])
+    return file_list
+
+
+
+
+
+def read_post_summary(job_dir, file_list):
+    """
+    read post summary
+
+    summary of an earlier scan of the job directory, None if there is none or
+    a file was added, removed or changed since
+    """
+    if not os.path.exists(job_dir + "/" + POST_SUMMARY_FILE):
+        return None
+    file_in = open(job_dir + "/" + POST_SUMMARY_FILE, "r")
+    try:
+        entry = json.load(file_in)
+    except ValueError:
+        return None
+    finally:
+        file_in.close()
+    if entry.get("files") != file_list:
+        return None
+    return entry.get("summary")
+
+
+
+
+
+def write_post_summary(job_dir, file_list, summary):
+    """
+    write post summary
+
+    keep the summary of a job directory with the scanned files
+    """
+    file_out = open(job_dir + "/" + POST_SUMMARY_FILE, "w")
+    json.dump({"files": file_list, "summary": summary}, file_out)
+    file_out.close()
+
+
+
+
+
+def scan_job_results(job_dir):
+    """
+    scan job results
+
+    summary of the .f06, .f04 and .log files of a job directory, the files are memory
+    mapped, so also files of tens of GB are not read into memory:
+    - fatal and warning messages are counted in the whole file, the maximum of all files
+      is taken because f06 and f04 contain the same messages
+    - cpu and wall time and peak memory are taken from the last part of the files
+    - status: FATAL, NOT CONVERGED, CONVERGED, COMPLETED (end of job found) or INCOMPLETE
+
+    runs in a worker process, so only the result dictionary is returned
+    """
+    import mmap
+    summary = {"fatal": 0, "warning": 0, "cpu": None, "wall": None, "memory": None, "status": "INCOMPLETE"}
+    found = {"converged": False, "not_converged": False, "end": False}
+    values = {}
+    for file_name in sorted(os.listdir(job_dir)):
+        path = os.path.join(job_dir, file_name)
+        if os.path.splitext(file_name)[1].lower() not in POST_EXTENSIONS or os.path.getsize(path) == 0:
+            continue
+        file_in = open(path, "rb")
+        mm = mmap.mmap(file_in.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            fatal, warning = 0, 0
+            for position in iter_occurrences(mm, b"MESSAGE"):
+                context = mm[max(0, position - 16):position]
+                if b"FATAL" in context:
+                    fatal += 1
+                elif b"WARNING" in context:
+                    warning += 1
+            summary["fatal"] = max(summary["fatal"], fatal)
+            summary["warning"] = max(summary["warning"], warning)
+            for key in CONVERGENCE_KEYS:
+                for position in iter_occurrences(mm, key):
+                    context = mm[max(0, position - 16):position + 24]
+                    if any([m in context for m in NOT_CONVERGED_MESSAGES]):
+                        found["not_converged"] = True
+                    elif any([m in context for m in CONVERGED_MESSAGES]):
+                        found["converged"] = True
+            tail = mm[max(0, len(mm) - POST_TAIL):]
+            found["end"] = found["end"] or any([m in tail for m in END_MESSAGES])
+            for key, pattern in POST_PATTERNS:
+                for match in pattern.finditer(tail):
+                    value = float(match.group(1))
+                    if key == "memory":
+                        unit = (match.group(2) or b"MB").upper()
+                        value = value * {b"GB": 1000.0, b"MB": 1.0, b"KB": 0.001}[unit]
+                        values[key] = max(values.get(key, 0.0), value)
+                    else:
+                        values[key] = value
+        finally:
+            mm.close()
+            file_in.close()
+    summary["wall"] = values.get("wall")
+    summary["memory"] = values.get("memory")
+    summary["cpu"] = values.get("cpu")
+    if "user" in values:
+        summary["cpu"] = values["user"] + values.get("sys", 0.0)
+    if summary["fatal"] > 0:
+        summary["status"] = "FATAL"
+    elif found["not_converged"]:
+        summary["status"] = "NOT CONVERGED"
+    elif found["converged"]:
+        summary["status"] = "CONVERGED"
+    elif found["end"]:
+        summary["status"] = "COMPLETED"
+    return summary
+
+
+
+
+
+def iter_occurrences(mm, text):
+    """
+    iterate occurrences
+
+    positions of a text in a memory mapped file
+    """
+    position = mm.find(text)
+    while position >= 0:
+        yield position
+        position = mm.find(text, position + len(text))
+
+
+
+
+
+def write_report_file(output_list, file_name, cr, print_flag):
+    """
+    write report file
+    
+    with file name a line list will be written into file
+    CR argument decides, whether a carriage return is written for each line
+
+    if the print flag is set, then the content will be printed
+
+    in case of dict instead of list to be printed, the dict will be converted 
+    into a list with key and value
+
+    output_list - dict or list
+    file_name   - file_name that is created
+    cr          - carriage return flag
+    print_flag  - print flag
+    """
+    # variables
+    line_list = []
+    # set carriage return
+    if cr == "CR":
+        cr = "\n"
+    else:
+        cr = ""
+    # if output list is a dictionary
+    if isinstance(output_list, dict):
+        for k,v in output_list.items():
+            line_list.append(str(k) + "  " + str(v))
+    if isinstance(output_list, list):
+        line_list = output_list
+    # print if required
+    if print_flag == "PRINT":
+        for line in line_list:
+            print (line)
+    # write content to file
+    file_out = open(file_name,"w")
+    file_out.writelines([l+cr for l in line_list])
+    file_out.close()    
+
+
+
+
+
+def get_submission_info(submit_info_file):
+    """
+    get submission info
+    
+    for analysis a submit_info_file is read that contains information
+    as document name, job name and analysis file names
+
+    if there is no document name a default name is provided
+    if there are no job names, some default job names are provided
+
+    the directory of submit info file is assumed as the same directory where the analysis files
+    are stored except the analysis file definition contains a dedicated directory,
+    for example:
+        file:a1.dat
+        file:a2.dat
+    means, that these files are located in the same directory of submit_info_file,
+    and with:
+        file:c:/tmp/dir_a1/a1.dat
+        file:c:/tmp/dir_a2/a2.dat
+    the directory of the file definition is used to upload the file to nexus environment
+
+    INCLUDE statements of the analysis files are resolved recursively, the included files
+    are uploaded once per document and attached to the jobs which need them
+
+    with a document id the jobs are submitted into an already existing document,
+    files with unchanged content in that document are not uploaded again:
+        doc_id:f78149a5-9382-47cb-bf4b-6978624c3a23
+
+    the job settings of the deck analysis can be overridden for all jobs of the file:
+        hardware:large
+        nb_nodes:1
+        mem:8gb
+        smp:4
+        dmp:1
+        runtime:6
+
+    the complete infomation is stored in a dictionary for further usage
+    """
+    # startup info
+    print ("get submission info from file: ", submit_info_file)
+    current_dir = os.getcwd()
+    print (current_dir)
+    # variable definition
+    return_dict = {"DOC":"","DOC_ID":"","CALC_DIR":"","JOBS":[],"CALC_FILES":[],"INCLUDES":[], "ERRORS":[], "WARNINGS":[],
+        "SETTINGS":{}}
+    job_list = []
+    file_list = []
+    current_time = datetime.now().strftime("%Y%m%d%H%M%S")
+    # split in calc_dir and according files
+    calc_dir, info_file = os.path.split(submit_info_file)
+    # print ("splitted calc dir and info file: ", calc_dir, info_file)
+    return_dict["CALC_DIR"] = calc_dir
+    # read submission info file
+    file_in = open(submit_info_file,'r')
+    line_list = file_in.readlines()
+    file_in.close()
+    # collect and assign infos to dictionary
+    for line in line_list:
+        line = line.strip()
+        entry_list = line.split(':')
+        if entry_list[0].upper() == "DOC":
+            return_dict["DOC"] = entry_list[1]
+        if entry_list[0].upper() == "DOC_ID":
+            return_dict["DOC_ID"] = entry_list[1].strip()
+        if entry_list[0].upper() == "JOB":
+            return_dict["JOBS"].append(entry_list[1])
+        if entry_list[0].lower() in JOB_DEFAULTS and len(entry_list) > 1:
+            return_dict["SETTINGS"][entry_list[0].lower()] = entry_list[1].strip()
+        if entry_list[0].upper() == "FILE":
+            if "/" in line or "\\" in line:
+                file_to_check = line[5:].strip()
+            else:
+                if len(return_dict["CALC_DIR"]) > 0:
+                    file_to_check = return_dict["CALC_DIR"] + "/" + entry_list[1]
+                else:
+                    file_to_check = entry_list[1]
+            # check file existance
+            if os.path.exists(file_to_check):
+                print (" file check: ", file_to_check, "  PASSED")
+                return_dict["CALC_FILES"].append(file_to_check)
+                # included files are uploaded and attached together with the analysis file
+                include_list, include_errors, include_warnings = get_include_files(file_to_check)
+                for local, remote in include_list:
+                    print ("  include: ", local, "  ->  ", remote)
+                for error in include_errors + include_warnings:
+                    print (" " + error)
+                return_dict["INCLUDES"].append(include_list)
+                return_dict["ERRORS"].extend(include_errors)
+                return_dict["WARNINGS"].extend(include_warnings)
+            else:
+                print (" ERROR: ", file_to_check, " does not exist")
+                return_dict["ERRORS"].append("ERROR: "+file_to_check+" does not exist")
+    # clean up and fill up the dictionary with defaults if needed
+    # assign doc if does not exist and get job_list and file_list, assign job if no job 
+    for k,v in return_dict.items():
+        if k == "DOC" and len(v)==0:
+            return_dict["DOC"] = "doc_" + current_time
+        if k == "JOBS":
+            job_list= v
+        if k == "CALC_FILES":
+            file_list = v
+    if len(job_list) == 0:
+        job_list.append('job_' + current_time)
+    # to less job names available, fill them up
+    if len(job_list)<len(file_list):
+        last_job_name = job_list[len(job_list)-1]
+        for i in range(len(file_list)-len(job_list)):
+            job_list.append(last_job_name + "_" + str(i+1))
+        return_dict["JOBS"] = job_list
+    # number of jobs is greater then number of files, reduce jobs
+    if len(job_list) > len(file_list):
+        for i in range(len(job_list)-len(file_list)):
+            job_list.pop()
+    # dictionary with doc, job, analysis file information
+    return return_dict
+
+
+
+def read_include_statements(deck_file):
+    """
+    read include statements
+
+    stream a Nastran deck line by line and return the file names of INCLUDE statements,
+    the quoted file name can be continued over several lines, for example:
+        INCLUDE 'mesh/grid.bdf'
+        INCLUDE '/data/model/
+                 properties.bdf'
+    only single lines are kept in memory, so multi-GB decks can be read
+    """
+    include_names = []
+    statement = None
+    file_in = open(deck_file, "rb")
+    for line in file_in:
+        if statement is None:
+            text = line.lstrip()
+            if text[:7].upper() != b"INCLUDE" or text[7:8] not in (b" ", b"\t", b"'"):
+                continue
+            statement = text[7:].strip()
+        elif line.lstrip()[:1] != b"$":
+            statement += line.strip()
+        # file name in quotes is complete, or file name without quotes
+        if statement.count(b"'") >= 2:
+            include_names.append(statement.split(b"'")[1].decode("latin-1").strip())
+            statement = None
+        elif statement.count(b"'") == 0 and statement != b"":
+            include_names.append(statement.split()[0].decode("latin-1"))
+            statement = None
+    file_in.close()
+    return include_names
+
+
+
+
+
+def get_include_files(deck_file):
+    """
+    get include files
+
+    resolve the INCLUDE statements of a deck and of all included files,
+    relative file names are searched in the directory of the deck and in the directory
+    of the including file, the document path is the file name as written in the statement,
+    so that the deck finds the file in nexus
+
+    returns list of (local file, document path), list of errors (missing files)
+    and list of warnings (absolute file names)
+    """
+    include_list = []
+    error_list = []
+    warning_list = []
+    deck_dir = os.path.dirname(deck_file)
+    seen = set([os.path.realpath(deck_file)])
+    stack = [deck_file]
+    while len(stack) > 0:
+        current_file = stack.pop(0)
+        for name in read_include_statements(current_file):
+            remote = name.replace("\\", "/")
+            if remote.startswith("./"):
+                remote = remote[2:]
+            if os.path.isabs(name) or ":" in name:
+                local = name
+                remote = os.path.basename(remote)
+                warning_list.append("WARNING: absolute include " + name + " in " + current_file + " is uploaded as " + remote)
+            else:
+                local = os.path.join(deck_dir, name)
+                if not os.path.exists(local):
+                    local = os.path.join(os.path.dirname(current_file), name)
+            if not os.path.exists(local):
+                error_list.append("ERROR: include " + name + " in " + current_file + " does not exist")
+                continue
+            if os.path.realpath(local) in seen:
+                continue
+            seen.add(os.path.realpath(local))
+            include_list.append((local, remote))
+            stack.append(local)
+    return include_list, error_list, warning_list
+
+
+
+
+
+def analyze_deck(deck_file, include_list=[], upload_index=None):
+    """
+    analyze deck
+
+    count GRID points and elements and find the solution sequence of a deck and
+    its include files (list of local and document path), the degrees of freedom are
+    estimated with 6 per GRID
+
+    every file is analyzed on its own, with an upload index the result of an unchanged
+    file is taken from the index, so an include of several decks is read once
+    """
+    analysis = {"SOL": "", "GRIDS": 0, "ELEMENTS": 0, "DOFS": 0}
+    file_list = [deck_file] + [local for local, remote in include_list]
+    for i, file_name in enumerate(file_list):
+        if upload_index is not None:
+            counts = upload_index.get_analysis(file_name, i == 0)
+        else:
+            counts = analyze_file(file_name, i == 0)
+        analysis["SOL"] = counts.get("SOL", analysis["SOL"])
+        analysis["GRIDS"] += counts["GRIDS"]
+        analysis["ELEMENTS"] += counts["ELEMENTS"]
+    analysis["SOL"] = SOL_NAMES.get(analysis["SOL"], analysis["SOL"])
+    analysis["DOFS"] = 6 * analysis["GRIDS"]
+    return analysis
+
+
+
+
+
+def analyze_file(file_name, sol_search=True):
+    """
+    analyze file
+
+    count GRID points and elements of a deck or include file, with sol_search the
+    solution sequence is searched until BEGIN BULK
+
+    the file is read in blocks and the cards are found with regular expressions at
+    the start of a line, so multi-GB decks are read with some seconds per GB, cards
+    in lower case are not counted
+    """
+    counts = {"GRIDS": 0, "ELEMENTS": 0}
+    if sol_search:
+        counts["SOL"] = ""
+    rest = b"\n"
+    file_in = open(file_name, "rb")
+    for block in iter(lambda: file_in.read(4 * 1024**2), b""):
+        # only complete lines, the rest is read with the next block
+        block = rest + block
+        end = block.rfind(b"\n")
+        if end <= 0:
+            end = len(block)
+        block, rest = block[:end], block[end:]
+        if sol_search:
+            match = SOL_PATTERN.search(block)
+            if match is not None:
+                counts["SOL"] = match.group(1).decode("latin-1").upper()
+            sol_search = match is None and b"BEGIN BULK" not in block.upper()
+        counts["GRIDS"] += len(GRID_PATTERN.findall(block))
+        counts["ELEMENTS"] += len(ELEMENT_PATTERN.findall(block))
+    counts["GRIDS"] += len(GRID_PATTERN.findall(rest))
+    counts["ELEMENTS"] += len(ELEMENT_PATTERN.findall(rest))
+    file_in.close()
+    return counts
+
+
+
+
+
+def get_job_settings(analysis, solver_configs, overrides={}):
+    """
+    get job settings
+
+    hardware, nodes, memory, smp, dmp and runtime of a job from the deck analysis:
+    - the degrees of freedom select a size class with memory, smp and runtime
+    - the solution sequence scales memory and runtime (eigen, dynamic, nonlinear, optimization)
+    - the hardware is the smallest configuration of the solver configurations with
+      enough cores and memory, without these numbers the configuration of the size class
+    - very large eigen and dynamic solutions use dmp on two nodes
+
+    values of the submit file override the settings, for every setting the reason is returned
+    """
+    settings = dict(JOB_DEFAULTS)
+    reasons = []
+    dofs = analysis["DOFS"]
+    sol_type = SOL_TYPES.get(analysis["SOL"], "static")
+    mem_factor, runtime_factor = SOL_FACTORS[sol_type]
+    size_class = 0
+    while SIZE_CLASSES[size_class][0] is not None and dofs >= SIZE_CLASSES[size_class][0]:
+        size_class += 1
+    max_dofs, mem_gb, smp, runtime = SIZE_CLASSES[size_class]
+    size_text = str(dofs) + " dofs (" + str(analysis["GRIDS"]) + " grids, " + str(analysis["ELEMENTS"]) + \
+        " elements), size class " + str(size_class + 1) + " of " + str(len(SIZE_CLASSES))
+    sol_text = "sol " + (analysis["SOL"] or "unknown") + " " + sol_type
+    mem_gb = int(math.ceil(mem_gb * mem_factor))
+    settings["mem"] = str(mem_gb) + "gb"
+    reasons.append("mem " + settings["mem"] + ": " + size_text + ", " + sol_text + " x" + str(mem_factor))
+    settings["smp"] = smp
+    reasons.append("smp " + str(smp) + ": size class " + str(size_class + 1))
+    if size_class == len(SIZE_CLASSES) - 1 and sol_type in ("eigen", "dynamic"):
+        settings["dmp"] = 2
+        settings["nb_nodes"] = 2
+        reasons.append("dmp 2, nb_nodes 2: " + sol_text + " of largest size class")
+    else:
+        reasons.append("dmp 1, nb_nodes 1: " + sol_text + ", size class " + str(size_class + 1))
+    settings["runtime"] = int(math.ceil(runtime * runtime_factor))
+    reasons.append("runtime " + str(settings["runtime"]) + "h: size class " + str(size_class + 1) + ", " + 
+        sol_text + " x" + str(runtime_factor))
+    # hardware of the solver configurations
+    configs = solver_configs.get("nastran", {}).get("configs", {})
+    if len(configs) > 0:
+        config_names = list(configs.keys())
+        config_sizes = {}
+        for name, config in configs.items():
+            if isinstance(config, dict):
+                cores = config.get("cores", config.get("cpus"))
+                memory = config.get("memory", config.get("ram"))
+                if isinstance(cores, (int, float)) and isinstance(memory, (int, float)):
+                    config_sizes[name] = (cores, memory)
+        if len(config_sizes) == len(configs):
+            fitting = sorted([(size, name) for name, size in config_sizes.items() 
+                if size[0] >= settings["smp"] and size[1] >= mem_gb])
+            if len(fitting) > 0:
+                settings["hardware"] = fitting[0][1]
+                reasons.append("hardware " + settings["hardware"] + ": smallest configuration with " + 
+                    str(settings["smp"]) + " cores and " + str(mem_gb) + "gb")
+            else:
+                settings["hardware"] = max([(size, name) for name, size in config_sizes.items()])[1]
+                reasons.append("hardware " + settings["hardware"] + ": largest configuration, no configuration with " + 
+                    str(settings["smp"]) + " cores and " + str(mem_gb) + "gb")
+        else:
+            index = int(round(size_class * (len(config_names) - 1) / (len(SIZE_CLASSES) - 1)))
+            settings["hardware"] = config_names[index]
+            reasons.append("hardware " + settings["hardware"] + ": configuration " + str(index + 1) + " of " + 
+                str(len(config_names)) + " for size class " + str(size_class + 1))
+    else:
+        reasons.append("hardware " + settings["hardware"] + ": no solver configurations, default")
+    # settings of the submit file
+    for key, value in overrides.items():
+        if key in ("nb_nodes", "smp", "dmp", "runtime"):
+            try:
+                value = int(value)
+            except ValueError:
+                reasons.append("WARNING: " + key + " " + str(value) + " of submit file is no number, ignored")
+                continue
+        if key == "hardware" and len(configs) > 0 and value not in configs:
+            reasons.append("WARNING: hardware " + value + " not in solver configurations")
+        settings[key] = value
+        reasons.append(key + " " + str(value) + ": submit file")
+    return settings, reasons
+
+
+
+
+
+def get_upload_files(submit_dict):
+    """
+    get upload files
+
+    shared upload set of the analysis files and their includes of a submission,
+    every document path is uploaded once, returned are the dictionary of document path
+    and local file, the document paths of every job and errors for document paths
+    which are used for different local files
+    """
+    # variables
+    upload_dict = {}
+    job_files = []
+    errors = []
+    for i, local_file_name in enumerate(submit_dict['CALC_FILES']):
+        local_dir, file_name = os.path.split(local_file_name)
+        job_files.append([file_name] + [remote for local, remote in submit_dict['INCLUDES'][i]])
+        for local, remote in [(local_file_name, file_name)] + submit_dict['INCLUDES'][i]:
+            if remote in upload_dict and os.path.realpath(upload_dict[remote]) != os.path.realpath(local):
+                errors.append("ERROR: document path " + remote + " used for " + upload_dict[remote] + " and " + local)
+                continue
+            upload_dict[remote] = local
+    return upload_dict, job_files, errors
+
+
+
+
+
+def get_sweep_entries(sources):
+    """
+    get sweep entries
+
+    decks of a sweep with their include files, a source can be:
+    - a directory, all decks (*.dat, *.bdf, *.nas) in the directory
+    - a glob pattern, for example runs/*/model.dat
+    - a deck
+    - a submit file, the decks with document, document id and job names of the submit file
+
+    files of a directory or glob pattern which are included by other decks are no jobs,
+    decks without submit file have no document name, they are submitted into the
+    document of the sweep queue, the job name is the file name of the deck without extension
+
+    returns list of entries and list of errors (missing sources, decks and includes)
+    """
+    # variables
+    entry_list = []
+    deck_list = []
+    errors = []
+    for source in sources:
+        if os.path.isdir(source):
+            deck_list.extend(sorted([os.path.join(source, f) for f in os.listdir(source) 
+                if os.path.splitext(f)[1].lower() in DECK_EXTENSIONS]))
+        elif any([c in source for c in "*?["]):
+            deck_list.extend(sorted(glob.glob(source)))
+        elif not os.path.exists(source):
+            print (" ERROR: ", source, " does not exist")
+            errors.append("ERROR: " + source + " does not exist")
+        elif os.path.splitext(source)[1].lower() in DECK_EXTENSIONS:
+            deck_list.append(source)
+        else:
+            submit_dict = get_submission_info(source)
+            errors.extend(submit_dict["ERRORS"])
+            for i, deck_file in enumerate(submit_dict["CALC_FILES"]):
+                entry_list.append({"deck": os.path.realpath(deck_file), "job": submit_dict["JOBS"][i], 
+                    "doc": submit_dict["DOC"], "doc_id": submit_dict["DOC_ID"], "settings": submit_dict["SETTINGS"],
+                    "calc_dir": os.path.realpath(submit_dict["CALC_DIR"] or "."),
+                    "files": [[os.path.realpath(local), remote] for local, remote in 
+                        [(deck_file, os.path.basename(deck_file))] + submit_dict["INCLUDES"][i]]})
+    # includes of the decks
+    include_dict = {}
+    included = set()
+    for deck_file in deck_list:
+        include_list, include_errors, include_warnings = get_include_files(deck_file)
+        for error in include_errors + include_warnings:
+            print (" " + error)
+        errors.extend(include_errors)
+        include_dict[deck_file] = include_list
+        included.update([os.path.realpath(local) for local, remote in include_list])
+    for deck_file in deck_list:
+        if os.path.realpath(deck_file) in included:
+            continue
+        entry_list.append({"deck": os.path.realpath(deck_file), "job": os.path.splitext(os.path.basename(deck_file))[0],
+            "doc": "", "doc_id": "", "calc_dir": os.getcwd(),
+            "files": [[os.path.realpath(local), remote] for local, remote in 
+                [(deck_file, os.path.basename(deck_file))] + include_dict[deck_file]]})
+    return entry_list, errors
+
+
+
+
+
+def write_retry_submit_file(file_name, doc_id, submit_dict, job_indices):
+    """
+    write retry submit file
+
+    submit file for the jobs of a submission which are not submitted, with the document id,
+    job names, absolute file names and the settings of the original submit file
+    """
+    line_list = ["DOC:" + submit_dict["DOC"], "DOC_ID:" + doc_id]
+    for key, value in submit_dict["SETTINGS"].items():
+        line_list.append(key + ":" + str(value))
+    for i in job_indices:
+        line_list.append("JOB:" + submit_dict["JOBS"][i])
+    for i in job_indices:
+        line_list.append("file:" + os.path.realpath(submit_dict["CALC_FILES"][i]))
+    file_out = open(file_name, 'w')
+    file_out.writelines([l+"\n" for l in line_list])
+    file_out.close()
+
+
+
+
+
+def rename_current_log_file_name(filename):
+    """
+    rename current log file name
+
+    an existing log file is renamed with the next counter (name.1, name.2, ...),
+    the counters are found with one listing of the directory,
+    the new name is returned or "" if there was no log file
+    """
+    if not os.path.exists(filename):
+        return ""
+    directory, base_name = os.path.split(filename)
+    counter = 0
+    for name in os.listdir(directory or "."):
+        if name.startswith(base_name + ".") and name[len(base_name) + 1:].isdigit():
+            counter = max(counter, int(name[len(base_name) + 1:]))
+    renamed = f"{filename}.{counter + 1}"
+    os.rename(filename, renamed)
+    # as return the new last file name is sent
+    return renamed
+
+
+
+
+
+def get_download_info(download_file):
+    """
+    get download info
+
+    if files needs to be downloaded a document id and a job id is needed,
+    all these information are saved into submission log file,
+    if that is not available, the ids can be grabbed from the status information 
+
+    an example download file could be (containing doc id, job id and optional calc dir):
+    DOC_ID:c380b241-d3dd-49c4-ae0d-0626c5f79abd
+    CALC_DIR:c:/tmp/python/nexus/dir_analysis
+    JOB_ID:28d999e4-e147-60fb-d905-9c0a454713ea
+    JOB_ID:3e49a037-1407-f897-396b-82dece509ad6
+
+    optional filters select the result files, glob patterns are separated by comma
+    and the maximum size can have a unit (KB, MB, GB):
+    INCLUDE:*.f06,*.f04,*.log
+    EXCLUDE:*.op2
+    MAX_SIZE:500MB
+
+    several documents can be defined, for example by joined submit output files,
+    job ids and calc dir belong to the document defined before, these are collected
+    in the list DOCS with one dictionary per document
+
+    instead of job ids the jobs can be selected by queries, the jobs of documents without
+    JOB_ID lines are selected by status and job name (glob patterns), separated by comma,
+    without these keys all jobs of the document are selected:
+    STATUS:Done
+    JOB_NAME:wing_*,flap_*
+    ALL_DOCS selects all documents of the user with a matching name (glob pattern),
+    the results are stored in a directory with the document name in the calc directory:
+    CALC_DIR:c:/tmp/python/nexus/results
+    ALL_DOCS:sweep_2024*
+    """
+    # variables
+    return_dict = {"DOC_ID":"","CALC_DIR":".","JOB_IDS":[],"INCLUDE":[],"EXCLUDE":[],"MAX_SIZE":0,"DOCS":[],
+        "STATUS":[],"JOB_NAME":[],"ALL_DOCS":[]}
+    # read submission info file, without file the jobs are taken from the journal
+    line_list = []
+    if download_file is not None:
+        file_in = open(download_file,'r')
+        line_list = file_in.readlines()
+        file_in.close()
+    doc_dict = {}
+    doc_entry = {"DOC_ID":"","CALC_DIR":".","JOB_IDS":[]}
+    # sort lines in dictionary
+    for line in line_list:
+        line = line.strip()
+        if ":" in line:
+            entry_list = line.split(':')
+            if entry_list[0].strip() == 'DOC_ID':
+                return_dict['DOC_ID']=entry_list[1].strip()
+                # job ids before the first document id belong to the first document
+                if doc_entry["DOC_ID"] == "" and len(return_dict['DOCS']) == 0:
+                    doc_entry["DOC_ID"] = return_dict['DOC_ID']
+                    doc_entry["CALC_DIR"] = return_dict['CALC_DIR']
+                elif return_dict['DOC_ID'] in doc_dict:
+                    doc_entry = doc_dict[return_dict['DOC_ID']]
+                else:
+                    doc_entry = {"DOC_ID":return_dict['DOC_ID'],"CALC_DIR":return_dict['CALC_DIR'],"JOB_IDS":[]}
+                if doc_entry["DOC_ID"] not in doc_dict:
+                    doc_dict[doc_entry["DOC_ID"]] = doc_entry
+                    return_dict['DOCS'].append(doc_entry)
+            if entry_list[0].strip() == 'JOB_ID':
+                return_dict['JOB_IDS'].append(entry_list[1].strip())
+                doc_entry['JOB_IDS'].append(entry_list[1].strip())
+            if entry_list[0].strip() == 'CALC_DIR':
+                return_dict['CALC_DIR']=line[9:].strip()
+                doc_entry['CALC_DIR']=line[9:].strip()
+            if entry_list[0].strip() == 'ALL_DOCS':
+                for pattern in line.split(':',1)[1].split(','):
+                    if pattern.strip() != "":
+                        return_dict['ALL_DOCS'].append({"NAME":pattern.strip(),"CALC_DIR":return_dict['CALC_DIR']})
+            if entry_list[0].strip() in ('INCLUDE', 'EXCLUDE', 'STATUS', 'JOB_NAME'):
+                for pattern in line.split(':',1)[1].split(','):
+                    if pattern.strip() != "":
+                        return_dict[entry_list[0].strip()].append(pattern.strip())
+            if entry_list[0].strip() == 'MAX_SIZE':
+                return_dict['MAX_SIZE']=parse_size(entry_list[1])
+    # return according dictionary
+    return return_dict
+
+
+
+
+
+# VALIDATE ==============================================================================
+
+
+
+def validate_action(args):
+    """
+    validate action
+
+    offline check of an action without nexus compute client and NodeJS:
+    - SUBMIT: submit file, analysis and include files, content hashes, job settings and upload size
+    - SWEEP: decks of the sources with their include files, content hashes and upload size
+    - DOWNLOAD, WATCH, TAIL: download file, queries, filters and the jobs found in the journal
+
+    files which are already uploaded into the document of a submit file with the same content
+    (upload index) are not counted in the upload size, the solver configurations for the job
+    settings are taken from the cache, the lines are printed and written into ncw_output_validate.txt,
+    the number of errors is returned
+    """
+    print ("validate ", args.action, " ...")
+    # variables
+    line_list = []
+    errors = []
+    warnings = []
+    token = read_token(args)
+    if token == "":
+        errors.append("ERROR: no token in token file")
+    account = hashlib.sha256(token.encode()).hexdigest()[:16]
+    if args.action == "SUBMIT":
+        submit_dict = get_submission_info(args.file)
+        errors.extend(submit_dict["ERRORS"])
+        warnings.extend(submit_dict["WARNINGS"])
+        if len(submit_dict['CALC_FILES']) == 0:
+            errors.append("ERROR: no calc files for submission defined")
+        upload_dict, job_files, upload_errors = get_upload_files(submit_dict)
+        errors.extend(upload_errors)
+        upload_index = UploadIndex()
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+            file_hashes = dict(zip(upload_dict.keys(), executor.map(upload_index.get_hash, upload_dict.values())))
+            analysis_list = list(executor.map(lambda deck_file, include_list: analyze_deck(deck_file, include_list, 
+                upload_index), submit_dict['CALC_FILES'], submit_dict['INCLUDES']))
+        cache = MetadataCache(account, args.cache_ttl, args.cache_size, not args.no_cache)
+        solver_configs = cache.get_entry("solver_configs") or {}
+        cache.close()
+        line_list.append("document: " + (submit_dict['DOC_ID'] or submit_dict['DOC']))
+        for i, job in enumerate(submit_dict['JOBS']):
+            settings, reasons = get_job_settings(analysis_list[i], solver_configs, submit_dict['SETTINGS'])
+            line_list.append(" job " + job + ": " + " ".join([k + "=" + str(v) for k, v in settings.items()]))
+            for reason in reasons:
+                line_list.append("   " + reason)
+            warnings.extend([reason for reason in reasons if reason.startswith("WARNING")])
+        upload_size = 0
+        for remote, local in upload_dict.items():
+            size = os.path.getsize(local)
+            if not args.no_dedup and upload_index.remote.get((submit_dict['DOC_ID'], remote)) == file_hashes[remote]:
+                line_list.append("  " + remote + "  " + file_hashes[remote][:12] + "  uploaded before, reused")
+            else:
+                line_list.append("  " + remote + "  " + file_hashes[remote][:12] + "  %.2fMB" % (size/1000**2))
+                upload_size += size
+        line_list.append("upload: %d files, %.2fMB" % (len(upload_dict), upload_size/1000**2))
+    if args.action == "SWEEP":
+        sources = args.sources
+        if args.file:
+            sources = [args.file] + sources
+        entry_list, sweep_errors = get_sweep_entries(sources)
+        errors.extend(sweep_errors)
+        if len(entry_list) == 0 and not os.path.exists("ncw_sweep_queue.json"):
+            errors.append("ERROR: no decks for sweep defined")
+        local_files = {}
+        for entry in entry_list:
+            line_list.append(" job " + entry["job"] + ": " + entry["deck"] + ", " + str(len(entry["files"]) - 1) + 
+                " include files")
+            for local, remote in entry["files"]:
+                local_files[local] = os.path.getsize(local)
+        upload_index = UploadIndex()
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+            list(executor.map(upload_index.get_hash, local_files.keys()))
+        line_list.append("decks: %d, upload at most: %d files, %.2fMB" % (len(entry_list), len(local_files), 
+            sum(local_files.values())/1000**2))
+    if args.action in ("DOWNLOAD", "WATCH", "TAIL"):
+        try:
+            download_dict = get_download_info(args.file)
+        except ValueError as e:
+            download_dict = get_download_info(None)
+            errors.append("ERROR: download file not readable: " + str(e))
+        for doc_entry in download_dict['DOCS']:
+            if len(doc_entry['JOB_IDS']) > 0:
+                selection = str(len(doc_entry['JOB_IDS'])) + " jobs"
+            else:
+                selection = "jobs by query STATUS " + (",".join(download_dict['STATUS']) or "*") + ", JOB_NAME " + \
+                    (",".join(download_dict['JOB_NAME']) or "*")
+            line_list.append("document " + doc_entry['DOC_ID'] + ": " + selection + ", calc dir " + doc_entry['CALC_DIR'])
+        for query in download_dict['ALL_DOCS']:
+            line_list.append("documents " + query['NAME'] + ": calc dir " + query['CALC_DIR'])
+        if has_journal_filter(args):
+            try:
+                journal = RunJournal(account)
+                row_list = journal.find(job_name=args.job_name, tag=args.tag, since=parse_date(args.since), 
+                    until=parse_date(args.until))
+                journal.close()
+                line_list.append("journal: " + str(len(row_list)) + " jobs")
+                if len(row_list) == 0:
+                    errors.append("ERROR: no jobs found in the journal")
+            except ValueError as e:
+                errors.append("ERROR: " + str(e))
+        elif len(download_dict['DOCS']) == 0 and len(download_dict['ALL_DOCS']) == 0:
+            errors.append("ERROR: no doc id or job ids defined")
+        line_list.append("include: " + ",".join(download_dict['INCLUDE'] + (args.include or [])))
+        line_list.append("exclude: " + ",".join(download_dict['EXCLUDE'] + (args.exclude or [])))
+        try:
+            line_list.append("max size: " + str(parse_size(args.max_size) if args.max_size else download_dict['MAX_SIZE']))
+        except ValueError as e:
+            errors.append("ERROR: maximum size not readable: " + str(e))
+    # print and write result, warnings are printed but do not fail the validation
+    line_list.extend(warnings)
+    line_list.extend(errors)
+    line_list.append("validation " + ("failed with " + str(len(errors)) + " errors" if len(errors) > 0 else "passed") +
+        (", " + str(len(warnings)) + " warnings" if len(warnings) > 0 else ""))
+    print ("")
+    for line in line_list:
+        print (line)
+    file_out = open("ncw_output_validate.txt", 'w')
+    file_out.writelines([l+"\n" for l in line_list])
+    file_out.close()
+    return len(errors)
+
+
+
+
+
+# DAEMON ================================================================================
+
+
+
+
+
+class DaemonWriter():
+    """
+    daemon writer
+
+    file like object which sends the output of an action line by line as json messages
+    to the client of the daemon
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.lock = threading.Lock()
+
+
+
+    def send(self, message):
+        with self.lock:
+            try:
+                self.conn.sendall((json.dumps(message) + "\n").encode())
+            except OSError:
+                # client is gone, the action is finished anyway
+                pass
+
+
+
+    def write(self, text):
+        if text:
+            self.send({"out": text})
+        return len(text)
+
+
+
+    def flush(self):
+        pass
+
+
+
+
+
+def get_socket_name(args):
+    """
+    get socket name
+
+    unix socket of the daemon, in ncw directory if not defined
+    """
+    if args.socket:
+        return args.socket
+    return get_ncw_dir() + "/ncw.sock"
+
+
+
+
+
+def run_action(ncw, args):
+    """
+    run action
+
+    run the action of the arguments with a connected ncw object
+    """
+    # STATUS
+    if args.action == "STATUS":
+        if args.since_last:
+            ncw.get_status_changes()
+        elif has_journal_filter(args):
+            ncw.get_journal_status()
+        else:
+            ncw.get_user_status()
+    # SUBMIT
+    if args.action == "SUBMIT":
+        ncw.submit_files()
+    # DOWNLOAD
+    if args.action == "DOWNLOAD":
+        ncw.download_files()
+    # WATCH
+    if args.action == "WATCH":
+        ncw.watch_jobs()
+    # SWEEP
+    if args.action == "SWEEP":
+        ncw.sweep_jobs()
+    # TAIL
+    if args.action == "TAIL":
+        ncw.tail_jobs()
+    # PRUNE
+    if args.action == "PRUNE":
+        ncw.prune_documents()
+    # profile trace and summary, transfer metrics
+    ncw.profiler.write()
+    ncw.metrics.write()
+
+
+
+
+
+def run_daemon(args):
+    """
+    run daemon
+
+    keep one started and logged in nexus compute session and run the actions
+    of ncw clients, which connect via a unix socket
+
+    requests are handled one after another in the current directory of the client,
+    the daemon stops after the idle timeout without requests
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        print ("ERROR: daemon needs unix sockets, not available on this system")
+        sys.exit(1)
+    socket_name = get_socket_name(args)
+    # an existing socket file is either used by a running daemon or left by a stopped daemon
+    if os.path.exists(socket_name):
+        try:
+            test_conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            test_conn.connect(socket_name)
+            test_conn.close()
+            print ("ERROR: daemon already running on socket: ", socket_name)
+            sys.exit(1)
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.remove(socket_name)
+    ncw = NCW(args)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # the socket is created without access for other users, there is no time to connect before a chmod
+    old_umask = os.umask(0o077)
+    try:
+        server.bind(socket_name)
+    finally:
+        os.umask(old_umask)
+    server.listen(5)
+    server.settimeout(min(args.idle_timeout, 10.0))
+    print ("daemon listening on socket: ", socket_name)
+    last_request = time.monotonic()
+    try:
+        while True:
+            try:
+                conn, address = server.accept()
+            except socket.timeout:
+                if time.monotonic() - last_request > args.idle_timeout:
+                    print ("daemon idle timeout reached ...")
+                    break
+                continue
+            conn.settimeout(None)
+            command = handle_daemon_request(ncw, args, conn)
+            conn.close()
+            last_request = time.monotonic()
+            if command == "stop":
+                print ("daemon stopped by client ...")
+                break
+    finally:
+        server.close()
+        if os.path.exists(socket_name):
+            os.remove(socket_name)
+        ncw.end_nc()
+
+
+
+
+
+def handle_daemon_request(ncw, daemon_args, conn):
+    """
+    handle daemon request
+
+    one request of a client contains the arguments, the current directory and the hash
+    of the client token, the output of the action is sent back followed by the exit code,
+    the cache options of the client (--no-cache, --cache-ttl, --cache-size) are used for its request
+    """
+    file_in = conn.makefile("r")
+    request = json.loads(file_in.readline())
+    file_in.close()
+    writer = DaemonWriter(conn)
+    if request.get("command") == "stop":
+        writer.send({"exit": 0})
+        return "stop"
+    # the daemon session belongs to one token
+    if request.get("token") != hashlib.sha256(ncw.token.encode()).hexdigest():
+        writer.send({"mismatch": True})
+        return ""
+    print ("request: ", request["argv"])
+    exit_code = 0
+    daemon_dir = os.getcwd()
+    daemon_cache = ncw.cache
+    try:
+        os.chdir(request["cwd"])
+        with redirect_stdout(writer):
+            args = arg_handler(request["argv"])
+            ncw.ensure_login()
+            ncw.arg_space = args
+            if (args.no_cache, args.cache_ttl, args.cache_size) != \
+                    (daemon_args.no_cache, daemon_args.cache_ttl, daemon_args.cache_size):
+                ncw.cache = MetadataCache(daemon_cache.account, args.cache_ttl, args.cache_size, not args.no_cache)
+            ncw.profiler = Profiler(args.profile)
+            ncw.metrics = TransferMetrics(args)
+            run_action(ncw, args)
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else 1
+    except Exception:
+        writer.write(traceback.format_exc())
+        exit_code = 1
+    finally:
+        os.chdir(daemon_dir)
+        if ncw.cache is not daemon_cache:
+            ncw.cache.close()
+            ncw.cache = daemon_cache
+        ncw.arg_space = daemon_args
+        ncw.profiler = Profiler(daemon_args.profile)
+        ncw.metrics = TransferMetrics(daemon_args)
+    writer.send({"exit": exit_code})
+    return ""
+
+
+
+
+
+def call_daemon(args, argv):
+    """
+    call daemon
+
+    send the arguments to a running daemon and print its output,
+    the exit code of the action is returned, or None if no daemon can be used
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    socket_name = get_socket_name(args)
+    if not os.path.exists(socket_name):
+        return None
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(socket_name)
+    except OSError:
+        return None
+    print ("using daemon on socket: ", socket_name)
+    request = {"argv": argv, "cwd": os.getcwd(), "token": hashlib.sha256(read_token(args).encode()).hexdigest()}
+    if args.action == "DAEMON" and args.stop:
+        request = {"command": "stop"}
+    conn.sendall((json.dumps(request) + "\n").encode())
+    exit_code = 1
+    file_in = conn.makefile("r")
+    for line in file_in:
+        message = json.loads(line)
+        if "out" in message:
+            print (message["out"], end="", flush=True)
+        if "exit" in message:
+            exit_code = message["exit"]
+        if "mismatch" in message:
+            print ("daemon runs with another token, run without daemon ...")
+            exit_code = None
+    file_in.close()
+    conn.close()
+    return exit_code
+
+
+
+
+
+# POOL ==================================================================================
+
+
+
+class SessionPool():
+    """
+    session pool
+
+    one started and logged in session per token of the token file (one token per line),
+    the sessions are started in parallel and share the profiler, with --pool:
+    - STATUS writes the documents of all accounts and a summary per account
+    - SUBMIT submits into the account with the least running jobs (documents of the journal
+      and of the cache with not finished jobs), a submit file with document id into the
+      account of the document
+    - DOWNLOAD downloads the documents of every account with the session of the account
+    - SWEEP runs up to --max-running jobs per account, new jobs go to the account
+      with the least running jobs
+
+    the other actions are run with a single session
+    """
+
+    def __init__(self, arg_space):
+        self.arg_space = arg_space
+        self.profiler = Profiler(arg_space.profile)
+        self.metrics = TransferMetrics(arg_space)
+        token_list = read_tokens(arg_space)
+        if len(token_list) == 0:
+            print ("ERROR: no token definition")
+            sys.exit(1)
+        print ("start ", len(token_list), " sessions ...")
+        with ThreadPoolExecutor(max_workers=len(token_list)) as executor:
+            self.sessions = list(executor.map(lambda token: NCW(arg_space, token, self.profiler, self.metrics), 
+                token_list))
+        for session in self.sessions:
+            print ("account: ", session.cache.account)
+
+
+
+    def end_nc(self):
+        with ThreadPoolExecutor(max_workers=len(self.sessions)) as executor:
+            list(executor.map(lambda session: session.end_nc(), self.sessions))
+
+
+
+    def list_documents(self):
+        """
+        list documents
+
+        documents of all accounts, requested in parallel, one list per session
+        """
+        def list_session_documents(session):
+            return session.request("list_documents", session.my_user.list_documents)
+        with ThreadPoolExecutor(max_workers=len(self.sessions)) as executor:
+            return list(executor.map(list_session_documents, self.sessions))
+
+
+
+    def get_user_status(self):
+        """
+        get user status
+
+        documents of all accounts in one status output, each account with its documents,
+        at the end the number of documents, jobs and running jobs per account
+        """
+        doc_lists = self.list_documents()
+        status_writer = StatusWriter(self.arg_space.format)
+        status_writer.write_header(sum([len(doc_list) for doc_list in doc_lists]))
+        summary = []
+        for session, doc_list in zip(self.sessions, doc_lists):
+            status_writer.set_account(session.cache.account, len(doc_list))
+            jobs = 0
+            running = 0
+            for entry_dict, job_dict, files_in_doc in session.iter_document_status(doc_list, solver_configs=False):
+                if entry_dict is None:
+                    continue
+                status_writer.write_document(entry_dict['id'], entry_dict['name'], job_dict, files_in_doc)
+                jobs += len(job_dict)
+                running += len([job_id for job_id, job_feat in job_dict.items() 
+                    if not is_terminal_status(job_feat['status'])])
+            summary.append((session.cache.account, len(doc_list), jobs, running))
+        status_writer.account = None
+        if self.arg_space.format == "text":
+            status_writer.write_line("  ")
+        for account, number_of_documents, jobs, running in summary:
+            status_writer.write_account(account, number_of_documents, jobs, running)
+        status_writer.close()
+        return sum([len(doc_list) for doc_list in doc_lists])
+
+
+
+    def get_running_jobs(self, session):
+        """
+        get running jobs
+
+        number of not finished jobs of an account in the documents of its journal and in the
+        documents of the cache with not finished jobs, documents with only finished jobs are
+        taken from the cache, so only documents with possibly running jobs are requested,
+        jobs which were not submitted with ncw are not counted
+        """
+        doc_ids = session.journal.doc_ids()
+        doc_ids += [doc_id for doc_id in session.cache.open_documents() if doc_id not in doc_ids]
+        def count_running(doc_id):
+            try:
+                job_dict = session.get_document_content(doc_id)[0]
+            except Exception:
+                # a document deleted after the submission has no running jobs
+                return 0
+            return len([job_id for job_id, job_feat in job_dict.items() if not is_terminal_status(job_feat['status'])])
+        with ThreadPoolExecutor(max_workers=max(1, min(self.arg_space.workers, len(doc_ids)))) as executor:
+            return sum(executor.map(count_running, doc_ids))
+
+
+
+    def submit_files(self):
+        """
+        submit files
+
+        submit the jobs of the submit file into the account with the least running jobs,
+        or into the account of the document id of the submit file
+        """
+        submit_dict = get_submission_info(self.arg_space.file)
+        if submit_dict['DOC_ID'] != "":
+            sessions = [session for session, doc_list in zip(self.sessions, self.list_documents()) 
+                if submit_dict['DOC_ID'] in [entry_dict['id'] for entry_dict in doc_list]]
+            if len(sessions) == 0:
+                print ("ERROR: document ", submit_dict['DOC_ID'], " not found in the accounts ...")
+                sys.exit(1)
+            session = sessions[0]
+        else:
+            with ThreadPoolExecutor(max_workers=len(self.sessions)) as executor:
+                running_list = list(executor.map(self.get_running_jobs, self.sessions))
+            for session, running in zip(self.sessions, running_list):
+                print ("account: ", session.cache.account, " running jobs: ", running)
+            session = self.sessions[running_list.index(min(running_list))]
+        print ("submit with account: ", session.cache.account)
+        return session.submit_files(submit_dict)
+
+
+
+    def download_files(self):
+        self.sessions[0].download_files(self.sessions)
+
+
+
+    def sweep_jobs(self):
+        self.sessions[0].sweep_jobs(self.sessions)
+
+
+
+    def get_status_changes(self):
+        self.not_available()
+
+
+
+    def get_journal_status(self):
+        self.not_available()
+
+
+
+    def watch_jobs(self):
+        self.not_available()
+
+
+
+    def tail_jobs(self):
+        self.not_available()
+
+
+
+    def prune_documents(self):
+        self.not_available()
+
+
+
+    def not_available(self):
+        print ("ERROR: ", self.arg_space.action, " with these options is not available with --pool ...")
+        sys.exit(1)
+
+
+
+
+
+# ASYNC =================================================================================
+
+
+
+class LogWriter():
     """
-    download progress
+    log writer
+
+    file like object which passes the output of an action line by line to a log function
     """
-    progress = transferred_size / total_size * 100  # percentage
-    # with open('save_job_status_messages.txt','a') as status_file:
-    #     status_file.write(str(speed/1000**2) + "  " + str(elapsed_time) + "  " + str(transferred_size/1000**2) + "\n")
-    # print("%.2f%% %.2fMB/s %.2fs %.2fMB" %(progress, speed/1000**2, elapsed_time, transferred_size/1000**2))    
 
+    def __init__(self, log):
+        self.log = log
+        self.rest = ""
 
 
 
+    def write(self, text):
+        lines = (self.rest + text).split("\n")
+        self.rest = lines.pop()
+        for line in lines:
+            if line.strip() != "":
+                self.log(line.rstrip())
+        return len(text)
 
-def write_report_file(output_list, file_name, cr, print_flag):
-    """
-    write report file
-    
-    with file name a line list will be written into file
-    CR argument decides, whether a carriage return is written for each line
 
-    if the print flag is set, then the content will be printed
 
-    in case of dict instead of list to be printed, the dict will be converted 
-    into a list with key and value
+    def flush(self):
+        pass
 
-    output_list - dict or list
-    file_name   - file_name that is created
-    cr          - carriage return flag
-    print_flag  - print flag
-    """
-    # variables
-    line_list = []
-    # set carriage return
-    if cr == "CR":
-        cr = "\n"
-    else:
-        cr = ""
-    # if output list is a dictionary
-    if isinstance(output_list, dict):
-        for k,v in output_list.items():
-            line_list.append(str(k) + "  " + str(v))
-    if isinstance(output_list, list):
-        line_list = output_list
-    # print if required
-    if print_flag == "PRINT":
-        for line in line_list:
-            print (line)
-    # write content to file
-    file_out = open(file_name,"w")
-    file_out.writelines([l+cr for l in line_list])
-    file_out.close()    
 
 
+    def close(self):
+        self.write("\n")
 
 
 
-def get_submission_info(submit_info_file):
-    """
-    get submission info
-    
-    for analysis a submit_info_file is read that contains information
-    as document name, job name and analysis file names
 
-    if there is no document name a default name is provided
-    if there are no job names, some default job names are provided
 
-    the directory of submit info file is assumed as the same directory where the analysis files
-    are stored except the analysis file definition contains a dedicated directory,
-    for example:
-        file:a1.dat
-        file:a2.dat
-    means, that these files are located in the same directory of submit_info_file,
-    and with:
-        file:c:/tmp/dir_a1/a1.dat
-        file:c:/tmp/dir_a2/a2.dat
-    the directory of the file definition is used to upload the file to nexus environment
+class ThreadOutput():
+    """
+    thread output
 
-    the complete infomation is stored in a dictionary for further usage
+    stand-in for sys.stdout, a thread with an own writer prints into the writer and
+    all other threads into the original stdout, so the output of the sessions of
+    AsyncNCW does not mix with the output of the service
+
+    sys.stdout is replaced only as long as a call of any thread captures its output,
+    the original stdout is set again after the last call
     """
-    # startup info
-    print ("get submission info from file: ", submit_info_file)
-    current_dir = os.getcwd()
-    print (current_dir)
-    # variable definition
-    return_dict = {"DOC":"","CALC_DIR":"","JOBS":[],"CALC_FILES":[], "ERRORS":[]}
-    job_list = []
-    file_list = []
-    current_time = datetime.now().strftime("%Y%m%d%H%M%S")
-    # split in calc_dir and according files
-    calc_dir, info_file = os.path.split(submit_info_file)
-    # print ("splitted calc dir and info file: ", calc_dir, info_file)
-    return_dict["CALC_DIR"] = calc_dir
-    # read submission info file
-    file_in = open(submit_info_file,'r')
-    line_list = file_in.readlines()
-    file_in.close()
-    # collect and assign infos to dictionary
-    for line in line_list:
-        line = line.strip()
-        entry_list = line.split(':')
-        if entry_list[0].upper() == "DOC":
-            return_dict["DOC"] = entry_list[1]
-        if entry_list[0].upper() == "JOB":
-            return_dict["JOBS"].append(entry_list[1])
-        if entry_list[0].upper() == "FILE":
-            if "/" in line or "\\" in line:
-                file_to_check = line[5:].strip()
-            else:
-                if len(return_dict["CALC_DIR"]) > 0:
-                    file_to_check = return_dict["CALC_DIR"] + "/" + entry_list[1]
-                else:
-                    file_to_check = entry_list[1]
-            # check file existance
-            if os.path.exists(file_to_check):
-                print (" file check: ", file_to_check, "  PASSED")
-                return_dict["CALC_FILES"].append(file_to_check)
-            else:
-                print (" ERROR: ", file_to_check, " does not exist")
-                return_dict["ERRORS"].append("ERROR: "+file_to_check+" does not exist")
-    # clean up and fill up the dictionary with defaults if needed
-    # assign doc if does not exist and get job_list and file_list, assign job if no job 
-    for k,v in return_dict.items():
-        if k == "DOC" and len(v)==0:
-            return_dict["DOC"] = "doc_" + current_time
-        if k == "JOBS":
-            job_list= v
-        if k == "CALC_FILES":
-            file_list = v
-    if len(job_list) == 0:
-        job_list.append('job_' + current_time)
-    # to less job names available, fill them up
-    if len(job_list)<len(file_list):
-        last_job_name = job_list[len(job_list)-1]
-        for i in range(len(file_list)-len(job_list)):
-            job_list.append(last_job_name + "_" + str(i+1))
-        return_dict["JOBS"] = job_list
-    # number of jobs is greater then number of files, reduce jobs
-    if len(job_list) > len(file_list):
-        for i in range(len(job_list)-len(file_list)):
-            job_list.pop()
-    # dictionary with doc, job, analysis file information
-    return return_dict
+    local = threading.local()
+    lock = threading.Lock()
+    active = 0
 
+    def __init__(self, stdout):
+        self.stdout = stdout
 
 
-def rename_current_log_file_name(filename):
-    return_value = ""
-    # does file alread exist
-    if os.path.exists(filename):
-        # find highest number/counter for the file using f-string
-        counter = 1
-        while os.path.exists(f"{filename}.{counter}"):
-            counter += 1
-        # rename existing file
-        os.rename(filename, f"{filename}.{counter}")
-    # as return the new last file name is sent
-    return f"{filename}.{counter}"
-    
 
+    def write(self, text):
+        return (getattr(self.local, "writer", None) or self.stdout).write(text)
 
 
-def get_download_info(download_file):
+
+    def flush(self):
+        (getattr(self.local, "writer", None) or self.stdout).flush()
+
+
+
+    @classmethod
+    @contextmanager
+    def capture(cls, log):
+        """
+        capture
+
+        the output of the current thread in the block is passed line by line to log
+        """
+        with cls.lock:
+            if cls.active == 0 and not isinstance(sys.stdout, ThreadOutput):
+                sys.stdout = ThreadOutput(sys.stdout)
+            cls.active += 1
+        writer = getattr(cls.local, "writer", None)
+        cls.local.writer = LogWriter(log)
+        try:
+            yield
+        finally:
+            cls.local.writer.close()
+            cls.local.writer = writer
+            with cls.lock:
+                cls.active -= 1
+                if cls.active == 0 and isinstance(sys.stdout, ThreadOutput):
+                    sys.stdout = sys.stdout.stdout
+
+
+
+    @classmethod
+    def run(cls, log, function, *args):
+        """
+        run
+
+        call a function in the current thread, its output is passed line by line to log
+        """
+        with cls.capture(log):
+            return function(*args)
+
+
+
+
+
+class AsyncNCW():
     """
-    get download info
+    async ncw
 
-    if files needs to be downloaded a document id and a job id is needed,
-    all these information are saved into submission log file,
-    if that is not available, the ids can be grabbed from the status information 
+    asyncio interface of ncw for services which handle the jobs of many users,
+    one instance per token, the methods return dictionaries instead of output files
+    and raise exceptions instead of leaving the process:
+        ncw = await AsyncNCW.connect(token, workers=8, transfers=4)
+        status = await ncw.status()
+        submitted = await ncw.submit(["run/a1.dat", "run/a2.dat"], doc="wing")
+        finished = await ncw.wait_for(submitted["doc_id"], [job["job_id"] for job in submitted["jobs"]])
+        results = await ncw.download(submitted["doc_id"], calc_dir="run")
+        await ncw.close()
 
-    an example download file could be (containing doc id, job id and optional calc dir):
-    DOC_ID:c380b241-d3dd-49c4-ae0d-0626c5f79abd
-    CALC_DIR:c:/tmp/python/nexus/dir_analysis
-    JOB_ID:28d999e4-e147-60fb-d905-9c0a454713ea
-    JOB_ID:3e49a037-1407-f897-396b-82dece509ad6
+    the blocking calls of the nexus compute client run in two thread pools of the instance,
+    --workers threads for requests and --transfers threads for uploads and downloads,
+    so a slow transfer does not block the event loop, the requests or other instances,
+    the output of ncw is passed line by line to log, default the info of the logger ncw
     """
-    # variables
-    return_dict = {"DOC_ID":"","CALC_DIR":".","JOB_IDS":[]}
-    # read submission info file
-    file_in = open(download_file,'r')
-    line_list = file_in.readlines()
-    file_in.close()
-    # sort lines in dictionary
-    for line in line_list:
-        line = line.strip()
-        if ":" in line:
-            entry_list = line.split(':')
-            if entry_list[0].strip() == 'DOC_ID':
-                return_dict['DOC_ID']=entry_list[1].strip()
-            if entry_list[0].strip() == 'JOB_ID':
-                return_dict['JOB_IDS'].append(entry_list[1].strip())
-            if entry_list[0].strip() == 'CALC_DIR':
-                return_dict['CALC_DIR']=line[9:].strip()
-    # return according dictionary
-    return return_dict
+
+    def __init__(self, ncw, log=None):
+        import logging
+        self.ncw = ncw
+        self.log = log or logging.getLogger("ncw").info
+        self.arg_space = ncw.arg_space
+        self.login_lock = threading.Lock()
+        self.call_executor = ThreadPoolExecutor(max_workers=max(1, self.arg_space.workers))
+        self.transfer_executor = ThreadPoolExecutor(max_workers=max(1, self.arg_space.transfers))
+
+
+
+    @classmethod
+    async def connect(cls, token, log=None, **options):
+        """
+        connect
+
+        start nexus compute and login with the token, the options are the arguments
+        of the command line (workers, transfers, rate_limit, retries, cache_ttl, no_dedup, ...),
+        log is called with every output line of ncw
+        """
+        import asyncio, logging
+        arg_space = get_parser().parse_args([])
+        for key, value in options.items():
+            if not hasattr(arg_space, key):
+                raise TypeError("unknown option " + key)
+            setattr(arg_space, key, value)
+        log = log or logging.getLogger("ncw").info
+        loop = asyncio.get_running_loop()
+        ncw = await loop.run_in_executor(None, ThreadOutput.run, log, NCW, arg_space, token)
+        return cls(ncw, log)
+
+
+
+    async def __aenter__(self):
+        return self
+
+
+
+    async def __aexit__(self, exc_type, exc_value, exc_traceback):
+        await self.close()
+
+
+
+    async def call(self, function, *args):
+        """
+        call
+
+        run a blocking request in the request pool, the login is checked before
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.call_executor, ThreadOutput.run, self.log, self.ensure_login)
+        return await loop.run_in_executor(self.call_executor, ThreadOutput.run, self.log, function, *args)
+
+
+
+    async def transfer(self, function, *args):
+        """
+        transfer
+
+        run a blocking upload or download in the transfer pool
+        """
+        import asyncio
+        return await asyncio.get_running_loop().run_in_executor(self.transfer_executor, ThreadOutput.run, self.log, 
+            function, *args)
+
+
+
+    def ensure_login(self):
+        with self.login_lock:
+            self.ncw.ensure_login()
+
+
+
+    async def status(self, doc_ids=None):
+        """
+        status
+
+        documents of the user or of the given document ids with their jobs and files:
+        [{"doc_id", "doc_name", "jobs": [{"job_id", "job_name", "status"}], "files": [...]}]
+        the status is the text of the job status, for example Done
+        """
+        import asyncio
+        if doc_ids is None:
+            doc_list = await self.call(self.ncw.request, "list_documents", self.ncw.my_user.list_documents)
+        else:
+            doc_list = [{'id': doc_id, 'name': ""} for doc_id in doc_ids]
+        contents = await asyncio.gather(*[self.call(self.ncw.get_document_content, entry_dict['id']) 
+            for entry_dict in doc_list])
+        status_list = []
+        for entry_dict, (job_dict, files_in_doc) in zip(doc_list, contents):
+            status_list.append({"doc_id": entry_dict['id'], "doc_name": entry_dict['name'], 
+                "jobs": [{"job_id": job_id, "job_name": job_feat['name'], "status": job_feat['status'].split(".")[-1]} 
+                    for job_id, job_feat in job_dict.items()], "files": files_in_doc})
+        return status_list
+
+
+
+    async def submit(self, files, doc="", doc_id="", jobs=None, settings={}, tag=""):
+        """
+        submit
+
+        submit analysis files as jobs into a new document or into the document doc_id,
+        includes are resolved and uploaded once, files with unchanged content in the document
+        are reused, the job settings come from the deck analysis and the given settings,
+        the job names are the given names or the file names without extension:
+        {"doc_id", "jobs": [{"job_id", "job_name", "files", "settings"}], "uploaded": [...], "reused": [...]}
+
+        missing files and includes raise FileNotFoundError, conflicting document paths ValueError
+        """
+        import asyncio
+        submit_dict = {"DOC": doc, "DOC_ID": doc_id, "CALC_FILES": list(files), "INCLUDES": [], "SETTINGS": settings,
+            "JOBS": list(jobs or [os.path.splitext(os.path.basename(f))[0] for f in files])}
+        if len(submit_dict["JOBS"]) != len(submit_dict["CALC_FILES"]):
+            raise ValueError("number of job names and files differ")
+        for local_file_name in submit_dict["CALC_FILES"]:
+            if not os.path.exists(local_file_name):
+                raise FileNotFoundError(local_file_name)
+            include_list, include_errors, include_warnings = get_include_files(local_file_name)
+            if len(include_errors) > 0:
+                raise FileNotFoundError("; ".join(include_errors))
+            submit_dict["INCLUDES"].append(include_list)
+        upload_dict, job_files, errors = get_upload_files(submit_dict)
+        if len(errors) > 0:
+            raise ValueError("; ".join(errors))
+        # hashing and deck analysis read the files, they run in the transfer pool
+        upload_index = UploadIndex()
+        hashes = await asyncio.gather(*[self.transfer(upload_index.get_hash, local) for local in upload_dict.values()])
+        file_hashes = dict(zip(upload_dict.keys(), hashes))
+        analysis_list = await asyncio.gather(*[self.transfer(analyze_deck, local_file_name, include_list, upload_index) 
+            for local_file_name, include_list in zip(submit_dict["CALC_FILES"], submit_dict["INCLUDES"])])
+        # document
+        if doc_id == "":
+            doc = doc or "doc_" + datetime.now().strftime("%Y%m%d%H%M%S")
+            doc_id = await self.call(self.ncw.my_user.new_document, doc)
+        doc_obj = await self.call(self.ncw.load_document, doc_id)
+        remote_files = []
+        if submit_dict["DOC_ID"] != "":
+            remote_files = [str(f) for f in await self.call(self.ncw.request, "list_files", doc_obj.list_files)]
+        solver_configs = await self.call(self.ncw.get_solver_configs, doc_id)
+        # uploads, unchanged files are reused
+        monitor = TransferMonitor("upload", self.arg_space.rate_limit, self.ncw.profiler, verbose=False, 
+            metrics=self.ncw.metrics)
+        uploaded = []
+        reused = []
+        async def upload(remote_name, local_file_name):
+            if not self.arg_space.no_dedup and upload_index.is_current(file_hashes[remote_name], doc_id, remote_name, 
+                    remote_files):
+                reused.append(remote_name)
+                return
+            callback = monitor.upload_callback(local_file_name, os.path.getsize(local_file_name))
+            failed = True
+            try:
+                await self.transfer(self.ncw.upload_file, doc_obj, local_file_name, remote_name, callback)
+                failed = False
+            finally:
+                monitor.finish(local_file_name, failed=failed)
+            upload_index.add(file_hashes[remote_name], doc_id, remote_name)
+            uploaded.append(remote_name)
+        try:
+            await asyncio.gather(*[upload(remote_name, local_file_name) 
+                for remote_name, local_file_name in upload_dict.items()])
+            # jobs
+            job_list = []
+            for i, job_name in enumerate(submit_dict["JOBS"]):
+                job_settings, reasons = get_job_settings(analysis_list[i], solver_configs, settings)
+                job_id = await self.call(self.ncw.submit_job, doc_obj, job_name, job_files[i], job_settings)
+                self.ncw.journal.add(doc_id, doc, job_id, job_name, tag, 
+                    os.path.realpath(os.path.dirname(submit_dict["CALC_FILES"][i]) or "."), 
+                    [{"local": os.path.realpath(upload_dict[remote]), "remote": remote, "sha256": file_hashes[remote]} 
+                        for remote in job_files[i]], job_settings)
+                job_list.append({"job_id": job_id, "job_name": job_name, "files": job_files[i], "settings": job_settings})
+        finally:
+            await self.call(doc_obj.close)
+            # document has new jobs and files
+            self.ncw.cache.remove_document(doc_id)
+        return {"doc_id": doc_id, "jobs": job_list, "uploaded": uploaded, "reused": reused}
+
+
+
+    async def download(self, doc_id, job_ids=None, calc_dir=".", include=[], exclude=[], max_size=0):
+        """
+        download
+
+        result files of the jobs (all jobs without job ids) into calc_dir/compute/results/<job name>,
+        files which are complete in the download manifest are not transferred again:
+        [{"job_id", "job_name", "dir", "files": [...], "skipped": [...]}]
+        skipped are files of the filters and files larger than max_size,
+        job ids which are not in the document raise KeyError
+        """
+        import asyncio
+        job_dict = (await self.call(self.ncw.get_document_content, doc_id))[0]
+        if job_ids is None:
+            job_ids = list(job_dict.keys())
+        elif any([job_id not in job_dict for job_id in job_ids]):
+            job_dict = (await self.call(self.ncw.load_document_content, doc_id))[0]
+        for job_id in job_ids:
+            if job_id not in job_dict:
+                raise KeyError("job " + job_id + " not found in document " + doc_id)
+        doc_obj = await self.call(self.ncw.load_document, doc_id)
+        manifest = DownloadManifest(calc_dir)
+        monitor = TransferMonitor("download", self.arg_space.rate_limit, self.ncw.profiler, verbose=False, 
+            metrics=self.ncw.metrics)
+        async def download_job(job_id):
+            result_list = self.ncw.cache.get_results(job_id)
+            if result_list is None:
+                result_list = [str(entry) for entry in await self.call(self.ncw.request, "list_job_results", 
+                    doc_obj.list_job_results, job_id)]
+                if is_terminal_status(job_dict[job_id]['status']):
+                    self.ncw.cache.put_results(job_id, result_list)
+            result = {"job_id": job_id, "job_name": job_dict[job_id]['name'], 
+                "dir": calc_dir + "/compute/results/" + job_dict[job_id]['name'], "files": [], "skipped": []}
+            os.makedirs(result["dir"], exist_ok=True)
+            async def download_file(job_file):
+                if not filter_result_file(job_file, include, exclude):
+                    result["skipped"].append(job_file)
+                    return
+                if not manifest.is_complete(job_file):
+                    # a failed transfer is finished in the monitor, also for the transfer metrics
+                    failed = True
+                    try:
+                        status = await self.transfer(self.ncw.download_file, doc_obj, job_file, calc_dir, monitor, 
+                            manifest, max_size)
+                        failed = False
+                    finally:
+                        monitor.finish(calc_dir + "/" + job_file, failed=failed)
+                    if status == "SKIPPED":
+                        result["skipped"].append(job_file)
+                        return
+                result["files"].append(calc_dir + "/" + job_file)
+            await asyncio.gather(*[download_file(job_file) for job_file in result_list])
+            return result
+        try:
+            return list(await asyncio.gather(*[download_job(job_id) for job_id in job_ids]))
+        finally:
+            await self.call(doc_obj.close)
+
+
+
+    async def wait_for(self, doc_id, job_ids, poll_min=None, poll_max=None, timeout=None):
+        """
+        wait for
+
+        poll the jobs of a document until all are finished, the poll interval grows
+        from poll_min to poll_max as in WATCH, returns {job_id: status} of the finished jobs,
+        asyncio.TimeoutError after timeout seconds, KeyError for jobs not in the document
+        """
+        import asyncio
+        poll_min = self.arg_space.poll_min if poll_min is None else poll_min
+        poll_max = self.arg_space.poll_max if poll_max is None else poll_max
+        start = time.monotonic()
+        while True:
+            job_dict = (await self.call(self.ncw.load_document_content, doc_id))[0]
+            for job_id in job_ids:
+                if job_id not in job_dict:
+                    raise KeyError("job " + job_id + " not found in document " + doc_id)
+            if all([is_terminal_status(job_dict[job_id]['status']) for job_id in job_ids]):
+                return dict([(job_id, job_dict[job_id]['status'].split(".")[-1]) for job_id in job_ids])
+            now = time.monotonic()
+            if timeout is not None and now - start >= timeout:
+                raise asyncio.TimeoutError("jobs of document " + doc_id + " not finished after " + str(timeout) + "s")
+            interval = min(poll_max, max(poll_min, 0.1 * (now - start)))
+            if timeout is not None:
+                interval = min(interval, start + timeout - now)
+            await asyncio.sleep(interval)
+
+
+
+    async def close(self):
+        """
+        close
+
+        logoff and stop nexus compute, the thread pools are ended,
+        the transfer metrics of the instance are written
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.call_executor, ThreadOutput.run, self.log, self.ncw.metrics.write)
+        await loop.run_in_executor(self.call_executor, ThreadOutput.run, self.log, self.ncw.end_nc)
+        self.call_executor.shutdown()
+        self.transfer_executor.shutdown()
 
 
 
@@ -648,20 +5348,27 @@ def main():
     # argument handling
     args = arg_handler()
     print ("MAIN:",args.action, args.file, args.token)
-    # instance of object, connect to nexus as a user
-    ncw = NCW(args)
+    # offline validation without nexus compute client
+    if args.validate:
+        sys.exit(1 if validate_action(args) > 0 else 0)
+    # a running daemon takes over the action, the daemon has a single session
+    if not args.no_daemon and not args.pool and (args.action != "DAEMON" or args.stop):
+        exit_code = call_daemon(args, sys.argv[1:])
+        if exit_code is not None:
+            sys.exit(exit_code)
+    if args.action == "DAEMON":
+        if args.stop:
+            print ("no daemon running ...")
+        else:
+            run_daemon(args)
+        return
+    # instance of object, connect to nexus as a user, or as all users of the token file
+    if args.pool:
+        ncw = SessionPool(args)
+    else:
+        ncw = NCW(args)
     # actions
-    # STATUS
-    if args.action == "STATUS":
-        status_list = ncw.get_user_status()
-        for line in status_list:
-            print (line)
-    # SUBMIT
-    if args.action == "SUBMIT":
-        ncw.submit_files()
-    # DOWNLOAD
-    if args.action == "DOWNLOAD":
-        ncw.download_files()
+    run_action(ncw, args)
     # logout and end process
     ncw.end_nc()
 
@@ -0,0 +1,578 @@
+"""
+ncw bench
+
+offline benchmark suite of ncw actions against a simulated nexus compute backend,
+no account or token is needed
+
+the simulated backend replaces NexusCompute, its user object and its document object,
+every client call sleeps for an injected latency to simulate the round trip to the
+NodeJS process and the cloud, transfers are simulated with a bandwidth per transfer,
+jobs are finished after a job duration and calls and transfers can fail with a rate,
+transient failures (connection) and fatal failures (permission) are injected, an
+interrupted download can be resumed at an offset with --resume
+
+the suite runs STATUS, SUBMIT and DOWNLOAD at realistic scales and reports
+wall time, calls issued, bytes moved and peak memory for every scenario
+
+usage:
+    python ncw_bench.py
+    python ncw_bench.py --suite STATUS --docs 500 --latency 0.05 --workers 16
+    python ncw_bench.py --json release_2.json --baseline release_1.json
+"""
+import os, sys, io, time, enum, json, random, argparse, tempfile, threading, tracemalloc
+from contextlib import redirect_stdout
+
+# ---------------------------------------------------------------------------------------
+
+class JobStatus(enum.Enum):
+    """
+    job status of the simulated backend
+    """
+    Queued = 0
+    Running = 1
+    Done = 2
+    Failed = 3
+
+
+
+class SimTransientError(ConnectionError):
+    """
+    sim transient error
+
+    injected failure of a call or a transfer
+    """
+
+    def __init__(self, message, transferred=0):
+        super().__init__(message)
+        self.transferred = transferred
+
+
+
+class SimFatalError(PermissionError):
+    """
+    sim fatal error
+
+    injected failure of a call which is not tried again
+    """
+
+
+
+class SimBackend():
+    """
+    sim backend
+
+    state of the simulated cloud shared by all client objects:
+    documents with jobs and files, counters of calls and bytes
+    """
+
+    def __init__(self, docs=100, jobs_per_doc=2, files_per_job=6, result_size=1000**2, latency=0.02,
+            bandwidth=200*1000**2, job_duration=0.0, call_failures=0.0, transfer_failures=0.0, fatal_failures=0.0,
+            resume=False, seed=1):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.job_duration = job_duration
+        self.call_failures = call_failures
+        self.transfer_failures = transfer_failures
+        self.fatal_failures = fatal_failures
+        self.resume = resume
+        self.files_per_job = files_per_job
+        self.result_size = result_size
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.bytes_up = 0
+        self.bytes_down = 0
+        self.documents = {}
+        for i in range(docs):
+            doc_id = self.new_document("doc_" + str(i))
+            for j in range(jobs_per_doc):
+                self.add_job(doc_id, "job_" + str(i) + "_" + str(j), ["a" + str(j) + ".dat"], finished=True)
+
+
+
+    def new_document(self, name):
+        with self.lock:
+            doc_id = "sim-doc-" + str(len(self.documents))
+            self.documents[doc_id] = {"name": name, "jobs": {}, "files": {}}
+        return doc_id
+
+
+
+    def add_job(self, doc_id, job_name, files, finished=False):
+        """
+        add job
+
+        a finished job is submitted long ago, result files are named after the analysis file
+        """
+        document = self.documents[doc_id]
+        with self.lock:
+            job_id = doc_id + "-job-" + str(len(document["jobs"]))
+            submitted = time.monotonic() - (self.job_duration + 1.0 if finished else 0.0)
+            document["jobs"][job_id] = {"name": job_name, "submitted": submitted, "files": files}
+            for file_name in files:
+                document["files"].setdefault(file_name, self.result_size)
+        return job_id
+
+
+
+    def job_status(self, job):
+        if time.monotonic() - job["submitted"] >= self.job_duration:
+            return JobStatus.Done
+        return JobStatus.Running
+
+
+
+    def job_results(self, job):
+        """
+        job results
+
+        result files of a finished job
+        """
+        if self.job_status(job) != JobStatus.Done:
+            return []
+        base = os.path.splitext(job["files"][0])[0]
+        extensions = [".f06", ".f04", ".log", ".op2", ".h5", "_process_output.log", "_preprocess_output.log"]
+        result_list = []
+        for i in range(self.files_per_job):
+            extension = extensions[i % len(extensions)]
+            if i >= len(extensions):
+                extension = "_" + str(i) + extension
+            result_list.append("compute/results/" + job["name"] + "/" + base + extension)
+        return result_list
+
+
+
+    def call(self, name):
+        """
+        call
+
+        count the call, wait for the latency and inject a transient or a fatal failure
+        """
+        with self.lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+            failed = self.random.random() < self.call_failures
+            fatal = self.random.random() < self.fatal_failures
+        time.sleep(self.latency)
+        if fatal:
+            raise SimFatalError("simulated permission denied of " + name)
+        if failed:
+            raise SimTransientError("simulated failure of " + name)
+
+
+
+    def transfer(self, size, callback):
+        """
+        transfer
+
+        simulate the transfer time with the bandwidth, the callback gets transferred size,
+        speed and elapsed time of every chunk, a failure stops the transfer in the middle,
+        the error holds the transferred size
+        """
+        with self.lock:
+            failed = self.random.random() < self.transfer_failures
+        start = time.monotonic()
+        chunk = max(size // 20, 1000**2)
+        transferred = 0
+        while transferred < size:
+            step = min(chunk, size - transferred)
+            time.sleep(step / self.bandwidth)
+            transferred += step
+            if failed and transferred >= size // 2:
+                raise SimTransientError("simulated transfer interruption", transferred)
+            elapsed = time.monotonic() - start
+            callback(transferred, transferred / max(elapsed, 1e-6), elapsed)
+        return transferred
+
+
+
+    def summary(self):
+        return sum(self.calls.values()), self.bytes_up, self.bytes_down
+
+
+
+class SimDocument():
+    """
+    sim document
+
+    document object of the simulated backend
+    """
+
+    def __init__(self, backend, doc_id):
+        self.backend = backend
+        self.doc_id = doc_id
+        self.document = backend.documents[doc_id]
+
+    def list_jobs(self):
+        self.backend.call("list_jobs")
+        job_dict = {}
+        for job_id, job in list(self.document["jobs"].items()):
+            job_dict[job_id] = {'name': job["name"], 'status': self.backend.job_status(job)}
+        return job_dict
+
+    def list_files(self):
+        self.backend.call("list_files")
+        files_in_doc = list(self.document["files"].keys())
+        for job in list(self.document["jobs"].values()):
+            files_in_doc.extend(self.backend.job_results(job))
+        return files_in_doc
+
+    def list_job_results(self, job_id):
+        self.backend.call("list_job_results")
+        return self.backend.job_results(self.document["jobs"][job_id])
+
+    def get_solver_configs(self):
+        self.backend.call("get_solver_configs")
+        return {"nastran": {"versions": {"2024.2": {}, "2024.1": {}},
+            "configs": {"small": {}, "medium": {}, "large": {}}}}
+
+    def upload_file(self, local_file_name, document_path, progress):
+        self.backend.call("upload_file")
+        size = os.path.getsize(local_file_name)
+        try:
+            self.backend.transfer(size, lambda transferred, speed, elapsed: progress(speed, elapsed, transferred))
+        except SimTransientError as e:
+            with self.backend.lock:
+                self.backend.bytes_up += e.transferred
+            raise
+        with self.backend.lock:
+            self.document["files"][document_path] = size
+            self.backend.bytes_up += size
+
+    def submit_job(self, job_name, solver, solver_version, hardware, nb_nodes, files, command,
+            max_runtime_hours, dry_run=False):
+        self.backend.call("submit_job")
+        for file_name in files:
+            if file_name not in self.document["files"]:
+                raise ValueError("file not in document: " + file_name)
+        return self.backend.add_job(self.doc_id, job_name, files)
+
+    def download_file(self, document_path, sink, progress):
+        self.backend.call("download_file")
+        size = self.backend.result_size
+        try:
+            self.backend.transfer(size, lambda transferred, speed, elapsed: progress(transferred, size, speed, elapsed))
+        except SimTransientError as e:
+            with self.backend.lock:
+                self.backend.bytes_down += e.transferred
+            raise
+        # sparse file, only the size is written to disk
+        file_out = open(sink, "wb")
+        file_out.truncate(size)
+        file_out.close()
+        with self.backend.lock:
+            self.backend.bytes_down += size
+        return True
+
+    def close(self):
+        pass
+
+
+
+class SimResumableDocument(SimDocument):
+    """
+    sim resumable document
+
+    document object of a client which continues a download at an offset,
+    an interrupted download keeps the transferred part in the sink
+    """
+
+    def download_file(self, document_path, sink, progress, offset=0):
+        self.backend.call("download_file")
+        size = self.backend.result_size
+        offset = min(offset, size)
+        transferred = size - offset
+        try:
+            self.backend.transfer(size - offset, 
+                lambda transferred, speed, elapsed: progress(offset + transferred, size, speed, elapsed))
+        except SimTransientError as e:
+            transferred = e.transferred
+            raise
+        finally:
+            file_out = open(sink, "r+b" if offset > 0 and os.path.exists(sink) else "wb")
+            file_out.truncate(offset + transferred)
+            file_out.close()
+            with self.backend.lock:
+                self.backend.bytes_down += transferred
+        return True
+
+
+
+class SimUser():
+    """
+    sim user
+
+    user object of the simulated backend
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.loginRefId = "sim-user"
+
+    def list_documents(self):
+        self.backend.call("list_documents")
+        return [{'id': doc_id, 'name': document["name"], 'jobCount': len(document["jobs"])}
+            for doc_id, document in list(self.backend.documents.items())]
+
+    def load_document(self, doc_id):
+        self.backend.call("load_document")
+        if self.backend.resume:
+            return SimResumableDocument(self.backend, doc_id)
+        return SimDocument(self.backend, doc_id)
+
+    def new_document(self, name):
+        self.backend.call("new_document")
+        return self.backend.new_document(name)
+
+    def delete_document(self, doc_id):
+        self.backend.call("delete_document")
+        with self.backend.lock:
+            del self.backend.documents[doc_id]
+
+    def logoff(self):
+        pass
+
+
+
+class SimNexusCompute():
+    """
+    sim nexus compute
+
+    stand-in for NexusCompute, all instances use the backend of the current scenario,
+    tokens of accounts with an own backend (session pool) are in backends
+    """
+    backend = SimBackend(docs=0)
+    backends = {}
+
+    def start(self):
+        time.sleep(self.backend.latency)
+        return 0
+
+    def login(self, token):
+        backend = self.backends.get(token, self.backend)
+        backend.call("login")
+        return SimUser(backend)
+
+    def stop(self):
+        pass
+
+
+
+# ncw imports the nexuscompute client with the first session, the simulated client is used instead
+import ncw
+ncw.NexusCompute = SimNexusCompute
+
+
+
+# =======================================================================================
+
+
+
+def run_scenario(name, backend, bench_dir, argv, method, memory=False):
+    """
+    run scenario
+
+    run one ncw action against the backend and measure wall time, calls, bytes and optional
+    peak memory, tracing memory slows down python code, the output of ncw is not printed
+    """
+    SimNexusCompute.backend = backend
+    calls_before, up_before, down_before = backend.summary()
+    token_file = os.path.join(bench_dir, "token_file.txt")
+    arg_space = ncw.arg_handler(["--token", token_file, "--no-daemon"] + argv)
+    if memory:
+        tracemalloc.start()
+    start_time = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        ncw_obj = ncw.NCW(arg_space)
+        getattr(ncw_obj, method)()
+        ncw_obj.end_nc()
+    wall_time = time.perf_counter() - start_time
+    peak_memory = 0
+    if memory:
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    calls, bytes_up, bytes_down = backend.summary()
+    return {"scenario": name, "wall": wall_time, "calls": calls - calls_before, "up": bytes_up - up_before,
+        "down": bytes_down - down_before, "peak": peak_memory}
+
+
+
+def bench_status(args, bench_dir):
+    """
+    bench status
+
+    STATUS of an account with many finished documents,
+    sequential, parallel and with warm cache
+    """
+    backend = SimBackend(docs=args.docs, jobs_per_doc=args.jobs, files_per_job=args.files_per_job,
+        latency=args.latency, call_failures=args.call_failures, fatal_failures=args.fatal_failures)
+    results = []
+    for workers in sorted(set([1, args.workers])):
+        results.append(run_scenario("STATUS workers=" + str(workers), backend, bench_dir,
+            ["--action", "STATUS", "--workers", str(workers), "--no-cache"], "get_user_status", args.memory))
+    # the first run fills the cache, the second run uses it
+    run_scenario("STATUS fill cache", backend, bench_dir, ["--action", "STATUS", "--workers", str(args.workers)],
+        "get_user_status", args.memory)
+    results.append(run_scenario("STATUS cached", backend, bench_dir,
+        ["--action", "STATUS", "--workers", str(args.workers)], "get_user_status", args.memory))
+    return results
+
+
+
+def write_deck(deck_file, size):
+    """
+    write deck
+
+    Nastran deck of about the given size made of GRID cards, written in blocks
+    """
+    card = b"GRID    1       0       0.0     0.0     0.0     0                       \n"
+    block = card * (1000**2 // len(card))
+    file_out = open(deck_file, "wb")
+    file_out.write(b"SOL 101\nCEND\nBEGIN BULK\n")
+    written = 0
+    while written < size:
+        file_out.write(block)
+        written += len(block)
+    file_out.write(b"ENDDATA\n")
+    file_out.close()
+
+
+
+def bench_submit(args, bench_dir):
+    """
+    bench submit
+
+    SUBMIT of big decks of the upload size,
+    the second run submits the same decks again into the same document
+    """
+    backend = SimBackend(docs=0, latency=args.latency, bandwidth=args.bandwidth,
+        call_failures=args.call_failures, transfer_failures=args.transfer_failures, fatal_failures=args.fatal_failures)
+    submit_dir = os.path.join(bench_dir, "submit")
+    os.makedirs(submit_dir, exist_ok=True)
+    doc_id = backend.new_document("bench_submit")
+    lines = ["doc_id:" + doc_id]
+    for i in range(args.uploads):
+        write_deck(os.path.join(submit_dir, "deck_" + str(i) + ".dat"), args.upload_size // args.uploads)
+        lines.append("file:deck_" + str(i) + ".dat")
+    submit_file = os.path.join(submit_dir, "submit.txt")
+    file_out = open(submit_file, "w")
+    file_out.writelines([l+"\n" for l in lines])
+    file_out.close()
+    argv = ["--action", "SUBMIT", "--file", submit_file, "--transfers", str(args.transfers)]
+    results = []
+    results.append(run_scenario("SUBMIT", backend, bench_dir, argv, "submit_files", args.memory))
+    results.append(run_scenario("SUBMIT unchanged", backend, bench_dir, argv, "submit_files", args.memory))
+    return results
+
+
+
+def bench_download(args, bench_dir):
+    """
+    bench download
+
+    DOWNLOAD of many result files of finished jobs,
+    the second run finds all files complete in the manifest
+    """
+    jobs = max(1, args.results // args.files_per_job)
+    backend = SimBackend(docs=0, files_per_job=args.files_per_job, result_size=args.result_size,
+        latency=args.latency, bandwidth=args.bandwidth, call_failures=args.call_failures,
+        transfer_failures=args.transfer_failures, fatal_failures=args.fatal_failures, resume=args.resume)
+    doc_id = backend.new_document("bench_download")
+    lines = ["DOC_ID:" + doc_id, "CALC_DIR:" + os.path.join(bench_dir, "download")]
+    for i in range(jobs):
+        lines.append("JOB_ID:" + backend.add_job(doc_id, "job_" + str(i), ["a" + str(i) + ".dat"], finished=True))
+    download_file = os.path.join(bench_dir, "download.txt")
+    file_out = open(download_file, "w")
+    file_out.writelines([l+"\n" for l in lines])
+    file_out.close()
+    argv = ["--action", "DOWNLOAD", "--file", download_file, "--transfers", str(args.transfers),
+        "--workers", str(args.workers)]
+    results = []
+    results.append(run_scenario("DOWNLOAD", backend, bench_dir, argv, "download_files", args.memory))
+    results.append(run_scenario("DOWNLOAD complete", backend, bench_dir, argv, "download_files", args.memory))
+    return results
+
+
+
+def main():
+    """
+    main function
+    """
+    parser = argparse.ArgumentParser(description='Nexus Compute Wrapper benchmark suite')
+    parser.add_argument('--suite', default='STATUS,SUBMIT,DOWNLOAD', help='Scenarios to run, separated by comma')
+    parser.add_argument('--docs', type=int, default=200, help='Number of documents for STATUS')
+    parser.add_argument('--jobs', type=int, default=2, help='Number of jobs per document for STATUS')
+    parser.add_argument('--files-per-job', type=int, default=6, help='Number of result files per job')
+    parser.add_argument('--results', type=int, default=1200, help='Number of result files for DOWNLOAD')
+    parser.add_argument('--result-size', default='1MB', help='Size of a result file')
+    parser.add_argument('--uploads', type=int, default=4, help='Number of decks for SUBMIT')
+    parser.add_argument('--upload-size', default='2GB', help='Total size of all decks for SUBMIT')
+    parser.add_argument('--latency', type=float, default=0.02, help='Latency per call in seconds')
+    parser.add_argument('--bandwidth', default='500MB', help='Bandwidth per transfer per second')
+    parser.add_argument('--call-failures', type=float, default=0.0, help='Rate of failing calls')
+    parser.add_argument('--transfer-failures', type=float, default=0.0, help='Rate of interrupted transfers')
+    parser.add_argument('--fatal-failures', type=float, default=0.0, help='Rate of failing calls without retry')
+    parser.add_argument('--resume', action='store_true', help='Resume interrupted downloads at an offset')
+    parser.add_argument('-w', '--workers', type=int, default=8, help='Number of parallel workers')
+    parser.add_argument('--transfers', type=int, default=4, help='Number of parallel transfers')
+    parser.add_argument('--memory', action='store_true', help='Measure peak memory, slows down the scenarios')
+    parser.add_argument('--json', help='Write results into json file')
+    parser.add_argument('--baseline', help='Compare wall time with results of a json file')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed slowdown against baseline')
+    args = parser.parse_args()
+    args.result_size = ncw.parse_size(args.result_size)
+    args.upload_size = ncw.parse_size(args.upload_size)
+    args.bandwidth = ncw.parse_size(args.bandwidth)
+    # local ncw files as the cache and the output files are kept in a temporary directory
+    current_dir = os.getcwd()
+    results = []
+    with tempfile.TemporaryDirectory() as bench_dir:
+        os.chdir(bench_dir)
+        os.environ["NCW_DIR"] = bench_dir
+        file_out = open(os.path.join(bench_dir, "token_file.txt"), "w")
+        file_out.write("sim:token\n")
+        file_out.close()
+        suite = [entry.strip().upper() for entry in args.suite.split(",")]
+        try:
+            if "STATUS" in suite:
+                results.extend(bench_status(args, bench_dir))
+            if "SUBMIT" in suite:
+                results.extend(bench_submit(args, bench_dir))
+            if "DOWNLOAD" in suite:
+                results.extend(bench_download(args, bench_dir))
+        finally:
+            os.chdir(current_dir)
+    # report
+    baseline = {}
+    if args.baseline:
+        for entry in json.load(open(args.baseline)):
+            baseline[entry["scenario"]] = entry
+    print ("")
+    print ("latency %.3fs, bandwidth %.0fMB/s, call failures %.3f, transfer failures %.3f, fatal failures %.3f" % (
+        args.latency, args.bandwidth/1000**2, args.call_failures, args.transfer_failures, args.fatal_failures))
+    print ("%-22s %10s %8s %10s %10s %10s %10s" % ("scenario", "wall [s]", "calls", "up [MB]", "down [MB]",
+        "peak [MB]", "baseline"))
+    regressions = []
+    for entry in results:
+        compare = ""
+        if entry["scenario"] in baseline:
+            ratio = entry["wall"] / max(baseline[entry["scenario"]]["wall"], 1e-6)
+            compare = "%.2fx" % ratio
+            if ratio > 1.0 + args.threshold:
+                regressions.append(entry["scenario"])
+        peak = "%.1f" % (entry["peak"]/1000**2) if args.memory else "-"
+        print ("%-22s %10.3f %8d %10.1f %10.1f %10s %10s" % (entry["scenario"], entry["wall"], entry["calls"],
+            entry["up"]/1000**2, entry["down"]/1000**2, peak, compare))
+    if args.json:
+        file_out = open(args.json, "w")
+        json.dump(results, file_out, indent=1)
+        file_out.close()
+    if len(regressions) > 0:
+        print ("")
+        print ("REGRESSION: slower than baseline: ", ", ".join(regressions))
+        sys.exit(1)
+
+
+
+# =======================================================================================
+if __name__ == "__main__":
+    main()
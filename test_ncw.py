@@ -0,0 +1,1137 @@
+"""
+test ncw
+
+tests of the failure handling of ncw against the simulated nexus compute backend of
+ncw_bench, failures of calls and transfers are injected by the backend
+
+usage:
+    python -m pytest -q test_ncw.py
+    python -m unittest test_ncw
+"""
+import os, io, sys, csv, json, errno, shutil, socket, asyncio, hashlib, argparse, tempfile, unittest, subprocess
+from contextlib import redirect_stdout
+
+import ncw_bench
+import ncw
+
+# ---------------------------------------------------------------------------------------
+
+class SequenceRandom():
+    """
+    sequence random
+
+    stand-in for the random generator of the backend with given values, every call
+    draws two values (failure, fatal failure), every transfer draws one value,
+    a value below the rate injects the failure, after the sequence nothing fails
+    """
+
+    def __init__(self, values):
+        self.values = list(values)
+
+    def random(self):
+        if len(self.values) == 0:
+            return 1.0
+        return self.values.pop(0)
+
+
+
+class SimTestCase(unittest.TestCase):
+    """
+    sim test case
+
+    session against a simulated backend in a temporary ncw directory,
+    backoff of retries without waiting
+    """
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.current_dir = os.getcwd()
+        self.ncw_dir = os.environ.get("NCW_DIR")
+        os.environ["NCW_DIR"] = self.test_dir
+        self.retry_base = ncw.RETRY_BASE
+        ncw.RETRY_BASE = 0.0
+
+    def tearDown(self):
+        ncw.RETRY_BASE = self.retry_base
+        os.chdir(self.current_dir)
+        if self.ncw_dir is None:
+            del os.environ["NCW_DIR"]
+        else:
+            os.environ["NCW_DIR"] = self.ncw_dir
+        shutil.rmtree(self.test_dir)
+
+    def connect(self, backend, *argv, cache=False):
+        ncw_bench.SimNexusCompute.backend = backend
+        arg_space = ncw.get_parser().parse_args(([] if cache else ["--no-cache"]) + ["--format", "jsonl"] + list(argv))
+        session = ncw.NCW(arg_space, token="sim:token")
+        self.addCleanup(session.end_nc)
+        return session
+
+    def write(self, name, text):
+        file_out = open(os.path.join(self.test_dir, name), "w")
+        file_out.write(text)
+        file_out.close()
+        return os.path.join(self.test_dir, name)
+
+
+
+class TestErrorClassification(unittest.TestCase):
+
+    def test_transient_errors(self):
+        self.assertTrue(ncw.is_transient_error(ncw_bench.SimTransientError("simulated failure")))
+        self.assertTrue(ncw.is_transient_error(TimeoutError("read timed out")))
+        self.assertTrue(ncw.is_transient_error(OSError(errno.ECONNRESET, "reset by peer")))
+        self.assertTrue(ncw.is_transient_error(RuntimeError("503 service unavailable")))
+
+    def test_fatal_errors(self):
+        self.assertFalse(ncw.is_transient_error(ncw_bench.SimFatalError("simulated permission denied")))
+        self.assertFalse(ncw.is_transient_error(FileNotFoundError("a1.dat")))
+        self.assertFalse(ncw.is_transient_error(ConnectionError("401 unauthorized")))
+        self.assertFalse(ncw.is_transient_error(OSError(errno.ENOSPC, "no space left on device")))
+        self.assertFalse(ncw.is_transient_error(RuntimeError("unknown error")))
+        self.assertFalse(ncw.is_transient_error(RuntimeError("document not found")))
+        self.assertFalse(ncw.is_transient_error(RuntimeError("request failed with status 404")))
+
+    def test_status_codes_are_whole_numbers(self):
+        # numbers in job names, ids and values are no status codes
+        self.assertFalse(ncw.is_transient_error(RuntimeError("job_5001 failed")))
+        self.assertFalse(ncw.is_transient_error(RuntimeError("result 4290.f06 missing")))
+        self.assertFalse(ncw.is_transient_error(RuntimeError("elapsed 1.500 s")))
+        self.assertTrue(ncw.is_transient_error(RuntimeError("job_4041 failed: 502 bad gateway")))
+        self.assertTrue(ncw.is_transient_error(RuntimeError("HTTP 429: slow down")))
+        # words are matched as a whole, not in other words
+        self.assertTrue(ncw.is_transient_error(RuntimeError("invalid response, connection reset")))
+        self.assertFalse(ncw.is_transient_error(RuntimeError("connectionstring missing")))
+        self.assertFalse(ncw.is_transient_error(RuntimeError("invalid token")))
+
+    def test_status_of_error(self):
+        class HTTPError(Exception):
+            def __init__(self, message, status):
+                Exception.__init__(self, message)
+                self.status = status
+        self.assertTrue(ncw.is_transient_error(HTTPError("document not found", 503)))
+        self.assertFalse(ncw.is_transient_error(HTTPError("timeout", 403)))
+        error = ConnectionError("request failed")
+        error.status_code = 401
+        self.assertFalse(ncw.is_transient_error(error))
+
+
+
+class TestRetryCall(unittest.TestCase):
+
+    def setUp(self):
+        self.retry_base = ncw.RETRY_BASE
+        ncw.RETRY_BASE = 0.0
+        self.calls = 0
+
+    def tearDown(self):
+        ncw.RETRY_BASE = self.retry_base
+
+    def failing(self, failures, error):
+        def function():
+            self.calls += 1
+            if self.calls <= failures:
+                raise error
+            return "done"
+        return function
+
+    def test_transient_error_is_retried(self):
+        self.assertEqual(ncw.retry_call(self.failing(2, ConnectionError("reset")), 3), "done")
+        self.assertEqual(self.calls, 3)
+
+    def test_last_error_is_raised(self):
+        with self.assertRaises(ConnectionError):
+            ncw.retry_call(self.failing(10, ConnectionError("reset")), 3)
+        self.assertEqual(self.calls, 4)
+
+    def test_fatal_error_is_not_retried(self):
+        with self.assertRaises(PermissionError):
+            ncw.retry_call(self.failing(10, PermissionError("denied")), 3)
+        self.assertEqual(self.calls, 1)
+
+    def test_skipped_transfer_is_not_retried(self):
+        with self.assertRaises(ncw.TransferSkipped):
+            ncw.retry_call(self.failing(10, ncw.TransferSkipped("a1.op2")), 3)
+        self.assertEqual(self.calls, 1)
+
+
+
+class TestCallFailures(SimTestCase):
+
+    def test_status_with_call_failures(self):
+        backend = ncw_bench.SimBackend(docs=20, latency=0.0, call_failures=0.2, seed=3)
+        session = self.connect(backend, "--retries", "8")
+        os.chdir(self.test_dir)
+        self.assertEqual(session.get_user_status(), 20)
+        # every failed call is repeated: 1 login, 1 listing, load, list_jobs and list_files per document
+        failures = sum(backend.calls.values()) - (2 + 3 * 20)
+        self.assertGreater(failures, 0)
+
+    def test_retries_of_a_call(self):
+        backend = ncw_bench.SimBackend(docs=1, latency=0.0, call_failures=0.5)
+        session = self.connect(backend, "--retries", "3")
+        backend.calls = {}
+        # list_documents fails twice, the third call succeeds
+        backend.random = SequenceRandom([0.0, 1.0, 0.0, 1.0])
+        self.assertEqual(len(session.request("list_documents", session.my_user.list_documents)), 1)
+        self.assertEqual(backend.calls["list_documents"], 3)
+
+    def test_fatal_failure_aborts_at_once(self):
+        backend = ncw_bench.SimBackend(docs=1, latency=0.0)
+        session = self.connect(backend, "--retries", "3")
+        backend.calls = {}
+        backend.fatal_failures = 1.0
+        with self.assertRaises(ncw_bench.SimFatalError):
+            session.load_document_content("sim-doc-0")
+        self.assertEqual(backend.calls, {"load_document": 1})
+
+    def test_fatal_failure_of_login(self):
+        backend = ncw_bench.SimBackend(docs=0, latency=0.0, fatal_failures=1.0)
+        ncw_bench.SimNexusCompute.backend = backend
+        arg_space = ncw.get_parser().parse_args(["--no-cache"])
+        with self.assertRaises(ncw_bench.SimFatalError):
+            ncw.NCW(arg_space, token="sim:token")
+        self.assertEqual(backend.calls, {"login": 1})
+
+
+
+class TestTransferFailures(SimTestCase):
+
+    def download(self, resume, values):
+        """
+        download one result file, the random values decide the failures
+        """
+        backend = ncw_bench.SimBackend(docs=0, latency=0.0, bandwidth=1e9, result_size=10*1000**2,
+            transfer_failures=0.5, resume=resume)
+        doc_id = backend.new_document("download")
+        backend.add_job(doc_id, "job_1", ["a1.dat"], finished=True)
+        session = self.connect(backend, "--retries", "3")
+        doc_obj = session.load_document(doc_id)
+        calc_dir = os.path.join(self.test_dir, "results")
+        os.makedirs(calc_dir)
+        monitor = ncw.TransferMonitor("download", verbose=False)
+        manifest = ncw.DownloadManifest(calc_dir)
+        backend.calls = {}
+        backend.random = SequenceRandom(values)
+        session.download_file(doc_obj, "compute/results/job_1/a1.f06", calc_dir, monitor, manifest)
+        return backend, calc_dir + "/compute/results/job_1/a1.f06"
+
+    def test_interrupted_download_is_resumed(self):
+        # first transfer is interrupted in the middle, the second continues at the .part size
+        backend, target = self.download(True, [1.0, 1.0, 0.0])
+        self.assertEqual(backend.calls["download_file"], 2)
+        self.assertEqual(os.path.getsize(target), 10*1000**2)
+        self.assertFalse(os.path.exists(target + ".part"))
+        self.assertEqual(backend.bytes_down, 10*1000**2)
+
+    def test_interrupted_download_starts_again(self):
+        # without offset of the client the file is downloaded again from the start
+        backend, target = self.download(False, [1.0, 1.0, 0.0])
+        self.assertEqual(backend.calls["download_file"], 2)
+        self.assertEqual(os.path.getsize(target), 10*1000**2)
+        self.assertEqual(backend.bytes_down, 15*1000**2)
+
+    def test_part_file_of_earlier_run_is_resumed(self):
+        backend = ncw_bench.SimBackend(docs=0, latency=0.0, bandwidth=1e9, result_size=10*1000**2, resume=True)
+        doc_id = backend.new_document("download")
+        backend.add_job(doc_id, "job_1", ["a1.dat"], finished=True)
+        session = self.connect(backend)
+        calc_dir = os.path.join(self.test_dir, "results")
+        target = calc_dir + "/compute/results/job_1/a1.f06"
+        os.makedirs(os.path.dirname(target))
+        file_out = open(target + ".part", "wb")
+        file_out.truncate(4*1000**2)
+        file_out.close()
+        session.download_file(session.load_document(doc_id), "compute/results/job_1/a1.f06", calc_dir,
+            ncw.TransferMonitor("download", verbose=False), ncw.DownloadManifest(calc_dir))
+        self.assertEqual(os.path.getsize(target), 10*1000**2)
+        self.assertEqual(backend.bytes_down, 6*1000**2)
+
+    def test_failed_file_does_not_stop_download(self):
+        # every transfer of the first file fails, the other files of the job are downloaded
+        backend = ncw_bench.SimBackend(docs=0, latency=0.0, bandwidth=1e9, files_per_job=3)
+        doc_id = backend.new_document("download")
+        job_id = backend.add_job(doc_id, "job_1", ["a1.dat"], finished=True)
+        session = self.connect(backend, "--retries", "1", "--transfers", "1", "--no-post")
+        calc_dir = os.path.join(self.test_dir, "results")
+        download_dict = {"INCLUDE": [], "EXCLUDE": [], "MAX_SIZE": 0}
+        log_lines = []
+        # both attempts of the first file are interrupted
+        transfer = backend.transfer
+        failures = [2]
+        def failing_transfer(size, callback):
+            if failures[0] > 0:
+                failures[0] -= 1
+                raise ncw_bench.SimTransientError("simulated transfer interruption")
+            return transfer(size, callback)
+        backend.transfer = failing_transfer
+        session.download_jobs(doc_id, [job_id], calc_dir, download_dict, log_lines)
+        self.assertEqual(len([line for line in log_lines if "failed" in line]), 1)
+        self.assertEqual(len(os.listdir(calc_dir + "/compute/results/job_1")), 2)
+
+
+
+class TestSubmitValidation(SimTestCase):
+
+    def test_missing_include_stops_submit(self):
+        # the submission is stopped before a document is created
+        self.write("a1.dat", "SOL 101\nINCLUDE 'missing.bdf'\nCEND\n")
+        submit_dict = ncw.get_submission_info(self.write("submit.txt", "file:a1.dat\n"))
+        self.assertEqual(len(submit_dict["ERRORS"]), 1)
+        backend = ncw_bench.SimBackend(docs=0, latency=0.0)
+        session = self.connect(backend)
+        os.chdir(self.test_dir)
+        with self.assertRaises(SystemExit):
+            session.submit_files(submit_dict)
+        self.assertEqual(len(backend.documents), 0)
+
+    def test_absolute_include_is_a_warning(self):
+        include_file = self.write("mesh.bdf", "GRID\n")
+        self.write("a1.dat", "SOL 101\nINCLUDE '" + include_file + "'\nCEND\n")
+        submit_dict = ncw.get_submission_info(self.write("submit.txt", "file:a1.dat\n"))
+        self.assertEqual(submit_dict["ERRORS"], [])
+        self.assertEqual(len(submit_dict["WARNINGS"]), 1)
+
+
+
+class TestDeckAnalysis(SimTestCase):
+
+    def test_analysis_is_taken_from_upload_index(self):
+        include_list = [(self.write("mesh.bdf", "GRID    1\nGRID    2\nCQUAD4  1\n"), "mesh.bdf")]
+        decks = [self.write("a1.dat", "SOL 103\nCEND\nBEGIN BULK\nGRID    3\n"), 
+            self.write("a2.dat", "SOL 101\nCEND\nBEGIN BULK\n")]
+        expected = [ncw.analyze_deck(deck, include_list) for deck in decks]
+        self.assertEqual(expected[0], {"SOL": "103", "GRIDS": 3, "ELEMENTS": 1, "DOFS": 18})
+        analyze_file = ncw.analyze_file
+        read_files = []
+        def counting(file_name, sol_search=True):
+            read_files.append(os.path.basename(file_name))
+            return analyze_file(file_name, sol_search)
+        ncw.analyze_file = counting
+        self.addCleanup(setattr, ncw, "analyze_file", analyze_file)
+        # the include of both decks is read once
+        upload_index = ncw.UploadIndex()
+        self.assertEqual([ncw.analyze_deck(deck, include_list, upload_index) for deck in decks], expected)
+        self.assertEqual(sorted(read_files), ["a1.dat", "a2.dat", "mesh.bdf"])
+        # unchanged files of the next run are not read again, a changed file is
+        os.utime(decks[1], (0, 0))
+        upload_index = ncw.UploadIndex()
+        self.assertEqual([ncw.analyze_deck(deck, include_list, upload_index) for deck in decks], expected)
+        self.assertEqual(sorted(read_files), ["a1.dat", "a2.dat", "a2.dat", "mesh.bdf"])
+
+
+
+class TestStatusChanges(SimTestCase):
+
+    def status_changes(self, session):
+        session.get_status_changes()
+        file_in = open(os.path.join(self.test_dir, "ncw_output_status_changes.jsonl"))
+        records = [json.loads(line)["record"] for line in file_in]
+        file_in.close()
+        return records
+
+    def test_new_job_in_cached_document(self):
+        backend = ncw_bench.SimBackend(docs=2, jobs_per_doc=1, latency=0.0)
+        session = self.connect(backend, cache=True)
+        os.chdir(self.test_dir)
+        self.assertEqual(self.status_changes(session).count("new_document"), 2)
+        # finished documents with the same entry in the document list are not requested at all
+        backend.calls = {}
+        self.assertNotIn("new_job", self.status_changes(session))
+        self.assertEqual(backend.calls, {"list_documents": 1})
+        # a job submitted into a finished document by another installation changes the job count
+        backend.add_job("sim-doc-0", "job_new", ["b1.dat"])
+        backend.calls = {}
+        self.assertEqual(self.status_changes(session).count("new_job"), 1)
+        self.assertEqual(backend.calls["load_document"], 1)
+
+    def test_running_document_is_loaded(self):
+        backend = ncw_bench.SimBackend(docs=1, jobs_per_doc=1, latency=0.0, job_duration=60.0)
+        backend.add_job("sim-doc-0", "job_running", ["b1.dat"])
+        session = self.connect(backend, cache=True)
+        os.chdir(self.test_dir)
+        self.status_changes(session)
+        backend.calls = {}
+        self.assertEqual(self.status_changes(session), [])
+        self.assertEqual(backend.calls["load_document"], 1)
+
+
+
+class TestPostProcess(SimTestCase):
+
+    def post_process(self, session, job_dir):
+        session.post_process([("job_1", job_dir)])
+        file_in = open(os.path.join(self.test_dir, "ncw_output_post.txt"))
+        line = file_in.readlines()[1].split()
+        file_in.close()
+        return int(line[1])
+
+    def test_summary_of_unchanged_job_is_kept(self):
+        session = self.connect(ncw_bench.SimBackend(docs=0, latency=0.0))
+        os.chdir(self.test_dir)
+        job_dir = os.path.join(self.test_dir, "job_1")
+        os.makedirs(job_dir)
+        self.write("job_1/a1.f06", "*** USER FATAL MESSAGE 2001\n")
+        self.assertEqual(self.post_process(session, job_dir), 1)
+        # the kept summary is used as long as the files are unchanged
+        summary_file = os.path.join(job_dir, ncw.POST_SUMMARY_FILE)
+        file_in = open(summary_file)
+        entry = json.load(file_in)
+        file_in.close()
+        entry["summary"]["fatal"] = 7
+        file_out = open(summary_file, "w")
+        json.dump(entry, file_out)
+        file_out.close()
+        self.assertEqual(self.post_process(session, job_dir), 7)
+        # a new result file of the job is scanned again
+        self.write("job_1/a1.f04", "*** USER FATAL MESSAGE 2001\n*** USER FATAL MESSAGE 2002\n")
+        self.assertEqual(self.post_process(session, job_dir), 2)
+
+
+
+class TestAsync(SimTestCase):
+
+    def test_output_and_failed_download(self):
+        # every transfer is interrupted, the failed file is finished in the transfer metrics
+        backend = ncw_bench.SimBackend(docs=0, latency=0.0, files_per_job=1, transfer_failures=1.0)
+        doc_id = backend.new_document("download")
+        backend.add_job(doc_id, "job_1", ["a1.dat"], finished=True)
+        ncw_bench.SimNexusCompute.backend = backend
+        log_lines = []
+        async def run():
+            session = await ncw.AsyncNCW.connect("sim:token", log=log_lines.append, no_cache=True, retries=0)
+            try:
+                with self.assertRaises(ncw_bench.SimTransientError):
+                    await session.download(doc_id, calc_dir=os.path.join(self.test_dir, "results"))
+                return session.ncw.metrics.files["download"]
+            finally:
+                await session.close()
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            files = asyncio.run(run())
+            # stdout is set again after the last call
+            self.assertIs(sys.stdout, stdout)
+        self.assertEqual(stdout.getvalue(), "")
+        self.assertIn("user id:  sim-user", log_lines)
+        self.assertTrue(all([f["failed"] for f in files]))
+        self.assertEqual(len(files), 1)
+
+
+    def test_submit_into_new_document(self):
+        backend = ncw_bench.SimBackend(docs=0, latency=0.0)
+        ncw_bench.SimNexusCompute.backend = backend
+        deck = self.write("a1.dat", "SOL 101\nCEND\nBEGIN BULK\nENDDATA\n")
+        async def run():
+            session = await ncw.AsyncNCW.connect("sim:token", log=lambda line: None, no_cache=True)
+            try:
+                submitted = await session.submit([deck], tag="async")
+                return submitted, session.ncw.journal.find(tag="async")
+            finally:
+                await session.close()
+        submitted, row_list = asyncio.run(run())
+        # the journal has the name of the new document
+        doc_name = backend.documents[submitted["doc_id"]]["name"]
+        self.assertTrue(doc_name.startswith("doc_"))
+        self.assertEqual([row["doc_name"] for row in row_list], [doc_name])
+        self.assertEqual([row["job_name"] for row in row_list], ["a1"])
+
+
+class TestTransferMetrics(SimTestCase):
+
+    def test_prometheus_summary(self):
+        metrics = ncw.TransferMetrics(ncw.get_parser().parse_args(["--action", "DOWNLOAD"]))
+        metrics.add_file("download", "a1.f06", 1000**2, 0.0, 1.0)
+        metrics.add_file("download", "a2.f06", 2*1000**2, 0.0, 1.0)
+        metrics.add_file("download", "a3.f06", 10, 0.0, 1.0, failed=True)
+        metrics.write_prometheus(metrics.get_summary("download"))
+        file_in = open(os.path.join(self.test_dir, "ncw_metrics_download.prom"))
+        lines = file_in.read().splitlines()
+        file_in.close()
+        name = "ncw_transfer_file_throughput_bytes_per_second"
+        self.assertIn("# TYPE " + name + " summary", lines)
+        labels = '{direction="download",action="DOWNLOAD"}'
+        self.assertIn(name + "_sum" + labels + " 3000000.0", lines)
+        self.assertIn(name + "_count" + labels + " 2.0", lines)
+
+
+
+class TestLogFile(SimTestCase):
+
+    def test_rename_current_log_file_name(self):
+        # the first submit has no log file to rename
+        log_file_name = os.path.join(self.test_dir, "ncw_output_submit.txt")
+        self.assertEqual(ncw.rename_current_log_file_name(log_file_name), "")
+        for counter in (1, 2):
+            self.write("ncw_output_submit.txt", "JOB_ID:" + str(counter) + "\n")
+            self.assertEqual(ncw.rename_current_log_file_name(log_file_name), log_file_name + "." + str(counter))
+        self.assertFalse(os.path.exists(log_file_name))
+
+
+
+class TestPrune(SimTestCase):
+
+    def prune(self, change):
+        """
+        prune two old documents, change is called with the backend after the listing
+        """
+        backend = ncw_bench.SimBackend(docs=0, latency=0.0)
+        doc_ids = []
+        for i in range(2):
+            doc_ids.append(backend.new_document("doc_2020010100000" + str(i)))
+            backend.add_job(doc_ids[-1], "job_1", ["a1.dat"], finished=True)
+        session = self.connect(backend, "--older-than", "1")
+        os.chdir(self.test_dir)
+        iter_document_status = session.iter_document_status
+        def listing(doc_list, solver_configs=True):
+            for status in iter_document_status(doc_list, solver_configs):
+                yield status
+            change(backend, doc_ids)
+        session.iter_document_status = listing
+        return backend, doc_ids, session.prune_documents()
+
+    def test_old_documents_are_deleted(self):
+        backend, doc_ids, deleted = self.prune(lambda backend, doc_ids: None)
+        self.assertEqual(deleted, 2)
+        self.assertEqual(len(backend.documents), 0)
+
+    def test_new_job_after_listing_keeps_document(self):
+        # a job submitted into the document after the listing is found by the request before the deletion
+        backend, doc_ids, deleted = self.prune(lambda backend, doc_ids: backend.add_job(doc_ids[0], "job_2", ["a2.dat"]))
+        self.assertEqual(deleted, 1)
+        self.assertEqual(list(backend.documents.keys()), [doc_ids[0]])
+        file_in = open(os.path.join(self.test_dir, "ncw_output_prune.txt"))
+        self.assertIn("new job job_2", file_in.read())
+        file_in.close()
+
+
+
+class TestSubmit(SimTestCase):
+
+    def submit(self, backend, decks, *argv):
+        """
+        submit decks of 100 bytes into a new document, the transfers of the backend are recorded
+        """
+        lines = ["doc:submit"]
+        for deck in decks:
+            self.write(deck, "SOL 101\nCEND\nBEGIN BULK\n" + "$" * 73 + "\n")
+            lines.append("file:" + deck)
+        submit_file = self.write("submit.txt", "\n".join(lines) + "\n")
+        session = self.connect(backend, "--file", submit_file, *argv)
+        os.chdir(self.test_dir)
+        self.events = []
+        self.active = [0, 0]
+        transfer = backend.transfer
+        call = backend.call
+        def recorded_transfer(size, callback):
+            with backend.lock:
+                self.active[0] += 1
+                self.active[1] = max(self.active)
+            try:
+                return transfer(size, callback)
+            finally:
+                with backend.lock:
+                    self.active[0] -= 1
+                    self.events.append("uploaded")
+        def recorded_call(name):
+            with backend.lock:
+                self.events.append(name)
+            call(name)
+        backend.transfer = recorded_transfer
+        backend.call = recorded_call
+        session.submit_files()
+        return list(backend.documents.values())[-1]
+
+    def test_uploads_run_in_parallel(self):
+        # 0.05s per upload, four decks with two transfers
+        backend = ncw_bench.SimBackend(docs=0, latency=0.0, bandwidth=2000)
+        document = self.submit(backend, ["a1.dat", "a2.dat", "a3.dat", "a4.dat"], "--transfers", "2")
+        self.assertEqual(self.active[1], 2)
+        self.assertEqual(len(document["jobs"]), 4)
+
+    def test_job_is_submitted_after_its_own_upload(self):
+        # the backend refuses jobs with files which are not in the document, the first job is
+        # submitted before the last deck is uploaded
+        backend = ncw_bench.SimBackend(docs=0, latency=0.0, bandwidth=2000)
+        document = self.submit(backend, ["a1.dat", "a2.dat", "a3.dat"], "--transfers", "1")
+        self.assertEqual(self.active[1], 1)
+        self.assertEqual(len(document["jobs"]), 3)
+        events = [event for event in self.events if event in ("uploaded", "submit_job")]
+        self.assertEqual(events[:2], ["uploaded", "submit_job"])
+        self.assertLess(events.index("submit_job"), len(events) - 2)
+        file_in = open(os.path.join(self.test_dir, "ncw_output_submit.txt"))
+        self.assertEqual(file_in.read().count("JOB_ID:"), 3)
+        file_in.close()
+
+
+
+class TestDownload(SimTestCase):
+
+    def download(self, backend, lines, *argv):
+        """
+        DOWNLOAD with a download file, returns the result files of the calc directory
+        """
+        download_file = self.write("download.txt", "\n".join(lines) + "\n")
+        session = self.connect(backend, "--file", download_file, "--no-post", *argv)
+        os.chdir(self.test_dir)
+        backend.calls = {}
+        session.download_files()
+        result_files = []
+        for directory, dir_names, file_names in os.walk(os.path.join(self.test_dir, "results")):
+            result_files.extend([os.path.relpath(os.path.join(directory, f), self.test_dir) for f in file_names
+                if not f.startswith("ncw_")])
+        return sorted(result_files)
+
+    def finished_document(self, backend, jobs):
+        doc_id = backend.new_document("download")
+        lines = ["DOC_ID:" + doc_id, "CALC_DIR:" + os.path.join(self.test_dir, "results")]
+        for i in range(jobs):
+            lines.append("JOB_ID:" + backend.add_job(doc_id, "job_" + str(i + 1), ["a" + str(i + 1) + ".dat"], 
+                finished=True))
+        return lines
+
+    def test_complete_files_are_skipped(self):
+        backend = ncw_bench.SimBackend(docs=0, latency=0.0, files_per_job=3, result_size=1000)
+        lines = self.finished_document(backend, 2)
+        self.assertEqual(len(self.download(backend, lines)), 6)
+        self.assertEqual(backend.calls["download_file"], 6)
+        # all files are complete in the manifest, nothing is transferred
+        self.assertEqual(len(self.download(backend, lines)), 6)
+        self.assertNotIn("download_file", backend.calls)
+        # a removed file is downloaded again
+        os.remove(os.path.join(self.test_dir, "results/compute/results/job_1/a1.f06"))
+        self.assertEqual(len(self.download(backend, lines)), 6)
+        self.assertEqual(backend.calls["download_file"], 1)
+
+    def test_filters_of_download_file_and_options(self):
+        backend = ncw_bench.SimBackend(docs=0, latency=0.0, files_per_job=5, result_size=1000)
+        lines = self.finished_document(backend, 1) + ["INCLUDE:*.f06,*.f04,*.log", "EXCLUDE:*.log"]
+        self.assertEqual(self.download(backend, lines), ["results/compute/results/job_1/a1.f04", 
+            "results/compute/results/job_1/a1.f06"])
+        # options of the command line are added to the patterns of the download file
+        result_files = self.download(backend, lines, "--include", "*.h5")
+        self.assertIn("results/compute/results/job_1/a1.h5", result_files)
+        self.assertEqual(len(result_files), 3)
+
+    def test_files_larger_than_max_size_are_skipped(self):
+        backend = ncw_bench.SimBackend(docs=0, latency=0.0, files_per_job=2, result_size=2000)
+        lines = self.finished_document(backend, 1)
+        self.assertEqual(self.download(backend, lines + ["MAX_SIZE:1KB"]), [])
+        # the skipped files are not in the manifest, a run without maximum size downloads them
+        self.assertEqual(len(self.download(backend, lines, "--max-size", "1MB")), 2)
+
+
+    def test_queries_of_download_file(self):
+        backend = ncw_bench.SimBackend(docs=0, latency=0.0, files_per_job=1, result_size=1000, job_duration=60.0)
+        doc_id = backend.new_document("wing")
+        backend.add_job(doc_id, "wing_1", ["a1.dat"], finished=True)
+        backend.add_job(doc_id, "flap_1", ["a2.dat"], finished=True)
+        backend.add_job(doc_id, "wing_2", ["a3.dat"])
+        # jobs of a document without job ids are selected by status and job name
+        lines = ["DOC_ID:" + doc_id, "CALC_DIR:" + os.path.join(self.test_dir, "results"), "STATUS:done", 
+            "JOB_NAME:wing_*,rib_*"]
+        self.assertEqual(self.download(backend, lines), ["results/compute/results/wing_1/a1.f06"])
+        # the selected running job has no result files yet
+        self.assertEqual(self.download(backend, lines[:2] + ["STATUS:Running"]), 
+            ["results/compute/results/wing_1/a1.f06"])
+        self.assertNotIn("download_file", backend.calls)
+        # all documents with a matching name, every document in its own directory
+        shutil.rmtree(os.path.join(self.test_dir, "results"))
+        for name in ("sweep_1", "sweep_2", "other"):
+            backend.add_job(backend.new_document(name), "job_1", ["b1.dat"], finished=True)
+        lines = ["CALC_DIR:" + os.path.join(self.test_dir, "results"), "ALL_DOCS:sweep_*", "STATUS:Done"]
+        self.assertEqual(self.download(backend, lines), ["results/sweep_1/compute/results/job_1/b1.f06", 
+            "results/sweep_2/compute/results/job_1/b1.f06"])
+
+
+class TestUploadIndex(SimTestCase):
+
+    def test_index_is_compacted_on_load(self):
+        local_file = self.write("a1.dat", "SOL 101\n")
+        upload_index = ncw.UploadIndex()
+        upload_index.add("hash_1", "doc_1", "a1.dat")
+        upload_index.add("hash_2", "doc_1", "a1.dat")
+        first_hash = upload_index.get_hash(local_file)
+        self.write("a1.dat", "SOL 103\n")
+        os.utime(local_file, (0, 0))
+        second_hash = upload_index.get_hash(local_file)
+        self.assertNotEqual(first_hash, second_hash)
+        upload_index = ncw.UploadIndex()
+        file_in = open(upload_index.file_name)
+        self.assertEqual(len(file_in.readlines()), 2)
+        file_in.close()
+        self.assertTrue(upload_index.is_current("hash_2", "doc_1", "a1.dat", ["a1.dat"]))
+        self.assertEqual(upload_index.get_hash(local_file), second_hash)
+
+    def test_unchanged_file_is_not_uploaded_again(self):
+        backend = ncw_bench.SimBackend(docs=0, latency=0.0)
+        doc_id = backend.new_document("dedup")
+        self.write("mesh.bdf", "GRID    1\n")
+        self.write("a1.dat", "SOL 101\nINCLUDE 'mesh.bdf'\n")
+        submit_file = self.write("submit.txt", "doc_id:" + doc_id + "\nfile:a1.dat\n")
+        os.chdir(self.test_dir)
+        self.connect(backend, "--file", submit_file).submit_files()
+        self.assertEqual(backend.calls["upload_file"], 2)
+        # only the changed deck is uploaded into the document again
+        self.write("a1.dat", "SOL 103\nINCLUDE 'mesh.bdf'\n")
+        backend.calls = {}
+        self.connect(backend, "--file", submit_file).submit_files()
+        self.assertEqual(backend.calls["upload_file"], 1)
+        self.assertEqual(len(backend.documents[doc_id]["jobs"]), 2)
+
+
+
+class TestNcwDir(SimTestCase):
+
+    def test_default_is_user_data_directory(self):
+        data_home = os.environ.get("XDG_DATA_HOME")
+        del os.environ["NCW_DIR"]
+        os.environ["XDG_DATA_HOME"] = self.test_dir
+        try:
+            self.assertEqual(ncw.get_ncw_dir(), os.path.join(self.test_dir, "ncw"))
+            self.assertTrue(os.path.isdir(os.path.join(self.test_dir, "ncw")))
+        finally:
+            os.environ["NCW_DIR"] = self.test_dir
+            if data_home is None:
+                del os.environ["XDG_DATA_HOME"]
+            else:
+                os.environ["XDG_DATA_HOME"] = data_home
+
+    def test_environment_variable(self):
+        self.assertEqual(ncw.get_ncw_dir(), self.test_dir)
+        self.assertNotEqual(ncw.get_ncw_dir(), os.path.dirname(os.path.realpath(ncw.__file__)))
+
+
+
+class TestWatch(SimTestCase):
+
+    def test_results_are_downloaded_when_jobs_are_done(self):
+        backend = ncw_bench.SimBackend(docs=0, latency=0.0, files_per_job=2, result_size=1000, job_duration=0.3)
+        doc_id = backend.new_document("watch")
+        lines = ["DOC_ID:" + doc_id, "CALC_DIR:" + os.path.join(self.test_dir, "results")]
+        for i in range(3):
+            lines.append("JOB_ID:" + backend.add_job(doc_id, "job_" + str(i + 1), ["a" + str(i + 1) + ".dat"]))
+        watch_file = self.write("watch.txt", "\n".join(lines) + "\n")
+        session = self.connect(backend, "--file", watch_file, "--no-post", "--poll-min", "0.05", "--poll-max", "0.1")
+        os.chdir(self.test_dir)
+        session.watch_jobs()
+        self.assertEqual(backend.calls["download_file"], 6)
+        for i in range(3):
+            self.assertTrue(os.path.isfile(os.path.join(self.test_dir, "results/compute/results/job_" + str(i + 1),
+                "a" + str(i + 1) + ".f06")))
+        file_in = open("ncw_output_watch.txt")
+        log_text = file_in.read()
+        file_in.close()
+        self.assertIn("  Running\n", log_text)
+        self.assertIn("  Done\n", log_text)
+        self.assertNotIn("JobStatus", log_text)
+        # the lines of every download stay together
+        log_lines = log_text.splitlines()
+        starts = [k for k, line in enumerate(log_lines) if line == "doc ids and job ids:"]
+        self.assertEqual(len(starts), 3)
+        for k in starts:
+            self.assertEqual(log_lines[k + 1], " " + doc_id)
+            self.assertEqual(log_lines[k + 3], "calc dir: " + os.path.join(self.test_dir, "results"))
+
+    def test_log_is_written_when_a_download_fails(self):
+        backend = ncw_bench.SimBackend(docs=0, latency=0.0, files_per_job=1, result_size=1000)
+        doc_id = backend.new_document("watch")
+        job_id = backend.add_job(doc_id, "job_1", ["a1.dat"], finished=True)
+        watch_file = self.write("watch.txt", "DOC_ID:" + doc_id + "\nCALC_DIR:" + self.test_dir + "/results\nJOB_ID:" +
+            job_id + "\n")
+        session = self.connect(backend, "--file", watch_file, "--no-post", "--poll-min", "0.05")
+        os.chdir(self.test_dir)
+        def failed_download(*args):
+            raise RuntimeError("disk full")
+        session.download_jobs = failed_download
+        with redirect_stdout(io.StringIO()) as output:
+            session.watch_jobs()
+        self.assertIn("download of job", output.getvalue())
+        file_in = open("ncw_output_watch.txt")
+        self.assertIn("download of job " + job_id + " failed: disk full\n", file_in.read())
+        file_in.close()
+
+
+
+class TestDaemon(SimTestCase):
+
+    def request(self, session, argv):
+        """
+        send one request of a client to the daemon session, returns the messages of the daemon
+        """
+        server_conn, client_conn = socket.socketpair()
+        client_conn.sendall((json.dumps({"argv": argv, "cwd": self.test_dir, 
+            "token": hashlib.sha256(b"sim:token").hexdigest()}) + "\n").encode())
+        ncw.handle_daemon_request(session, session.arg_space, server_conn)
+        server_conn.close()
+        file_in = client_conn.makefile("r")
+        messages = [json.loads(line) for line in file_in]
+        file_in.close()
+        client_conn.close()
+        return messages
+
+    def test_cache_options_of_client_are_used(self):
+        backend = ncw_bench.SimBackend(docs=0, latency=0.0)
+        session = self.connect(backend, cache=True)
+        daemon_cache = session.cache
+        argv = ["-a", "STATUS", "-t", self.write("token.txt", "sim:token\n")]
+        caches = []
+        run_action = ncw.run_action
+        ncw.run_action = lambda ncw_session, args: caches.append((ncw_session.cache.enabled, ncw_session.cache.ttl))
+        try:
+            self.request(session, argv + ["--no-cache"])
+            self.request(session, argv + ["--cache-ttl", "1"])
+            self.request(session, argv)
+        finally:
+            ncw.run_action = run_action
+        self.assertEqual(caches, [(False, daemon_cache.ttl), (True, 3600.0), (True, daemon_cache.ttl)])
+        self.assertIs(session.cache, daemon_cache)
+
+    def test_socket_is_private(self):
+        ncw_bench.SimNexusCompute.backend = ncw_bench.SimBackend(docs=0, latency=0.0)
+        socket_name = os.path.join(self.test_dir, "ncw.sock")
+        args = ncw.get_parser().parse_args(["-a", "DAEMON", "--socket", socket_name, "--idle-timeout", "0.5", 
+            "-t", self.write("token.txt", "sim:token\n")])
+        modes = []
+        bind = socket.socket.bind
+        def checked_bind(server, address):
+            bind(server, address)
+            modes.append(os.stat(address).st_mode & 0o777)
+        socket.socket.bind = checked_bind
+        try:
+            with redirect_stdout(io.StringIO()):
+                ncw.run_daemon(args)
+        finally:
+            socket.socket.bind = bind
+        self.assertEqual(len(modes), 1)
+        self.assertEqual(modes[0] & 0o077, 0)
+        self.assertFalse(os.path.exists(socket_name))
+
+
+
+class TestProfile(SimTestCase):
+
+    def test_trace_of_download(self):
+        backend = ncw_bench.SimBackend(docs=0, latency=0.0, files_per_job=2, result_size=1000)
+        doc_id = backend.new_document("profile")
+        job_id = backend.add_job(doc_id, "job_1", ["a1.dat"], finished=True)
+        download_file = self.write("download.txt", "DOC_ID:" + doc_id + "\nCALC_DIR:" + self.test_dir + 
+            "/results\nJOB_ID:" + job_id + "\n")
+        trace_file = os.path.join(self.test_dir, "trace.json")
+        session = self.connect(backend, "--file", download_file, "--no-post", "--profile", trace_file)
+        os.chdir(self.test_dir)
+        session.download_files()
+        with redirect_stdout(io.StringIO()) as output:
+            session.profiler.write()
+        self.assertIn("profile written to:  " + trace_file, output.getvalue())
+        file_in = open(trace_file)
+        events = json.load(file_in)["traceEvents"]
+        file_in.close()
+        spans = [(event["cat"], event["name"]) for event in events if event["ph"] == "X"]
+        self.assertIn(("phase", "login"), spans)
+        self.assertEqual(spans.count(("file", "download_file")), 2)
+        self.assertTrue(all([event["dur"] >= 0.0 for event in events if event["ph"] == "X"]))
+        self.assertTrue(any([event["ph"] == "M" and event["name"] == "thread_name" for event in events]))
+
+    def test_switched_off_without_file_name(self):
+        profiler = ncw.Profiler()
+        with profiler.span("login", "phase"):
+            pass
+        profiler.progress("a1.f06", 1000.0, 1.0, 1000)
+        self.assertEqual(profiler.events, [])
+
+
+
+class TestBench(SimTestCase):
+
+    def bench_args(self, **options):
+        args = argparse.Namespace(docs=5, jobs=2, files_per_job=2, results=6, result_size=1000, uploads=2,
+            upload_size=2*1000**2, latency=0.0, bandwidth=1000**3, call_failures=0.0, transfer_failures=0.0,
+            fatal_failures=0.0, resume=False, workers=4, transfers=2, memory=False)
+        for name, value in options.items():
+            setattr(args, name, value)
+        self.write("token_file.txt", "sim:token\n")
+        os.chdir(self.test_dir)
+        return args
+
+    def test_status_scenarios(self):
+        results = ncw_bench.bench_status(self.bench_args(), self.test_dir)
+        scenarios = dict([(entry["scenario"], entry) for entry in results])
+        self.assertEqual(sorted(scenarios), ["STATUS cached", "STATUS workers=1", "STATUS workers=4"])
+        self.assertEqual(scenarios["STATUS workers=1"]["calls"], scenarios["STATUS workers=4"]["calls"])
+        # documents with only finished jobs are not loaded from the cache
+        self.assertLess(scenarios["STATUS cached"]["calls"], scenarios["STATUS workers=4"]["calls"])
+
+    def test_download_scenarios(self):
+        results = ncw_bench.bench_download(self.bench_args(resume=True), self.test_dir)
+        self.assertEqual([entry["scenario"] for entry in results], ["DOWNLOAD", "DOWNLOAD complete"])
+        self.assertEqual(results[0]["down"], 6*1000)
+        self.assertEqual(results[1]["down"], 0)
+
+    def test_submit_scenarios(self):
+        results = ncw_bench.bench_submit(self.bench_args(), self.test_dir)
+        self.assertEqual([entry["scenario"] for entry in results], ["SUBMIT", "SUBMIT unchanged"])
+        self.assertGreater(results[0]["up"], 2*1000**2)
+        # unchanged decks are not uploaded again into the same document
+        self.assertEqual(results[1]["up"], 0)
+
+
+
+class TestStatusFormat(SimTestCase):
+
+    def status(self, output_format, extension):
+        backend = ncw_bench.SimBackend(docs=2, jobs_per_doc=2, latency=0.0)
+        session = self.connect(backend, "--format", output_format)
+        os.chdir(self.test_dir)
+        with redirect_stdout(io.StringIO()):
+            session.get_user_status()
+        file_in = open(os.path.join(self.test_dir, "ncw_output_status." + extension), newline="")
+        text = file_in.read()
+        file_in.close()
+        return text
+
+    def test_jsonl_records(self):
+        records = [json.loads(line) for line in self.status("jsonl", "jsonl").splitlines()]
+        documents = [record for record in records if record["record"] == "document"]
+        self.assertEqual(sorted([record["doc_id"] for record in documents]), ["sim-doc-0", "sim-doc-1"])
+        self.assertEqual(documents[0]["jobs"], 2)
+        jobs = [record for record in records if record["record"] == "job"]
+        self.assertEqual(len(jobs), 4)
+        self.assertEqual(set([record["status"] for record in jobs]), set(["Done"]))
+        self.assertEqual(set(jobs[0]), set(["record", "doc_id", "doc_name", "job_id", "job_name", "status"]))
+
+    def test_csv_records(self):
+        rows = list(csv.reader(io.StringIO(self.status("csv", "csv"))))
+        self.assertEqual(tuple(rows[0]), ncw.STATUS_FIELDS)
+        records = [dict(zip(rows[0], row)) for row in rows[1:]]
+        self.assertTrue(all([len(row) == len(ncw.STATUS_FIELDS) for row in rows]))
+        jobs = [record for record in records if record["record"] == "job"]
+        self.assertEqual(len(jobs), 4)
+        self.assertEqual(set([record["status"] for record in jobs]), set(["Done"]))
+        self.assertEqual(jobs[0]["file"], "")
+        self.assertEqual(len([record for record in records if record["record"] == "document"]), 2)
+
+
+
+class TestSweep(SimTestCase):
+
+    def sweep(self, backend, *sources):
+        session = self.connect(backend, "--poll-min", "0.05", "--max-running", "2", *sources)
+        os.chdir(self.test_dir)
+        backend.calls = {}
+        with redirect_stdout(io.StringIO()):
+            session.sweep_jobs()
+        file_in = open(os.path.join(self.test_dir, "ncw_sweep_queue.json"))
+        entries = json.load(file_in)["entries"]
+        file_in.close()
+        return entries
+
+    def write_decks(self, decks):
+        os.makedirs(os.path.join(self.test_dir, "decks"))
+        for i in range(decks):
+            self.write("decks/a" + str(i + 1) + ".dat", "SOL 101\nCEND\nBEGIN BULK\nENDDATA\n")
+        return os.path.join(self.test_dir, "decks")
+
+    def test_max_running(self):
+        backend = ncw_bench.SimBackend(docs=0, latency=0.0, job_duration=0.2)
+        entries = self.sweep(backend, self.write_decks(5))
+        self.assertEqual([entry["state"] for entry in entries], ["finished"] * 5)
+        self.assertEqual(backend.calls["submit_job"], 5)
+        # no job is started before another job is seen as finished
+        jobs = [job for document in backend.documents.values() for job in document["jobs"].values()]
+        for job in jobs:
+            running = [other for other in jobs 
+                if other["submitted"] <= job["submitted"] < other["submitted"] + backend.job_duration]
+            self.assertLessEqual(len(running), 2)
+
+    def test_restart_from_queue(self):
+        backend = ncw_bench.SimBackend(docs=0, latency=0.0)
+        entries = self.sweep(backend, self.write_decks(3))
+        # interrupted during the upload of the second job, the third job was not started
+        queue_file = os.path.join(self.test_dir, "ncw_sweep_queue.json")
+        file_in = open(queue_file)
+        content = json.load(file_in)
+        file_in.close()
+        content["entries"][0]["state"] = "running"
+        content["entries"][1].update({"state": "uploading", "job_id": "", "status": ""})
+        content["entries"][2].update({"state": "queued", "job_id": "", "status": ""})
+        file_out = open(queue_file, "w")
+        json.dump(content, file_out)
+        file_out.close()
+        restarted = self.sweep(backend)
+        self.assertEqual(backend.calls["submit_job"], 2)
+        self.assertEqual(restarted[0]["job_id"], entries[0]["job_id"])
+        self.assertEqual([entry["state"] for entry in restarted], ["finished"] * 3)
+        self.assertEqual(len(backend.documents), 1)
+
+
+
+class TestTail(SimTestCase):
+
+    class GrowingDocument():
+        """
+        document with a growing .f04 file, listed with size, transferred from an offset
+        """
+
+        def __init__(self):
+            self.content = b""
+            self.transfers = []
+
+        def list_job_results(self, job_id):
+            return [{"path": "compute/results/job_1/a1.f04", "size": len(self.content)}, 
+                {"path": "compute/results/job_1/a1.op2", "size": 100}]
+
+        def download_file(self, document_path, sink, progress, offset=0):
+            self.transfers.append(offset)
+            progress(len(self.content) - offset, len(self.content), 1.0, 1.0)
+            file_out = open(sink, "r+b" if offset > 0 else "wb")
+            file_out.seek(offset)
+            file_out.write(self.content[offset:])
+            file_out.truncate(len(self.content))
+            file_out.close()
+            return True
+
+    def tail(self, session, doc_obj, tail):
+        with redirect_stdout(io.StringIO()) as output:
+            session.tail_job(doc_obj, "job-1", tail, list(ncw.TAIL_PATTERNS))
+        return output.getvalue().splitlines()
+
+    def test_new_lines_are_fetched_from_offset(self):
+        session = self.connect(ncw_bench.SimBackend(docs=0, latency=0.0))
+        tail = {"doc": {"CALC_DIR": self.test_dir}, "name": "job_1", "status": "Running", "files": {}}
+        doc_obj = self.GrowingDocument()
+        doc_obj.content = b"line 1\nline 2\nline"
+        self.assertEqual(self.tail(session, doc_obj, tail), ["[job_1 a1.f04] line 1", "[job_1 a1.f04] line 2"])
+        # unchanged size in the result list, nothing is transferred
+        self.assertEqual(self.tail(session, doc_obj, tail), [])
+        self.assertEqual(doc_obj.transfers, [0])
+        # only the new bytes are fetched, the incomplete line is printed when it is complete
+        doc_obj.content += b" 3\nline 4\n"
+        self.assertEqual(self.tail(session, doc_obj, tail), ["[job_1 a1.f04] line 3", "[job_1 a1.f04] line 4"])
+        self.assertEqual(doc_obj.transfers, [0, 18])
+        file_in = open(os.path.join(self.test_dir, "ncw_tail/job_1/a1.f04"), "rb")
+        self.assertEqual(file_in.read(), doc_obj.content)
+        file_in.close()
+        # a rewritten shorter file is printed from the start
+        doc_obj.content = b"restart\n"
+        self.assertEqual(self.tail(session, doc_obj, tail), ["[job_1 a1.f04] restart"])
+        self.assertEqual(doc_obj.transfers, [0, 18, 0])
+
+    def test_whole_file_without_offset(self):
+        backend = ncw_bench.SimBackend(docs=0, latency=0.0, files_per_job=3, result_size=1000)
+        doc_id = backend.new_document("tail")
+        job_id = backend.add_job(doc_id, "job_1", ["a1.dat"], finished=True)
+        session = self.connect(backend)
+        doc_obj = session.load_document(doc_id)
+        tail = {"doc": {"CALC_DIR": self.test_dir}, "name": "job_1", "status": "Done", "files": {}}
+        backend.calls = {}
+        session.tail_job(doc_obj, job_id, tail, list(ncw.TAIL_PATTERNS))
+        self.assertEqual(backend.calls["download_file"], 2)
+        # the result list has no sizes, the unchanged files are stopped at the first progress
+        session.tail_job(doc_obj, job_id, tail, list(ncw.TAIL_PATTERNS))
+        self.assertEqual(backend.calls["download_file"], 4)
+        self.assertEqual(backend.bytes_down, 2000)
+
+
+
+class TestValidate(SimTestCase):
+
+    def run_ncw(self, code):
+        """
+        run code in a new python process in which the nexus compute client can not be imported
+        """
+        env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(ncw.__file__)))
+        return subprocess.run([sys.executable, "-c", "import sys\nsys.modules['nexuscompute'] = None\n" + code],
+            cwd=self.test_dir, env=env, capture_output=True, text=True, timeout=60)
+
+    def validate(self, *argv):
+        return self.run_ncw("import ncw\nsys.argv = " + repr(["ncw.py", "-t", "token.txt", "--validate"] + list(argv)) + 
+            "\nncw.main()")
+
+    def test_submit_without_client(self):
+        self.write("token.txt", "sim:token\n")
+        self.write("mesh.bdf", "GRID    1\n")
+        self.write("a1.dat", "SOL 101\nINCLUDE 'mesh.bdf'\nCEND\nBEGIN BULK\nENDDATA\n")
+        self.write("submit.txt", "file:a1.dat\n")
+        result = self.validate("-a", "SUBMIT", "-f", "submit.txt")
+        self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+        self.assertIn("upload: 2 files", result.stdout)
+        self.assertIn("validation passed", result.stdout)
+        # a missing include file fails the validation
+        self.write("a1.dat", "SOL 101\nINCLUDE 'missing.bdf'\nCEND\n")
+        result = self.validate("-a", "SUBMIT", "-f", "submit.txt")
+        self.assertEqual(result.returncode, 1, result.stdout + result.stderr)
+        self.assertIn("validation failed with", result.stdout)
+
+    def test_download_without_client(self):
+        self.write("token.txt", "sim:token\n")
+        self.write("download.txt", "DOC_ID:doc-1\nCALC_DIR:results\nSTATUS:Done\n")
+        result = self.validate("-a", "DOWNLOAD", "-f", "download.txt")
+        self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+        self.assertIn("document doc-1: jobs by query STATUS Done", result.stdout)
+
+    def test_modules_of_single_actions_are_not_imported(self):
+        result = self.run_ncw("import ncw\nprint(','.join([m for m in ('asyncio', 'sqlite3', 'csv', 'mmap', 'inspect', " + 
+            "'multiprocessing') if m in sys.modules]))")
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), "")
+
+
+
+class TestSessionPool(SimTestCase):
+
+    def setUp(self):
+        SimTestCase.setUp(self)
+        self.backends = {"sim:a": ncw_bench.SimBackend(docs=0, latency=0.0, job_duration=60.0), 
+            "sim:b": ncw_bench.SimBackend(docs=0, latency=0.0, job_duration=60.0)}
+        ncw_bench.SimNexusCompute.backends = self.backends
+        self.addCleanup(setattr, ncw_bench.SimNexusCompute, "backends", {})
+        self.write("a1.dat", "SOL 101\nCEND\nBEGIN BULK\nENDDATA\n")
+        self.token_file = self.write("tokens.txt", "sim:a\nsim:b\n")
+        os.chdir(self.test_dir)
+
+    def pool(self, *argv):
+        arg_space = ncw.get_parser().parse_args(["--pool", "-t", self.token_file] + list(argv))
+        with redirect_stdout(io.StringIO()):
+            pool = ncw.SessionPool(arg_space)
+        self.addCleanup(pool.end_nc)
+        return pool
+
+    def submit(self, pool, submit_file):
+        pool.arg_space.file = submit_file
+        for backend in self.backends.values():
+            backend.calls = {}
+        with redirect_stdout(io.StringIO()):
+            pool.submit_files()
+
+    def test_jobs_are_spread_over_the_accounts(self):
+        pool = self.pool()
+        submit_file = self.write("submit.txt", "file:a1.dat\n")
+        for i in range(4):
+            self.submit(pool, submit_file)
+            # the running jobs are counted in the documents of the journal, the accounts are not listed
+            for backend in self.backends.values():
+                self.assertNotIn("list_documents", backend.calls)
+        self.assertEqual([len(backend.documents) for backend in self.backends.values()], [2, 2])
+
+    def test_account_with_least_running_jobs(self):
+        backend_a = self.backends["sim:a"]
+        backend_b = self.backends["sim:b"]
+        # one job per account, the job of account b is finished afterwards
+        submit_file = self.write("submit.txt", "file:a1.dat\n")
+        for i in range(2):
+            self.submit(self.pool(), submit_file)
+        self.assertEqual([len(backend.documents) for backend in self.backends.values()], [1, 1])
+        backend_b.job_duration = 0.0
+        # finished jobs are not counted, the next jobs go into account b
+        for i in range(2):
+            self.submit(self.pool(), submit_file)
+        self.assertEqual([len(backend.documents) for backend in self.backends.values()], [1, 3])
+        # a submit file with document id goes into the account of the document
+        doc_id = list(backend_a.documents)[0]
+        self.submit(self.pool(), self.write("submit_doc.txt", "doc_id:" + doc_id + "\nfile:a1.dat\n"))
+        self.assertEqual(len(backend_a.documents[doc_id]["jobs"]), 2)
+
+
+
+if __name__ == "__main__":
+    unittest.main()